@@ -61,6 +61,12 @@ COURSE_CAPTURE_POLICIES_URL = 'https://rtl.berkeley.edu/services-programs/course
 
 COURSE_CAPTURE_PREMIUM_COST = -1
 
+# The course page embeds Canvas and Kaltura data, which change outside of Diablo. Its ETag expires after this many seconds.
+COURSE_ETAG_MAX_AGE = 300
+
+# Upper bound on 'limit' when the courses API is asked for a single page of results.
+COURSES_PAGE_SIZE_MAX = 500
+
 # YYYY-MM-DD is expected date format. For example, '2020-01-21'
 CURRENT_TERM_BEGIN = None
 CURRENT_TERM_END = None
@@ -103,20 +109,39 @@ INACTIVE_SESSION_LIFETIME = 120
 # These "INDEX_HTML" defaults are good in diablo-[dev|qa|prod]. See development.py for local configs.
 INDEX_HTML = 'dist/static/index.html'
 
+# SIS data refresh gets CalNet data of new instructors, plus at most MAX_STALE instructors whose CalNet data is older
+# than TTL_DAYS. The cap spreads LDAP load over runs.
+INSTRUCTOR_VERIFICATION_MAX_STALE = 1000
+INSTRUCTOR_VERIFICATION_TTL_DAYS = 7
+
 KALTURA_APP_TOKEN = None
 KALTURA_APP_TOKEN_ID = None
 KALTURA_COMMON_CATEGORY = 'Course Capture'
 KALTURA_EVENT_ORGANIZER = '____at_berkeley.edu'
+# Kaltura event reads are served by the local mirror if synced within this many seconds. Zero means always read from Kaltura.
+KALTURA_EVENTS_MAX_STALENESS = 1800
+# Incremental sync of the mirror asks for events updated since the last sync, less this many seconds of slack for clock skew.
+KALTURA_EVENTS_SYNC_OVERLAP = 300
 KALTURA_EXPIRY = 0
 KALTURA_KMS_OWNER_ID = 'owner_id'
+# Upper bound on Kaltura API requests per second, shared by all Kaltura clients of the process. Zero means no limit.
+KALTURA_MAX_REQUESTS_PER_SECOND = 10
 KALTURA_MEDIA_SPACE_URL = 'https://____.mediaspace.kaltura.com'
+# Number of pages of a Kaltura list call fetched at once, after the first page.
+KALTURA_PAGE_FETCH_MAX_WORKERS = 4
 KALTURA_PARTNER_ID = '0000000'
 KALTURA_RECORDING_OFFSET_END = 2
 KALTURA_RECORDING_OFFSET_START = 7
+# Number of courses scheduled in Kaltura at once by the Kaltura and semester start jobs.
+KALTURA_SCHEDULING_MAX_WORKERS = 4
+# Kaltura admin sessions are cached per process and replaced this many seconds before KALTURA_EXPIRY.
+KALTURA_SESSION_REFRESH_MARGIN = 600
 
 LDAP_HOST = 'ldap-test.berkeley.edu'
 LDAP_BIND = 'mybind'
 LDAP_PASSWORD = 'secret'
+# Batches of UIDs searched concurrently, each on its own pooled LDAP connection.
+LDAP_SEARCH_MAX_WORKERS = 4
 
 # Logging
 LOGGING_FORMAT = '[%(asctime)s] - %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
@@ -128,11 +153,22 @@ PING_TIMEOUT_SECONDS = 5
 
 REMEMBER_COOKIE_NAME = 'remember_diablo_token'
 
+# After a SIS data refresh, only changed courses are checked for schedule updates. All scheduled courses are checked if
+# the last such sweep is older than this.
+SCHEDULE_UPDATES_FULL_SWEEP_HOURS = 24
+
 SEARCH_ITEMS_PER_PAGE = 50
 
 # Used to encrypt session cookie.
 SECRET_KEY = 'secret'
 
+# SIS data refresh is aborted, before sis_sections is touched, if Nessie returns fewer rows than this fraction of the
+# term's current rows. A partial transfer would otherwise soft-delete the missing sections.
+SIS_REFRESH_MIN_STAGED_ROW_RATIO = 0.5
+
+# Terms loaded by SIS data refresh, concurrently. Between terms, add the upcoming term. Empty means CURRENT_TERM_ID.
+SIS_REFRESH_TERM_IDS = []
+
 SKIP_SIS_REFRESH_FOR_TESTING = False
 
 # SQLAlchemy
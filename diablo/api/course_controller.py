@@ -24,26 +24,40 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 from datetime import datetime
 import re
+import time
 
 from diablo.api.errors import BadRequestError, ForbiddenRequestError, InternalServerError, ResourceNotFoundError
-from diablo.api.util import admin_required, csv_download_response, get_search_filter_options
+from diablo.api.util import admin_required, csv_streaming_response, get_search_filter_options, versioned
 from diablo.externals.canvas import get_course_site
 from diablo.externals.kaltura import Kaltura
 from diablo.lib.http import tolerant_jsonify
 from diablo.lib.interpolator import get_sign_up_url
+from diablo.models.course_feed import get_config_key
 from diablo.models.course_preference import CoursePreference, get_all_publish_types, get_all_recording_types
+from diablo.models.data_version import get_course_version_keys
 from diablo.models.note import Note
 from diablo.models.opt_out import OptOut
 from diablo.models.queued_email import QueuedEmail
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.scheduled import Scheduled
-from diablo.models.sis_section import SisSection
+from diablo.models.sis_section import COURSE_PAGE_SORT_KEYS, SisSection
 from flask import current_app as app, request
 from flask_login import current_user, login_required
 
 
+def _get_course_etag_salt(term_id, section_id):
+    max_age = app.config['COURSE_ETAG_MAX_AGE']
+    return [current_user.uid, current_user.is_admin, get_config_key(), int(time.time() // max_age)]
+
+
+def _authorize_course(term_id, section_id):
+    # Runs ahead of the ETag check, so that '304 Not Modified' goes to authorized users only.
+    _raise_unless_course_viewable(SisSection.get_course(term_id, section_id, include_deleted=True), term_id, section_id)
+
+
 @app.route('/api/course/<term_id>/<section_id>')
 @login_required
+@versioned(get_version_keys=get_course_version_keys, get_salt=_get_course_etag_salt, authorize=_authorize_course)
 def get_course(term_id, section_id):
     course = SisSection.get_course(
         term_id,
@@ -53,10 +67,7 @@ def get_course(term_id, section_id):
         include_notes=current_user.is_admin,
         include_update_history=True,
     )
-    if not course:
-        raise ResourceNotFoundError(f'No section for term_id = {term_id} and section_id = {section_id}')
-    if not current_user.is_admin and current_user.uid not in [i['uid'] for i in course['instructors']]:
-        raise ForbiddenRequestError(f'Sorry, you are unauthorized to view the course {course["label"]}.')
+    _raise_unless_course_viewable(course, term_id, section_id)
 
     if current_user.is_admin and course['scheduled']:
         # When debugging, the raw Kaltura-provided JSON is useful.
@@ -80,6 +91,8 @@ def find_courses():
     params = request.get_json()
     term_id = params.get('termId')
     filter_ = params.get('filter', 'Scheduled')
+    if 'limit' in params:
+        return tolerant_jsonify(_get_courses_page_per_filter(filter_=filter_, params=params, term_id=term_id))
     return tolerant_jsonify(_get_courses_per_filter(filter_=filter_, term_id=term_id))
 
 
@@ -119,16 +132,19 @@ def download_courses_csv():
             'Collaborator UIDs': ', '.join([u for u in c.get('collaboratorUids') or []]),
         }
 
+    def _csv_rows():
+        for c in SisSection.stream_courses(term_id=term_id, filter_=filter_):
+            for scheduled in (c['scheduled'] or [{}]):
+                yield _course_csv_row(c, scheduled)
+
     params = request.get_json()
     term_id = params.get('termId')
     filter_ = params.get('filter', 'Scheduled')
+    if filter_ not in get_search_filter_options() or not term_id:
+        raise BadRequestError('One or more required params are missing or invalid')
     now = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    rows = []
-    for c in _get_courses_per_filter(filter_=filter_, term_id=term_id):
-        for scheduled in (c['scheduled'] or [{}]):
-            rows.append(_course_csv_row(c, scheduled))
-    return csv_download_response(
-        rows=rows,
+    return csv_streaming_response(
+        rows=_csv_rows(),
         filename=f"courses-{filter_.lower().replace(' ', '_')}-{term_id}_{now}.csv",
         fieldnames=list(_course_csv_row({}, {}).keys()),
     )
@@ -374,3 +390,47 @@ def _get_courses_per_filter(filter_, term_id):
         courses = SisSection.get_courses_without_instructors(term_id, include_full_schedules=False)
 
     return courses
+
+
+def _get_courses_page_per_filter(filter_, params, term_id):
+    if filter_ not in get_search_filter_options() or not term_id:
+        raise BadRequestError('One or more required params are missing or invalid')
+    limit = params.get('limit')
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 0 < limit <= app.config['COURSES_PAGE_SIZE_MAX']:
+        raise BadRequestError(f"Limit must be an integer between 1 and {app.config['COURSES_PAGE_SIZE_MAX']}")
+    sort_by = params.get('sortBy') or 'courseName'
+    if not isinstance(sort_by, str) or sort_by not in COURSE_PAGE_SORT_KEYS:
+        raise BadRequestError(f'Invalid sortBy: {sort_by}')
+    after = params.get('after')
+    if after is not None and not _is_valid_page_cursor(after, sort_by):
+        raise BadRequestError('Invalid page cursor')
+    search_text = params.get('searchText')
+    return SisSection.get_courses_page(
+        term_id=term_id,
+        filter_=filter_,
+        limit=limit,
+        after=after,
+        search_text=search_text if isinstance(search_text, str) else None,
+        sort_by=sort_by,
+        sort_desc=bool(params.get('sortDesc')),
+    )
+
+
+def _is_valid_page_cursor(after, sort_by):
+    if not isinstance(after, dict):
+        return False
+    section_id = after.get('sectionId')
+    if isinstance(section_id, bool) or not (isinstance(section_id, int) or (isinstance(section_id, str) and re.match(r'\A\d+\Z', section_id))):
+        return False
+    # The cursor carries the sort key of the last section on the page: a course name or a section id.
+    sort_key = after.get('sortKey')
+    if sort_by == 'sectionId':
+        return isinstance(sort_key, int) and not isinstance(sort_key, bool)
+    return isinstance(sort_key, str)
+
+
+def _raise_unless_course_viewable(course, term_id, section_id):
+    if not course:
+        raise ResourceNotFoundError(f'No section for term_id = {term_id} and section_id = {section_id}')
+    if not current_user.is_admin and current_user.uid not in [i['uid'] for i in course['instructors']]:
+        raise ForbiddenRequestError(f'Sorry, you are unauthorized to view the course {course["label"]}.')
@@ -23,12 +23,13 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 ENHANCEMENTS, OR MODIFICATIONS.
 """
 from diablo.api.errors import BadRequestError, ResourceNotFoundError
-from diablo.api.util import admin_required
+from diablo.api.util import admin_required, versioned
 from diablo.externals.b_connected import BConnected
 from diablo.lib.http import tolerant_jsonify
 from diablo.lib.interpolator import get_template_substitutions, interpolate_content
 from diablo.models.course_preference import get_all_publish_types, get_all_recording_types, NAMES_PER_PUBLISH_TYPE, \
     NAMES_PER_RECORDING_TYPE
+from diablo.models.data_version import EMAIL_TEMPLATES_VERSION_KEY
 from diablo.models.email_template import EmailTemplate
 from diablo.models.queued_email import QueuedEmail
 from diablo.models.sis_section import SisSection
@@ -38,6 +39,7 @@ from flask_login import current_user
 
 @app.route('/api/email/templates/all')
 @admin_required
+@versioned(get_version_keys=lambda: [EMAIL_TEMPLATES_VERSION_KEY])
 def get_all_email_templates():
     return tolerant_jsonify([template.to_api_json() for template in EmailTemplate.all_templates()])
 
@@ -25,10 +25,11 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime, timedelta
 
 from diablo.api.errors import BadRequestError, ResourceNotFoundError
-from diablo.api.util import admin_required
+from diablo.api.util import admin_required, versioned
 from diablo.externals.kaltura import CREATED_BY_DIABLO_TAG, Kaltura
 from diablo.lib.http import tolerant_jsonify
 from diablo.lib.util import localize_datetime
+from diablo.models.data_version import ROOMS_VERSION_KEY
 from diablo.models.room import Room
 from diablo.models.sis_section import SisSection
 from flask import current_app as app, request
@@ -37,6 +38,7 @@ from flask_login import login_required
 
 @app.route('/api/rooms/all')
 @admin_required
+@versioned(get_version_keys=lambda: [ROOMS_VERSION_KEY])
 def get_all_rooms():
     return tolerant_jsonify([room.to_api_json() for room in Room.all_rooms()])
 
@@ -55,12 +57,14 @@ def get_kaltura_events(kaltura_resource_id):
 
     term_start_date = _strptime('CURRENT_TERM_RECORDINGS_BEGIN', -1)
     term_end_date = _strptime('CURRENT_TERM_RECORDINGS_END', 1)
-    events = []
-    for event in Kaltura().get_events_by_location(kaltura_resource_id=kaltura_resource_id):
+
+    def _keep(event):
         if CREATED_BY_DIABLO_TAG in event.get('tags'):
             start_date = datetime.fromisoformat(event.get('startDate'))
-            if term_start_date < start_date < term_end_date:
-                events.append(event)
+            return term_start_date < start_date < term_end_date
+        return False
+    # Events outside the current term are dropped as pages arrive, rather than after all pages are in.
+    events = Kaltura().get_events_by_location(kaltura_resource_id=kaltura_resource_id, keep=_keep)
     return tolerant_jsonify(events)
 
 
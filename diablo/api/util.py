@@ -24,10 +24,15 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 import csv
 from functools import wraps
+import hashlib
+from io import StringIO
+import json
 
-from flask import current_app as app, request, Response
+from diablo.models.data_version import DataVersion
+from flask import current_app as app, request, Response, stream_with_context
 from flask_login import current_user
-from werkzeug.wrappers import ResponseStream
+
+CSV_STREAMING_CHUNK_SIZE = 64 * 1024
 
 
 def admin_required(func):
@@ -41,6 +46,29 @@ def admin_required(func):
     return _admin_required
 
 
+def csv_streaming_response(rows, filename, fieldnames):
+    # Rows may be a generator; CSV is written as rows are generated.
+    def _generate():
+        buffer = StringIO()
+        csv_writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        csv_writer.writeheader()
+        for row in rows:
+            csv_writer.writerow(row)
+            if buffer.tell() >= CSV_STREAMING_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(_generate()),
+        content_type='text/csv',
+        headers={
+            'Content-disposition': f'attachment; filename="{filename}"',
+        },
+    )
+
+
 def get_search_filter_options():
     return {
         'Scheduled': 'Courses with scheduled recordings.',
@@ -51,14 +79,31 @@ def get_search_filter_options():
     }
 
 
-def csv_download_response(rows, filename, fieldnames=None):
-    response = Response(
-        content_type='text/csv',
-        headers={
-            'Content-disposition': f'attachment; filename="{filename}"',
-        },
-    )
-    csv_writer = csv.DictWriter(ResponseStream(response), fieldnames=fieldnames)
-    csv_writer.writeheader()
-    csv_writer.writerows(rows)
-    return response
+def versioned(get_version_keys, get_salt=None, authorize=None):
+    # Conditional requests. The ETag derives from change counters (see DataVersion) and from whatever else the response
+    # depends on (the salt), so a request with matching If-None-Match gets '304 Not Modified' before any feed is built.
+    # If given, authorize(*args, **kw) runs first and raises if the resource is missing or forbidden.
+    def _decorator(func):
+        @wraps(func)
+        def _versioned(*args, **kw):
+            if authorize:
+                authorize(*args, **kw)
+            versions = DataVersion.get_versions(get_version_keys(*args, **kw))
+            salt = get_salt(*args, **kw) if get_salt else None
+            fingerprint = json.dumps([sorted((key, version) for key, (version, _) in versions.items()), salt], default=str)
+            etag = hashlib.sha1(fingerprint.encode()).hexdigest()
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = func(*args, **kw)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            last_modified = max((updated_at for _, updated_at in versions.values() if updated_at), default=None)
+            if last_modified:
+                response.last_modified = last_modified
+            # Browsers must revalidate rather than trust Last-Modified heuristics.
+            response.cache_control.no_cache = True
+            return response
+        return _versioned
+    return _decorator
@@ -22,7 +22,11 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import queue
 import ssl
+from threading import Lock
 
 import ldap3
 
@@ -37,9 +41,17 @@ SCHEMA_DICT = {
 
 BATCH_QUERY_MAXIMUM = 500
 
+_clients = {}
+_clients_lock = Lock()
+
 
 def client(app):
-    return Client(app)
+    # One client, and therefore one pool of bound connections, per LDAP host and bind for the life of the process.
+    key = (app.config['LDAP_HOST'], app.config['LDAP_BIND'])
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = Client(app)
+        return _clients[key]
 
 
 class Client:
@@ -49,23 +61,61 @@ class Client:
         self.host = app.config['LDAP_HOST']
         self.bind = app.config['LDAP_BIND']
         self.password = app.config['LDAP_PASSWORD']
+        self.max_workers = app.config['LDAP_SEARCH_MAX_WORKERS']
         tls = ldap3.Tls(validate=ssl.CERT_REQUIRED)
         server = ldap3.Server(self.host, port=636, use_ssl=True, get_info=ldap3.ALL, tls=tls)
         self.server = server
+        self._idle_connections = queue.LifoQueue()
 
     def connect(self):
-        conn = ldap3.Connection(self.server, user=self.bind, password=self.password, auto_bind=ldap3.AUTO_BIND_TLS_BEFORE_BIND)
+        # The RESTARTABLE strategy re-binds if the server drops an idle connection.
+        conn = ldap3.Connection(
+            self.server,
+            user=self.bind,
+            password=self.password,
+            auto_bind=ldap3.AUTO_BIND_TLS_BEFORE_BIND,
+            client_strategy=ldap3.RESTARTABLE,
+        )
         return conn
 
+    @contextmanager
+    def connection(self):
+        # An ldap3 connection is not thread-safe. Each thread borrows an idle connection (or binds a new one) and gives
+        # it back when done. A connection that raised is unbound rather than reused.
+        try:
+            conn = self._idle_connections.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            yield conn
+        except Exception:
+            conn.unbind()
+            raise
+        self._idle_connections.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle_connections.get_nowait().unbind()
+            except queue.Empty:
+                break
+
     def search_uids(self, uids, search_expired=False):
-        all_out = []
-        for i in range(0, len(uids), BATCH_QUERY_MAXIMUM):
-            uids_batch = uids[i:i + BATCH_QUERY_MAXIMUM]
-            with self.connect() as conn:
-                search_filter = self._ldap_search_filter(uids_batch, 'uid', search_expired)
-                conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
-                all_out += [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
-        return all_out
+        uids = list(uids)
+        batches = [uids[i:i + BATCH_QUERY_MAXIMUM] for i in range(0, len(uids), BATCH_QUERY_MAXIMUM)]
+        max_workers = min(self.max_workers, len(batches))
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(lambda batch: self._search_batch(batch, search_expired), batches))
+        else:
+            results = [self._search_batch(batch, search_expired) for batch in batches]
+        return [entry for result in results for entry in result]
+
+    def _search_batch(self, uids, search_expired):
+        with self.connection() as conn:
+            search_filter = self._ldap_search_filter(uids, 'uid', search_expired)
+            conn.search('dc=berkeley,dc=edu', search_filter, attributes=ldap3.ALL_ATTRIBUTES)
+            return [_attributes_to_dict(entry, search_expired) for entry in conn.entries]
 
     @classmethod
     def _ldap_search_filter(cls, ids, id_type, search_expired=False):
@@ -22,17 +22,23 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
 import hashlib
+from itertools import islice
 import json
+from threading import Lock
+from time import monotonic, sleep
 
 import dateutil.parser
 from diablo import cachify, skip_when_pytest
-from diablo.lib.berkeley import get_first_matching_datetime_of_term, get_recording_end_date, get_recording_start_date, \
-    term_name_for_sis_id
+from diablo.lib.berkeley import get_meeting_pattern_of, term_name_for_sis_id
 from diablo.lib.kaltura_util import get_classification_name, get_recurrence_name, get_series_description, \
     get_status_name, represents_recording_series
-from diablo.lib.util import default_timezone, epoch_time_to_isoformat, format_days
+from diablo.lib.util import default_timezone, epoch_time_to_isoformat
+from diablo.models.kaltura_event import KalturaEvent
 from flask import current_app as app
 from KalturaClient import KalturaClient, KalturaConfiguration
 from KalturaClient.exceptions import KalturaClientException
@@ -40,43 +46,77 @@ from KalturaClient.Plugins.Core import KalturaBaseEntry, KalturaCategory, Kaltur
     KalturaCategoryEntryStatus, KalturaCategoryFilter, KalturaEntryDisplayInSearchType, KalturaEntryModerationStatus, \
     KalturaEntryStatus, KalturaEntryType, KalturaFilterPager, KalturaMediaEntryFilter, KalturaNullableBoolean
 from KalturaClient.Plugins.Schedule import KalturaRecordScheduleEvent, KalturaRecordScheduleEventFilter, \
-    KalturaScheduleEventClassificationType, KalturaScheduleEventFilter, KalturaScheduleEventRecurrence, \
+    KalturaScheduleEventClassificationType, KalturaScheduleEventFilter, KalturaScheduleEventOrderBy, KalturaScheduleEventRecurrence, \
     KalturaScheduleEventRecurrenceFrequency, KalturaScheduleEventRecurrenceType, KalturaScheduleEventResource, \
     KalturaScheduleEventResourceFilter, KalturaScheduleEventStatus, KalturaScheduleResourceFilter, KalturaSessionType
 
+CANVAS_CATEGORY_PARENT_NAME = 'Canvas>site>channels'
+
 CREATED_BY_DIABLO_TAG = 'rtl_course_capture'
 
 DEFAULT_KALTURA_PAGE_SIZE = 200
 
+# Kaltura's default when a session is started with expiry of zero.
+DEFAULT_KALTURA_SESSION_EXPIRY = 86400
+
+# Kaltura list calls return no more than this many objects, however many match the filter.
+KALTURA_MAX_LIST_RESULTS = 10000
+
+# Cancelled and deleted events are mirrored, and skipped by reads of the mirror.
+MIRRORED_EVENT_STATUSES = ','.join(
+    str(status) for status in [KalturaScheduleEventStatus.ACTIVE, KalturaScheduleEventStatus.CANCELLED, KalturaScheduleEventStatus.DELETED]
+)
+
+# Admin sessions (KS) are shared by all Kaltura clients of the process, one per privilege set.
+_admin_sessions = {}
+_admin_sessions_lock = Lock()
+
+
+class _TokenBucket:
+    # Holds up to 'rate' tokens, refilled at 'rate' tokens per second. When the bucket is empty, callers take tokens in advance
+    # and sleep until those tokens would have been refilled, so the lock is never held while waiting.
+
+    def __init__(self, clock=monotonic, sleep_=sleep):
+        self._clock = clock
+        self._lock = Lock()
+        self._sleep = sleep_
+        self._tokens = None
+        self._updated_at = None
+
+    def acquire(self, rate):
+        if not rate:
+            return
+        with self._lock:
+            now = self._clock()
+            tokens = rate if self._tokens is None else min(rate, self._tokens + (now - self._updated_at) * rate)
+            self._tokens = tokens - 1
+            self._updated_at = now
+        if tokens < 1:
+            self._sleep((1 - tokens) / rate)
+
+
+_request_rate_limiter = _TokenBucket()
+
+
+class _RateLimitedKalturaClient(KalturaClient):
+
+    def doHttpRequest(self, *args, **kwargs):  # noqa: N802
+        _request_rate_limiter.acquire(app.config['KALTURA_MAX_REQUESTS_PER_SECOND'])
+        return super().doHttpRequest(*args, **kwargs)
+
 
 class Kaltura:
 
     @skip_when_pytest()
-    def __init__(self, disable_entitlements=False, timeout=None):
-        expiry = app.config['KALTURA_EXPIRY']
-        partner_id = app.config['KALTURA_PARTNER_ID']
-
+    def __init__(self, disable_entitlements=False, timeout=None, defer_mirror_refresh=False):
         configuration = KalturaConfiguration()
         if timeout:
             configuration.requestTimeout = timeout
-
-        self.client = KalturaClient(configuration)
-        result = self.client.session.startWidgetSession(
-            expiry=expiry,
-            widgetId=f'_{partner_id}',
-        )
-        self.client.setKs(result.ks)
-
-        token_hash = hashlib.sha256((result.ks + app.config['KALTURA_APP_TOKEN']).encode('ascii')).hexdigest()
-        session_privileges = 'all:*,disableentitlement' if disable_entitlements else ''
-        result = self.client.appToken.startSession(
-            expiry=expiry,
-            id=app.config['KALTURA_APP_TOKEN_ID'],
-            sessionPrivileges=session_privileges,
-            tokenHash=token_hash,
-            type=KalturaSessionType.ADMIN,
-        )
-        self.client.setKs(result.ks)
+        self.client = _RateLimitedKalturaClient(configuration)
+        self.client.setKs(_get_admin_ks(disable_entitlements))
+        # If the mirror is enabled, events changed by this client are copied to it after each write, unless the caller (e.g., a
+        # worker thread, which must not touch the database) takes care of it with refresh_mirrored_events.
+        self.defer_mirror_refresh = defer_mirror_refresh
 
     @skip_when_pytest()
     def add_to_kaltura_category(self, category_id, entry_id):
@@ -89,6 +129,12 @@ class Kaltura:
         )
         self.client.categoryEntry.add(category_entry)
 
+    @skip_when_pytest()
+    def add_to_kaltura_categories(self, category_ids, entry_id):
+        with self._multirequest():
+            for category_id in category_ids:
+                self.add_to_kaltura_category(category_id=category_id, entry_id=entry_id)
+
     @skip_when_pytest()
     def delete_kaltura_category(self, category_id, entry_id):
         self.client.categoryEntry.delete(entry_id, category_id)
@@ -116,35 +162,101 @@ class Kaltura:
         else:
             return None
 
-    @skip_when_pytest(mock_object=[])
-    def get_categories(self, template_entry_id):
-        category_entries = self._get_category_entries(KalturaCategoryEntryFilter(entryIdEqual=template_entry_id))
-        if category_entries:
-            category_ids = [entry['categoryId'] for entry in category_entries]
-            category_filter = KalturaCategoryFilter(idIn=','.join(str(id_) for id_ in category_ids))
-            return self._get_categories(kaltura_category_filter=category_filter)
+    @skip_when_pytest(mock_object={})
+    def get_categories_per_event(self, event_ids):
+        # Each schedule event and the category entries of its template entry are fetched in a single request.
+        with self._multirequest() as results:
+            for event_id in event_ids:
+                event = self.client.schedule.scheduleEvent.get(event_id)
+                self.client.categoryEntry.list(
+                    filter=KalturaCategoryEntryFilter(entryIdEqual=event.templateEntryId),
+                    pager=KalturaFilterPager(pageIndex=1, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
+                )
+        category_ids_per_event = {}
+        for index, event_id in enumerate(event_ids):
+            event = results[2 * index]
+            category_ids = [entry.categoryId for entry in results[2 * index + 1].objects]
+            category_ids_per_event[event_id] = (event.templateEntryId, category_ids)
+
+        all_category_ids = set(id_ for _, category_ids in category_ids_per_event.values() for id_ in category_ids)
+        categories_by_id = {}
+        if all_category_ids:
+            category_filter = KalturaCategoryFilter(idIn=','.join(str(id_) for id_ in sorted(all_category_ids)))
+            categories_by_id = {c['id']: c for c in self._get_categories(kaltura_category_filter=category_filter)}
+        return {
+            event_id: {
+                'categories': [categories_by_id[id_] for id_ in category_ids if id_ in categories_by_id],
+                'templateEntryId': template_entry_id,
+            } for event_id, (template_entry_id, category_ids) in category_ids_per_event.items()
+        }
+
+    @skip_when_pytest()
+    def get_events_by_location(self, kaltura_resource_id, keep=None):
+        if KalturaEvent.is_fresh():
+            events = KalturaEvent.get_events_by_resource(kaltura_resource_id)
         else:
-            return []
+            events = self.iter_events_by_location(kaltura_resource_id)
+        return _events_to_api_json(events, keep=keep)
 
     @skip_when_pytest()
-    def get_events_by_location(self, kaltura_resource_id):
+    def get_events_by_tag(self, tags_like=CREATED_BY_DIABLO_TAG):
+        return _events_to_api_json(self.iter_events_by_tag(tags_like))
+
+    @skip_when_pytest(mock_object=[])
+    def iter_events_by_location(self, kaltura_resource_id):
+        # Events are yielded one page at a time, as pages arrive, without grouping of recurrences under their series.
         event_filter = KalturaScheduleEventFilter(
             orderBy='-startDate',
             resourceIdEqual=str(kaltura_resource_id),
         )
-        return self._get_events(kaltura_event_filter=event_filter)
+        return self._iter_events(kaltura_event_filter=event_filter)
 
-    @skip_when_pytest()
-    def get_events_by_tag(self, tags_like=CREATED_BY_DIABLO_TAG):
-        return self._get_events(kaltura_event_filter=KalturaScheduleEventFilter(tagsLike=tags_like))
+    @skip_when_pytest(mock_object=[])
+    def iter_events_by_tag(self, tags_like=CREATED_BY_DIABLO_TAG):
+        return self._iter_events(kaltura_event_filter=KalturaScheduleEventFilter(tagsLike=tags_like))
+
+    @skip_when_pytest(mock_object=[])
+    def iter_events_updated_since(self, updated_since=None):
+        # Cancelled and deleted events are included so that the mirror learns of them. Order by creation, rather than by update,
+        # means that an event updated mid-sync may show up twice but never slips between pages.
+        def _event_filter(created_since):
+            return KalturaRecordScheduleEventFilter(
+                createdAtGreaterThanOrEqual=created_since,
+                orderBy=KalturaScheduleEventOrderBy.CREATED_AT_ASC,
+                statusIn=MIRRORED_EVENT_STATUSES,
+                updatedAtGreaterThanOrEqual=None if updated_since is None else int(updated_since.timestamp()),
+            )
+        return self._iter_events_by_created_at(_event_filter)
 
     @skip_when_pytest(mock_object='kaltura/schedule_event.json', is_fixture_json_file=True)
     def get_event(self, event_id):
-        events = self._get_events(kaltura_event_filter=KalturaScheduleEventFilter(idEqual=event_id))
+        # Events created since the last sync of the mirror are not there yet, so a miss falls back to Kaltura.
+        events = _events_to_api_json(KalturaEvent.get_events(event_ids=[event_id])) if KalturaEvent.is_fresh() else []
+        events = events or self._get_events(kaltura_event_filter=KalturaScheduleEventFilter(idEqual=event_id))
         return events[0] if events else None
 
+    @skip_when_pytest(mock_object={})
+    def get_resource_ids_per_event(self, event_ids):
+        def _fetch(client, page_index):
+            return client.schedule.scheduleEventResource.list(
+                filter=KalturaScheduleEventResourceFilter(eventIdIn=','.join(str(event_id) for event_id in event_ids)),
+                pager=KalturaFilterPager(pageIndex=page_index, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
+            )
+        resource_id_per_event_id = {event_id: None for event_id in event_ids}
+        for event_resource in self._iter_kaltura_objects(_fetch):
+            resource_id_per_event_id[event_resource.eventId] = event_resource.resourceId
+        return resource_id_per_event_id
+
     @skip_when_pytest()
     def get_events_in_date_range(self, end_date, start_date, kaltura_schedule_id=None, recurrence_type=None):
+        # Events of a given series are newly scheduled, and maybe not yet synced, so those come from Kaltura.
+        if kaltura_schedule_id is None and KalturaEvent.is_fresh():
+            events = KalturaEvent.get_events_in_date_range(
+                end_date=end_date,
+                recurrence_type=None if recurrence_type is None else get_recurrence_name(KalturaScheduleEventRecurrenceType(recurrence_type)),
+                start_date=start_date,
+            )
+            return _events_to_api_json(events)
         end_date_timestamp = int(end_date.timestamp())
         start_date_timestamp = int(start_date.timestamp())
         if recurrence_type is None:
@@ -169,30 +281,22 @@ class Kaltura:
 
     @cachify('kaltura/schedule_resources', timeout=30)
     def get_schedule_resources(self):
-        def _fetch(page_index):
-            return self.client.schedule.scheduleResource.list(
+        def _fetch(client, page_index):
+            return client.schedule.scheduleResource.list(
                 filter=KalturaScheduleResourceFilter(),
                 pager=KalturaFilterPager(pageIndex=page_index, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
             )
-        return [{'id': o.id, 'name': o.name} for o in _get_kaltura_objects(_fetch)]
+        return [{'id': o.id, 'name': o.name} for o in self._iter_kaltura_objects(_fetch)]
 
-    @skip_when_pytest()
-    def get_or_create_canvas_category_object(self, canvas_course_site_id, moderation=False):
-        o = self.get_category_object(name=f'Canvas>site>channels>{canvas_course_site_id}')
-        if o:
-            return o
-        else:
-            parent = self.get_category_object(name='Canvas>site>channels')
-            response = self.client.category.add(KalturaCategory(
-                name=canvas_course_site_id,
-                parentId=parent['id'],
-                moderation=KalturaNullableBoolean(1 if moderation else 0),
-            ))
-            return _category_object_to_json(response) if response else None
+    @skip_when_pytest(mock_object={})
+    def get_or_create_canvas_category_objects(self, canvas_course_site_ids, moderation=False):
+        names = [_canvas_category_name(site_id) for site_id in canvas_course_site_ids]
+        categories_by_name = self._get_category_objects(names + [CANVAS_CATEGORY_PARENT_NAME])
+        return self._get_or_create_canvas_category_objects(canvas_course_site_ids, categories_by_name, moderation)
 
     @skip_when_pytest()
     def get_canvas_category_object(self, canvas_course_site_id):
-        return self.get_category_object(name=f'Canvas>site>channels>{canvas_course_site_id}')
+        return self.get_category_object(name=_canvas_category_name(canvas_course_site_id))
 
     @skip_when_pytest()
     def get_category_object(self, name):
@@ -215,19 +319,28 @@ class Kaltura:
             room,
             term_id,
     ):
+        # Category lookups go out in one request; any missing Canvas categories are created in one more.
+        common_category_name = app.config['KALTURA_COMMON_CATEGORY']
+        is_media_gallery = publish_type and publish_type.startswith('kaltura_media_gallery')
+        names = [common_category_name]
+        if is_media_gallery:
+            names += [_canvas_category_name(site_id) for site_id in canvas_course_site_ids] + [CANVAS_CATEGORY_PARENT_NAME]
+        categories_by_name = self._get_category_objects(names)
+
         category_ids = []
-        common_category = self.get_category_object(name=app.config['KALTURA_COMMON_CATEGORY'])
+        common_category = categories_by_name[common_category_name]
         if common_category:
             category_ids.append(common_category['id'])
 
-        if publish_type and publish_type.startswith('kaltura_media_gallery'):
+        if is_media_gallery:
             moderation = publish_type == 'kaltura_media_gallery_moderated'
+            canvas_categories = self._get_or_create_canvas_category_objects(canvas_course_site_ids, categories_by_name, moderation)
             for canvas_course_site_id in canvas_course_site_ids:
-                category = self.get_or_create_canvas_category_object(canvas_course_site_id=canvas_course_site_id, moderation=moderation)
+                category = canvas_categories[canvas_course_site_id]
                 if category:
                     category_ids.append(category['id'])
 
-        kaltura_schedule = self._schedule_recurring_events_in_kaltura(
+        kaltura_schedule_id = self._schedule_recurring_events_in_kaltura(
             category_ids=category_ids,
             course_label=course_label,
             instructors=instructors,
@@ -237,10 +350,8 @@ class Kaltura:
             room=room,
             term_id=term_id,
         )
-
-        # Link the schedule to the room (ie, capture agent)
-        self._attach_scheduled_recordings_to_room(kaltura_schedule_id=kaltura_schedule.id, room=room.to_api_json())
-        return kaltura_schedule.id
+        self._after_write(event_ids=[kaltura_schedule_id])
+        return kaltura_schedule_id
 
     @skip_when_pytest()
     def delete(self, event_id):
@@ -248,7 +359,9 @@ class Kaltura:
             start_date = dateutil.parser.parse(kaltura_event['startDate'])
             return start_date.timestamp() > datetime.now().timestamp()
 
-        event = self.get_event(event_id)
+        # Read from Kaltura, not the mirror, because deletion depends on current state.
+        events = self._get_events(kaltura_event_filter=KalturaScheduleEventFilter(idEqual=event_id))
+        event = events[0] if events else None
         if event:
             recurrence_type = event['recurrenceType']
             if recurrence_type == 'Recurring':
@@ -268,6 +381,12 @@ class Kaltura:
             else:
                 # This is not a series event. Delete it, whatever it is.
                 self.client.schedule.scheduleEvent.delete(event_id)
+            self._after_write(event_ids=[event_id])
+
+    @skip_when_pytest()
+    def refresh_mirrored_events(self, event_ids):
+        if KalturaEvent.is_enabled():
+            self._refresh_mirrored_events(event_ids)
 
     def ping(self):
         filter_ = KalturaMediaEntryFilter()
@@ -319,40 +438,146 @@ class Kaltura:
             self._set_event_meeting_attributes(recurring_event, meeting_attributes, meeting_attributes.get('room'))
         if description:
             recurring_event.setDescription(description)
-        self.client.schedule.scheduleEvent.update(scheduled_model.kaltura_schedule_id, recurring_event)
 
+        kaltura_schedule_id = scheduled_model.kaltura_schedule_id
         if meeting_attributes and 'room' in meeting_attributes:
-            self._detach_scheduled_recordings_from_room(
-                kaltura_schedule_id=scheduled_model.kaltura_schedule_id,
-            )
-            self._attach_scheduled_recordings_to_room(
-                kaltura_schedule_id=scheduled_model.kaltura_schedule_id,
-                room=meeting_attributes['room'],
-            )
+            # The update shares a request with the lookup of current event resources; the detach shares one with the attach.
+            with self._multirequest() as results:
+                self.client.schedule.scheduleEvent.update(kaltura_schedule_id, recurring_event)
+                self.client.schedule.scheduleEventResource.list(
+                    filter=KalturaScheduleEventResourceFilter(eventIdEqual=kaltura_schedule_id),
+                    pager=KalturaFilterPager(),
+                )
+            room = meeting_attributes['room']
+            with self._multirequest():
+                for o in results[1].objects:
+                    self.client.schedule.scheduleEventResource.delete(kaltura_schedule_id, o.resourceId)
+                self._attach_scheduled_recordings_to_room(kaltura_schedule_id=kaltura_schedule_id, room=room)
+            app.logger.info(f"Kaltura schedule {kaltura_schedule_id} attached to {room['location']}")
+        else:
+            self.client.schedule.scheduleEvent.update(kaltura_schedule_id, recurring_event)
+        self._after_write(event_ids=[kaltura_schedule_id])
+
+    def _after_write(self, event_ids):
+        if not self.defer_mirror_refresh:
+            self.refresh_mirrored_events(event_ids)
+
+    def _refresh_mirrored_events(self, event_ids):
+        # The given events and, if series, their recurrences are read back from Kaltura and upserted into the mirror, so that
+        # Diablo's own changes in Kaltura are not hidden from mirror reads until the next sync. Events that Kaltura no longer
+        # lists are dropped from the mirror. The change in Kaltura is done by now, so failure here is logged, not raised. As with
+        # other writes, the caller commits.
+        event_ids = [int(event_id) for event_id in event_ids]
+        event_ids_csv = ','.join(str(event_id) for event_id in event_ids)
+        try:
+            events = list(self._iter_events(KalturaScheduleEventFilter(idIn=event_ids_csv, statusIn=MIRRORED_EVENT_STATUSES)))
+            events += list(self._iter_events(KalturaScheduleEventFilter(parentIdIn=event_ids_csv, statusIn=MIRRORED_EVENT_STATUSES)))
+            non_recurrence_ids = [e['id'] for e in events if (e.get('recurrenceType') or '').lower() != 'recurrence']
+            resource_id_per_event_id = self.get_resource_ids_per_event(non_recurrence_ids) if non_recurrence_ids else {}
+        except Exception as e:
+            app.logger.error(f'Failed to refresh Kaltura events {event_ids} in the mirror; they are dropped from it instead.')
+            app.logger.exception(e)
+            KalturaEvent.delete_events(event_ids)
+        else:
+            KalturaEvent.delete_events(event_ids)
+            KalturaEvent.upsert(events)
+            KalturaEvent.update_resource_ids(resource_id_per_event_id)
 
     def _get_events(self, kaltura_event_filter):
-        def _fetch(page_index):
-            return self.client.schedule.scheduleEvent.list(
+        return _events_to_api_json(self._iter_events(kaltura_event_filter))
+
+    def _iter_events(self, kaltura_event_filter, max_pages=None):
+        def _fetch(client, page_index):
+            return client.schedule.scheduleEvent.list(
                 filter=kaltura_event_filter,
                 pager=KalturaFilterPager(pageIndex=page_index, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
             )
-        return _events_to_api_json(_get_kaltura_objects(_fetch))
+        return (_event_to_json(obj) for obj in self._iter_kaltura_objects(_fetch, max_pages=max_pages))
+
+    def _iter_events_by_created_at(self, get_event_filter):
+        # Past KALTURA_MAX_LIST_RESULTS, Kaltura lists nothing more. Events, ordered by creation, are therefore read in windows
+        # of at most that many: get_event_filter(created_since) filters events created at or after 'created_since', and each
+        # window starts at the creation time of the last event of the window before. Events created in that very second are
+        # read twice.
+        max_pages = KALTURA_MAX_LIST_RESULTS // DEFAULT_KALTURA_PAGE_SIZE
+        created_since = None
+        while True:
+            count = 0
+            last_created_at = None
+            for event in self._iter_events(kaltura_event_filter=get_event_filter(created_since), max_pages=max_pages):
+                count += 1
+                last_created_at = event['createdAt']
+                yield event
+            if count < max_pages * DEFAULT_KALTURA_PAGE_SIZE:
+                return
+            next_created_since = int(dateutil.parser.parse(last_created_at).timestamp())
+            if next_created_since == created_since:
+                raise ValueError(f'More than {KALTURA_MAX_LIST_RESULTS} Kaltura events were created at {last_created_at}')
+            created_since = next_created_since
 
     def _get_categories(self, kaltura_category_filter):
-        def _fetch(page_index):
-            return self.client.category.list(
+        def _fetch(client, page_index):
+            return client.category.list(
                 filter=kaltura_category_filter,
                 pager=KalturaFilterPager(pageIndex=page_index, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
             )
-        return [_category_object_to_json(obj) for obj in _get_kaltura_objects(_fetch)]
-
-    def _get_category_entries(self, kaltura_category_entry_filter):
-        def _fetch(page_index):
-            return self.client.categoryEntry.list(
-                filter=kaltura_category_entry_filter,
-                pager=KalturaFilterPager(pageIndex=page_index, pageSize=DEFAULT_KALTURA_PAGE_SIZE),
-            )
-        return [_category_entry_object_to_json(obj) for obj in _get_kaltura_objects(_fetch)]
+        return [_category_object_to_json(obj) for obj in self._iter_kaltura_objects(_fetch)]
+
+    def _iter_kaltura_objects(self, fetch, max_pages=None):
+        # Yield objects page by page, in order. Once the first page reveals 'totalCount', up to KALTURA_PAGE_FETCH_MAX_WORKERS
+        # later pages are fetched ahead of the consumer, each with a client of its own since KalturaClient is not thread-safe.
+        # If 'max_pages' is given then no page beyond it is fetched.
+        response = fetch(self.client, 1)
+        yield from response.objects
+        page_count = int(response.totalCount / DEFAULT_KALTURA_PAGE_SIZE) + 1
+        page_indexes = iter(range(2, (page_count if max_pages is None else min(page_count, max_pages)) + 1))
+        app_ = app._get_current_object()
+        config = self.client.getConfig()
+        ks = self.client.getKs()
+
+        def _fetch_objects(page_index):
+            with app_.app_context():
+                client = _RateLimitedKalturaClient(config)
+                client.setKs(ks)
+                return fetch(client, page_index).objects
+
+        max_workers = app.config['KALTURA_PAGE_FETCH_MAX_WORKERS']
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = deque(executor.submit(_fetch_objects, page_index) for page_index in islice(page_indexes, max_workers))
+            while futures:
+                objects = futures.popleft().result()
+                page_index = next(page_indexes, None)
+                if page_index:
+                    futures.append(executor.submit(_fetch_objects, page_index))
+                yield from objects
+
+    def _get_category_objects(self, names):
+        with self._multirequest() as results:
+            for name in names:
+                self.client.category.list(
+                    filter=KalturaCategoryFilter(fullNameEqual=name),
+                    pager=KalturaFilterPager(pageIndex=1, pageSize=1),
+                )
+        return {name: _category_object_to_json(r.objects[0]) if r.objects else None for name, r in zip(names, results)}
+
+    def _get_or_create_canvas_category_objects(self, canvas_course_site_ids, categories_by_name, moderation):
+        # Expects the Canvas categories, and their parent category, to be keys of 'categories_by_name'.
+        missing_site_ids = [site_id for site_id in canvas_course_site_ids if not categories_by_name[_canvas_category_name(site_id)]]
+        created = {}
+        if missing_site_ids:
+            parent = categories_by_name[CANVAS_CATEGORY_PARENT_NAME]
+            with self._multirequest() as results:
+                for canvas_course_site_id in missing_site_ids:
+                    self.client.category.add(KalturaCategory(
+                        name=canvas_course_site_id,
+                        parentId=parent['id'],
+                        moderation=KalturaNullableBoolean(1 if moderation else 0),
+                    ))
+            created = {site_id: _category_object_to_json(r) if r else None for site_id, r in zip(missing_site_ids, results)}
+        return {
+            site_id: created[site_id] if site_id in created else categories_by_name[_canvas_category_name(site_id)]
+            for site_id in canvas_course_site_ids
+        }
 
     def _schedule_recurring_events_in_kaltura(
             self,
@@ -374,41 +599,49 @@ class Kaltura:
             instructors=instructors,
             term_name=term_name,
         )
-        base_entry = self._create_kaltura_base_entry(
-            description=description,
-            instructors=instructors,
-            name=f'{summary} in {room.location}',
-        )
-
-        for category_id in category_ids or []:
-            self.add_to_kaltura_category(category_id=category_id, entry_id=base_entry.id)
-
-        recurring_event = KalturaRecordScheduleEvent(
-            # https://developer.kaltura.com/api-docs/General_Objects/Objects/KalturaScheduleEvent
-            classificationType=KalturaScheduleEventClassificationType.PUBLIC_EVENT,
-            comment=f'{summary} in {room.location}',
-            contact=','.join(instructor['uid'] for instructor in instructors),
-            description=description,
-            organizer=app.config['KALTURA_EVENT_ORGANIZER'],
-            ownerId=app.config['KALTURA_KMS_OWNER_ID'],
-            partnerId=app.config['KALTURA_PARTNER_ID'],
-            recurrenceType=KalturaScheduleEventRecurrenceType.RECURRING,
-            status=KalturaScheduleEventStatus.ACTIVE,
-            summary=summary,
-            tags=CREATED_BY_DIABLO_TAG,
-            templateEntryId=base_entry.id,
-        )
-
         app.logger.info(f"""
             Prepare to schedule recordings for {course_label}:
-                Room: {room.location}
+                Room: {room['location']}
                 Instructor UIDs: {[instructor['uid'] for instructor in instructors]}
                 Recording: {recording_type}; {publish_type}
         """)
 
-        self._set_event_meeting_attributes(recurring_event, meeting, room.to_api_json())
+        # The base entry, its categories, the series and its link to the room (ie, capture agent) are created in a single
+        # request. Until the request is sent, 'base_entry' and 'kaltura_schedule' are placeholders for the results.
+        with self._multirequest() as results:
+            base_entry = self._create_kaltura_base_entry(
+                description=description,
+                instructors=instructors,
+                name=f"{summary} in {room['location']}",
+            )
 
-        return self.client.schedule.scheduleEvent.add(recurring_event)
+            for category_id in category_ids:
+                self.add_to_kaltura_category(category_id=category_id, entry_id=base_entry.id)
+
+            recurring_event = KalturaRecordScheduleEvent(
+                # https://developer.kaltura.com/api-docs/General_Objects/Objects/KalturaScheduleEvent
+                classificationType=KalturaScheduleEventClassificationType.PUBLIC_EVENT,
+                comment=f"{summary} in {room['location']}",
+                contact=','.join(instructor['uid'] for instructor in instructors),
+                description=description,
+                organizer=app.config['KALTURA_EVENT_ORGANIZER'],
+                ownerId=app.config['KALTURA_KMS_OWNER_ID'],
+                partnerId=app.config['KALTURA_PARTNER_ID'],
+                recurrenceType=KalturaScheduleEventRecurrenceType.RECURRING,
+                status=KalturaScheduleEventStatus.ACTIVE,
+                summary=summary,
+                tags=CREATED_BY_DIABLO_TAG,
+                templateEntryId=base_entry.id,
+            )
+            self._set_event_meeting_attributes(recurring_event, meeting, room)
+            kaltura_schedule = self.client.schedule.scheduleEvent.add(recurring_event)
+
+            self._attach_scheduled_recordings_to_room(kaltura_schedule_id=kaltura_schedule.id, room=room)
+
+        # Results are in order of calls: base entry, category entries, series, event resource.
+        kaltura_schedule_id = results[len(category_ids) + 1].id
+        app.logger.info(f"Kaltura schedule {kaltura_schedule_id} attached to {room['location']}: {results[-1]}")
+        return kaltura_schedule_id
 
     def _set_event_meeting_attributes(self, recurring_event, meeting, room):
         if room:
@@ -417,27 +650,15 @@ class Kaltura:
 
         if 'days' in meeting:
             # Recording starts X minutes before/after official start; it ends Y minutes before/after official end time.
-            days = format_days(meeting['days'])
+            meeting_pattern = get_meeting_pattern_of(meeting)
+            days = list(meeting_pattern.days_formatted)
             start_time = _adjust_time(meeting['startTime'], app.config['KALTURA_RECORDING_OFFSET_START'])
             end_time = _adjust_time(meeting['endTime'], app.config['KALTURA_RECORDING_OFFSET_END'])
 
-            recording_start_date = get_recording_start_date(meeting, return_today_if_past_start=True)
-            recording_end_date = get_recording_end_date(meeting)
-
-            first_day_start = get_first_matching_datetime_of_term(
-                meeting_days=days,
-                start_date=recording_start_date,
-                time_hours=start_time.hour,
-                time_minutes=start_time.minute,
-            )
-            first_day_end = get_first_matching_datetime_of_term(
-                meeting_days=days,
-                start_date=recording_start_date,
-                time_hours=end_time.hour,
-                time_minutes=end_time.minute,
-            )
+            first_day_start = meeting_pattern.get_first_occurrence(time_hours=start_time.hour, time_minutes=start_time.minute)
+            first_day_end = meeting_pattern.get_first_occurrence(time_hours=end_time.hour, time_minutes=end_time.minute)
             until = datetime.combine(
-                recording_end_date,
+                meeting_pattern.recording_end_date,
                 time(end_time.hour, end_time.minute),
                 tzinfo=default_timezone(),
             )
@@ -486,7 +707,7 @@ class Kaltura:
 
     def _attach_scheduled_recordings_to_room(self, kaltura_schedule_id, room):
         utc_now_timestamp = int(datetime.utcnow().timestamp())
-        event_resource = self.client.schedule.scheduleEventResource.add(
+        self.client.schedule.scheduleEventResource.add(
             KalturaScheduleEventResource(
                 eventId=kaltura_schedule_id,
                 resourceId=room['kalturaResourceId'],
@@ -495,15 +716,63 @@ class Kaltura:
                 updatedAt=utc_now_timestamp,
             ),
         )
-        app.logger.info(f"Kaltura schedule {kaltura_schedule_id} attached to {room['location']}: {event_resource}")
 
-    def _detach_scheduled_recordings_from_room(self, kaltura_schedule_id):
-        response = self.client.schedule.scheduleEventResource.list(
-            filter=KalturaScheduleEventResourceFilter(eventIdEqual=kaltura_schedule_id),
-            pager=KalturaFilterPager(),
-        )
-        for o in response.objects:
-            self.client.schedule.scheduleEventResource.delete(kaltura_schedule_id, o.resourceId)
+    @contextmanager
+    def _multirequest(self):
+        # Client calls made within the block are queued, then sent to Kaltura in a single HTTP request when the block exits.
+        # Until then, each call returns a placeholder (e.g., '{1:result}') which can stand in for the result, or for one of
+        # its properties (e.g., entry.id), in later calls of the same block. Results, in order of calls, are added to the
+        # yielded list. The first error reported by Kaltura, if any, is raised.
+        results = []
+        self.client.startMultiRequest()
+        try:
+            yield results
+        except Exception:
+            self.client.callsQueue = []
+            self.client.multiRequestReturnType = None
+            raise
+        results.extend(self.client.doMultiRequest())
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+
+def _get_admin_ks(disable_entitlements):
+    # Start a new session if there is none, or if the cached session is within KALTURA_SESSION_REFRESH_MARGIN seconds of
+    # expiry.
+    with _admin_sessions_lock:
+        session = _admin_sessions.get(disable_entitlements)
+        if not session or session['refresh_at'] <= monotonic():
+            expiry = app.config['KALTURA_EXPIRY'] or DEFAULT_KALTURA_SESSION_EXPIRY
+            refresh_at = monotonic() + max(expiry - app.config['KALTURA_SESSION_REFRESH_MARGIN'], 0)
+            session = {
+                'ks': _start_admin_session(disable_entitlements),
+                'refresh_at': refresh_at,
+            }
+            _admin_sessions[disable_entitlements] = session
+        return session['ks']
+
+
+def _start_admin_session(disable_entitlements):
+    expiry = app.config['KALTURA_EXPIRY']
+    partner_id = app.config['KALTURA_PARTNER_ID']
+    client = _RateLimitedKalturaClient(KalturaConfiguration())
+    result = client.session.startWidgetSession(
+        expiry=expiry,
+        widgetId=f'_{partner_id}',
+    )
+    client.setKs(result.ks)
+
+    token_hash = hashlib.sha256((result.ks + app.config['KALTURA_APP_TOKEN']).encode('ascii')).hexdigest()
+    session_privileges = 'all:*,disableentitlement' if disable_entitlements else ''
+    result = client.appToken.startSession(
+        expiry=expiry,
+        id=app.config['KALTURA_APP_TOKEN_ID'],
+        sessionPrivileges=session_privileges,
+        tokenHash=token_hash,
+        type=KalturaSessionType.ADMIN,
+    )
+    return result.ks
 
 
 def _adjust_time(military_time, offset_minutes):
@@ -517,11 +786,8 @@ def _adjust_time(military_time, offset_minutes):
     ) + timedelta(minutes=offset_minutes)
 
 
-def _category_entry_object_to_json(obj):
-    return {
-        'categoryId': obj.categoryId,
-        'status': obj.status,
-    }
+def _canvas_category_name(canvas_course_site_id):
+    return f'{CANVAS_CATEGORY_PARENT_NAME}>{canvas_course_site_id}'
 
 
 def _category_object_to_json(obj):
@@ -537,39 +803,41 @@ def _category_object_to_json(obj):
     }
 
 
-def _get_kaltura_objects(_fetch):
-    response = _fetch(1)
-    total_count = response.totalCount
-    objects = response.objects
-    for page in range(2, int(total_count / DEFAULT_KALTURA_PAGE_SIZE) + 2):
-        objects += _fetch(page).objects
-    return objects
-
-
 def _to_normalized_set(strings):
     return set([s.strip().lower() for s in strings])
 
 
-def _events_to_api_json(events):
-    # Time to organize. Find 'recurring' events and their corresponding 'recurrences'.
+def _events_to_api_json(events, keep=None):
+    # Time to organize. Find 'recurring' events and their corresponding 'recurrences'. Events are consumed as they stream in:
+    # a recurrence is filed under its series, if the series is already known, or else held until the series shows up. When
+    # 'keep' is given, only events for which keep(event) is true are returned, recurrences going wherever their series goes.
     recurring_events = []
+    series_by_id = {}
+    pending_recurrences = defaultdict(list)
     miscellanea = []
-    for event in [_event_to_json(event) for event in events]:
+    for index, event in enumerate(events):
         if represents_recording_series(event):
-            recurring_events.append(event)
-        else:
-            miscellanea.append(event)
-
-    for recurring_event in recurring_events:
-        def _belongs_in_the_series(e):
-            return e.get('recurrenceType', '').lower() == 'recurrence' and e.get('parentId') == recurring_event['id']
-        # Find events of the series.
-        recurrences = list(filter(lambda e: _belongs_in_the_series(e), miscellanea))
-        recurring_event['recurrences'] = recurrences
-        for recurrence in recurrences:
-            # The 'recurrence' is removed from the generic list.
-            miscellanea.remove(recurrence)
-    return recurring_events + miscellanea
+            event['recurrences'] = [recurrence for _, recurrence in pending_recurrences.pop(event['id'], [])]
+            is_kept = keep is None or keep(event)
+            if event['id'] not in series_by_id:
+                series_by_id[event['id']] = event if is_kept else None
+            if is_kept:
+                recurring_events.append(event)
+        elif (event.get('recurrenceType') or '').lower() == 'recurrence':
+            parent_id = event.get('parentId')
+            if parent_id in series_by_id:
+                series = series_by_id[parent_id]
+                if series:
+                    series['recurrences'].append(event)
+            else:
+                pending_recurrences[parent_id].append((index, event))
+        elif keep is None or keep(event):
+            miscellanea.append((index, event))
+
+    # Recurrences of no known series are listed with the miscellanea, in their original order.
+    for orphans in pending_recurrences.values():
+        miscellanea += [(index, event) for index, event in orphans if keep is None or keep(event)]
+    return recurring_events + [event for _, event in sorted(miscellanea, key=lambda item: item[0])]
 
 
 def _event_to_json(event):
@@ -56,6 +56,7 @@ def _register_jobs(app):
     from diablo.jobs.clear_schedules_job import ClearSchedulesJob  # noqa
     from diablo.jobs.house_keeping_job import HouseKeepingJob  # noqa
     from diablo.jobs.kaltura_job import KalturaJob  # noqa
+    from diablo.jobs.kaltura_events_job import KalturaEventsJob  # noqa
     from diablo.jobs.emails_job import EmailsJob  # noqa
     from diablo.jobs.remind_instructors_job import RemindInstructorsJob  # noqa
     from diablo.jobs.schedule_updates_job import ScheduleUpdatesJob  # noqa
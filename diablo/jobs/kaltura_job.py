@@ -26,8 +26,9 @@ import traceback
 
 from diablo.externals.kaltura import Kaltura
 from diablo.jobs.base_job import BaseJob
-from diablo.jobs.util import get_eligible_unscheduled_courses, notify_newly_scheduled_instructors, remove_blackout_events, schedule_recordings
-from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date, term_name_for_sis_id
+from diablo.jobs.util import get_eligible_unscheduled_courses, notify_newly_scheduled_instructors, remove_blackout_events, schedule_recordings, \
+    schedule_recordings_concurrently, sync_kaltura_events
+from diablo.lib.berkeley import get_meeting_pattern_of, term_name_for_sis_id
 from diablo.lib.kaltura_util import get_series_description
 from diablo.merged.emailer import send_system_error_email
 from diablo.models.course_preference import CoursePreference
@@ -47,6 +48,8 @@ class KalturaJob(BaseJob):
         newly_scheduled_instructors = set()
 
         _schedule_new_courses(term_id, newly_scheduled_instructors)
+        # Existing schedules are compared against the mirror of Kaltura events, which must include the latest changes.
+        sync_kaltura_events()
         _update_already_scheduled_events(term_id, newly_scheduled_instructors)
         notify_newly_scheduled_instructors(term_id, newly_scheduled_instructors)
 
@@ -78,10 +81,9 @@ def _get_subset_of_instructors(section_id, term_id, uids, include_deleted=False)
 def _schedule_new_courses(term_id, newly_scheduled_instructors):
     unscheduled_courses = get_eligible_unscheduled_courses(term_id)
     app.logger.info(f'Preparing to schedule recordings for {len(unscheduled_courses)} courses.')
-    for course in unscheduled_courses:
-        if course['hasOptedOut']:
-            continue
-        schedule_recordings(course, remove_blackout_conflicts=True)
+    courses = [course for course in unscheduled_courses if not course['hasOptedOut']]
+    schedule_recordings_concurrently(courses, remove_blackout_conflicts=True)
+    for course in courses:
         for instructor in list(filter(lambda i: i['roleCode'] in AUTHORIZED_INSTRUCTOR_ROLE_CODES, course['instructors'])):
             newly_scheduled_instructors.add(instructor['uid'])
 
@@ -349,11 +351,12 @@ def _handle_meeting_updates(kaltura, meetings_updated_by_schedule_id, kaltura_sc
     try:
         kaltura.update_schedule_event(scheduled_model, meeting_attributes=meeting)
         if 'days' in meeting:
+            meeting_pattern = get_meeting_pattern_of(meeting)
             scheduled_model.update(
                 meeting_days=meeting['days'],
-                meeting_end_date=get_recording_end_date(meeting),
+                meeting_end_date=meeting_pattern.recording_end_date,
                 meeting_end_time=meeting['endTime'],
-                meeting_start_date=get_recording_start_date(meeting, return_today_if_past_start=True),
+                meeting_start_date=meeting_pattern.get_recording_start_date(return_today_if_past_start=True),
                 meeting_start_time=meeting['startTime'],
             )
             remove_blackout_events(kaltura_schedule_id=scheduled_model.kaltura_schedule_id)
@@ -388,25 +391,28 @@ def _handle_course_site_categories(kaltura, course, publish_to_course_sites, sch
     schedule_ids_to_update = []
     schedule_deletion_required = False
 
-    for scheduled in course['scheduled'] or []:
-        try:
-            kaltura_schedule = kaltura.get_event(event_id=scheduled['kalturaScheduleId'])
-            template_entry_id = kaltura_schedule['templateEntryId']
-            kaltura_categories = kaltura.get_categories(template_entry_id) or []
-            kaltura_category_names = set(c['name'] for c in kaltura_categories if c['id'] != common_category['id'])
+    def _get_kaltura_category_names(event_categories):
+        kaltura_categories = event_categories['categories'] if event_categories else []
+        return set(c['name'] for c in kaltura_categories if c['id'] != common_category['id'])
+
+    kaltura_schedule_ids = [scheduled['kalturaScheduleId'] for scheduled in course['scheduled'] or []]
+    try:
+        categories_per_event = kaltura.get_categories_per_event(kaltura_schedule_ids) if kaltura_schedule_ids else {}
+        for kaltura_schedule_id in kaltura_schedule_ids:
+            kaltura_category_names = _get_kaltura_category_names(categories_per_event.get(kaltura_schedule_id))
 
             if kaltura_category_names.difference(diablo_category_names):
                 schedule_deletion_required = True
             elif diablo_category_names.difference(kaltura_category_names):
-                schedule_ids_to_update.append(scheduled['kalturaScheduleId'])
-        except Exception as e:
-            _mark_error(
-                schedule_updates,
-                e,
-                f"Failed to retrieve existing Kaltura categories from schedule {scheduled['kalturaScheduleId']}",
-                'canvas_site_ids',
-            )
-            return None
+                schedule_ids_to_update.append(kaltura_schedule_id)
+    except Exception as e:
+        _mark_error(
+            schedule_updates,
+            e,
+            f'Failed to retrieve existing Kaltura categories from schedules {kaltura_schedule_ids}',
+            'canvas_site_ids',
+        )
+        return None
 
     if not (schedule_deletion_required or schedule_ids_to_update):
         return None
@@ -429,30 +435,42 @@ def _handle_course_site_categories(kaltura, course, publish_to_course_sites, sch
             )
             return None
 
-    for kaltura_schedule_id in schedule_ids_to_update:
-        try:
-            kaltura_schedule = kaltura.get_event(event_id=kaltura_schedule_id)
-            template_entry_id = kaltura_schedule['templateEntryId']
-            kaltura_categories = kaltura.get_categories(template_entry_id) or []
-            kaltura_category_names = set(c['name'] for c in kaltura_categories if c['id'] != common_category['id'])
-
-            for canvas_course_site_id in updated_canvas_site_ids:
-                if str(canvas_course_site_id) not in kaltura_category_names:
-                    category = kaltura.get_or_create_canvas_category_object(canvas_course_site_id=canvas_course_site_id)
-                    if category:
-                        app.logger.info(f"{course['label']}: add Kaltura category for canvas_course_site {canvas_course_site_id}")
-                        kaltura.add_to_kaltura_category(
-                            category_id=category['id'],
-                            entry_id=template_entry_id,
-                        )
-        except Exception as e:
-            _mark_error(
-                schedule_updates,
-                e,
-                (f'Failed to add Kaltura categories {updated_canvas_site_ids} to Kaltura series {kaltura_schedule_id}'),
-                'canvas_site_ids',
-            )
-            return None
+    if not schedule_ids_to_update:
+        return updated_canvas_site_ids
+
+    try:
+        if schedule_deletion_required:
+            categories_per_event = kaltura.get_categories_per_event(schedule_ids_to_update)
+        missing_site_ids_per_event = {}
+        for kaltura_schedule_id in schedule_ids_to_update:
+            kaltura_category_names = _get_kaltura_category_names(categories_per_event.get(kaltura_schedule_id))
+            missing_site_ids_per_event[kaltura_schedule_id] = [
+                site_id for site_id in updated_canvas_site_ids if str(site_id) not in kaltura_category_names
+            ]
+        missing_site_ids = [
+            site_id for site_id in updated_canvas_site_ids if any(site_id in ids for ids in missing_site_ids_per_event.values())
+        ]
+        canvas_categories = kaltura.get_or_create_canvas_category_objects(canvas_course_site_ids=missing_site_ids) if missing_site_ids else {}
+        for kaltura_schedule_id, site_ids in missing_site_ids_per_event.items():
+            category_ids = []
+            for canvas_course_site_id in site_ids:
+                category = canvas_categories.get(canvas_course_site_id)
+                if category:
+                    app.logger.info(f"{course['label']}: add Kaltura category for canvas_course_site {canvas_course_site_id}")
+                    category_ids.append(category['id'])
+            if category_ids:
+                kaltura.add_to_kaltura_categories(
+                    category_ids=category_ids,
+                    entry_id=categories_per_event[kaltura_schedule_id]['templateEntryId'],
+                )
+    except Exception as e:
+        _mark_error(
+            schedule_updates,
+            e,
+            (f'Failed to add Kaltura categories {updated_canvas_site_ids} to Kaltura series {schedule_ids_to_update}'),
+            'canvas_site_ids',
+        )
+        return None
 
     return updated_canvas_site_ids
 
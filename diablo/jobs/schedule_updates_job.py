@@ -22,16 +22,22 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from datetime import timedelta
 import json
 
+from diablo import db, std_commit
 from diablo.jobs.base_job import BaseJob
 from diablo.jobs.util import build_merged_collaborators_list, is_valid_meeting_schedule
-from diablo.lib.berkeley import are_scheduled_dates_obsolete, are_scheduled_times_obsolete, get_recording_end_date, get_recording_start_date
-from diablo.lib.util import safe_strftime
+from diablo.lib.berkeley import are_scheduled_dates_obsolete, are_scheduled_times_obsolete, get_meeting_pattern_of
+from diablo.lib.util import safe_strftime, utc_now
 from diablo.models.course_preference import CoursePreference
+from diablo.models.cross_listing import CrossListing
+from diablo.models.data_version import DataVersion, ROOMS_VERSION_KEY
+from diablo.models.opt_out import OptOut
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
 from flask import current_app as app
+from sqlalchemy import text
 
 
 class ScheduleUpdatesJob(BaseJob):
@@ -49,8 +55,20 @@ class ScheduleUpdatesJob(BaseJob):
         return 'schedule_updates'
 
 
-def _queue_schedule_updates(term_id):
-    for course in SisSection.get_courses_scheduled(term_id=term_id, include_administrative_proxies=True):
+def _queue_schedule_updates(term_id, section_ids=None):
+    # If section_ids (e.g., sections changed by SIS data refresh) are given then only those courses, plus courses changed
+    # in Diablo since the last run, are checked. Otherwise, or if a full sweep is due, all scheduled courses are checked.
+    # The run (and sweep) is recorded only once every course is checked, as of the time the run started. That time comes from
+    # the database, as do the times of changes it is compared to.
+    started_at = db.session.execute(text('SELECT now()')).scalar()
+    section_ids, keys_to_bump = _get_section_ids_to_check(term_id=term_id, changed_section_ids=section_ids)
+    courses = SisSection.get_courses_scheduled(
+        term_id=term_id,
+        include_administrative_proxies=True,
+        section_ids=section_ids,
+        as_records=True,
+    )
+    for course in courses:
         eligible_meetings = course.get('meetings', {}).get('eligible', [])
         ineligible_meetings = course.get('meetings', {}).get('ineligible', [])
         if course['deletedAt'] or (_valid_meeting_count(eligible_meetings) + _valid_meeting_count(ineligible_meetings) == 0):
@@ -62,6 +80,33 @@ def _queue_schedule_updates(term_id):
         else:
             _queue_meeting_updates(course)
             _queue_instructor_updates(course)
+    DataVersion.bump(keys_to_bump, updated_at=started_at)
+    std_commit()
+
+
+def _get_section_ids_to_check(term_id, changed_section_ids):
+    last_run_key = f'schedule_updates:{term_id}'
+    last_sweep_key = f'schedule_updates_sweep:{term_id}'
+    versions = DataVersion.get_versions([last_run_key, last_sweep_key, ROOMS_VERSION_KEY])
+    last_run_at = versions[last_run_key][1]
+    last_sweep_at = versions[last_sweep_key][1]
+    rooms_updated_at = versions[ROOMS_VERSION_KEY][1]
+    is_full_sweep = changed_section_ids is None \
+        or not last_run_at \
+        or not last_sweep_at \
+        or utc_now() - last_sweep_at > timedelta(hours=app.config['SCHEDULE_UPDATES_FULL_SWEEP_HOURS']) \
+        or (rooms_updated_at and rooms_updated_at >= last_run_at)
+    if is_full_sweep:
+        app.logger.info('Checking all scheduled courses for updates.')
+        return None, [last_run_key, last_sweep_key]
+    section_ids = set(changed_section_ids)
+    if section_ids:
+        section_ids.update(CrossListing.get_principal_section_ids(section_ids=section_ids, term_id=term_id))
+    # Preferences and opt-outs change in Diablo, not SIS.
+    section_ids.update(DataVersion.get_changed_course_section_ids(term_id=term_id, since=last_run_at))
+    section_ids.update(OptOut.get_scheduled_section_ids_opted_out(term_id=term_id))
+    app.logger.info(f'Checking {len(section_ids)} sections for schedule updates.')
+    return sorted(section_ids), [last_run_key]
 
 
 def _queue_not_scheduled_update(course):
@@ -70,7 +115,7 @@ def _queue_not_scheduled_update(course):
         term_id=course['termId'],
         section_id=course['sectionId'],
         field_name='not_scheduled',
-        field_value_old=json.dumps(scheduled),
+        field_value_old=json.dumps(scheduled.to_api_json()),
         field_value_new=None,
     )
     _downgrade_recording_type(course)
@@ -146,8 +191,7 @@ def _queue_meeting_updates(course):
                     'days': meeting['days'],
                     'startTime': meeting['startTime'],
                     'endTime': meeting['endTime'],
-                    'startDate': safe_strftime(get_recording_start_date(meeting, return_today_if_past_start=True), '%Y-%m-%d'),
-                    'endDate': safe_strftime(get_recording_end_date(meeting), '%Y-%m-%d'),
+                    **_get_recording_dates(meeting),
                     'room': _get_room_summary(meeting),
                 }),
             )
@@ -186,8 +230,7 @@ def _queue_meeting_updates(course):
                     'days': meeting['days'],
                     'startTime': meeting['startTime'],
                     'endTime': meeting['endTime'],
-                    'startDate': safe_strftime(get_recording_start_date(meeting, return_today_if_past_start=True), '%Y-%m-%d'),
-                    'endDate': safe_strftime(get_recording_end_date(meeting), '%Y-%m-%d'),
+                    **_get_recording_dates(meeting),
                 }
             if meeting.get('room', {}).get('id') != scheduled.get('room', {}).get('id'):
                 meeting_old.update({'room': _get_room_summary(scheduled)})
@@ -258,6 +301,14 @@ def _downgrade_recording_type(course):
     )
 
 
+def _get_recording_dates(meeting):
+    meeting_pattern = get_meeting_pattern_of(meeting)
+    return {
+        'startDate': safe_strftime(meeting_pattern.get_recording_start_date(return_today_if_past_start=True), '%Y-%m-%d'),
+        'endDate': safe_strftime(meeting_pattern.recording_end_date, '%Y-%m-%d'),
+    }
+
+
 def _is_in_auditorium(meeting):
     room = meeting.get('room')
     if room and 'presenter_presentation_audio_with_operator' in room.get('recordingTypeOptions', {}):
@@ -22,26 +22,38 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from concurrent.futures import ThreadPoolExecutor
+
+from diablo import db, std_commit
 from diablo.externals.rds import execute
 from diablo.jobs.base_job import BaseJob
 from diablo.jobs.errors import BackgroundJobError
 from diablo.jobs.schedule_updates_job import _queue_schedule_updates
-from diablo.jobs.util import insert_or_update_instructors, refresh_cross_listings, refresh_rooms
+from diablo.jobs.util import refresh_cross_listings, refresh_instructors, refresh_rooms
 from diablo.lib.db import resolve_sql_template
+from diablo.models.cross_listing import CrossListing
+from diablo.models.eligible_section import refresh_eligible_sections
+from diablo.models.sis_refresh_log import SisRefreshLog
 from diablo.models.sis_section import SisSection
 from flask import current_app as app
+from sqlalchemy import text
 
 
 class SisDataRefreshJob(BaseJob):
 
     def _run(self, args=None):
-        term_id = app.config['CURRENT_TERM_ID']
+        term_ids = (args or {}).get('term_ids') or get_sis_refresh_term_ids()
         try:
-            refresh = execute(resolve_sql_template('update_rds_sis_sections.template.sql'))
-            if not refresh:
-                raise BackgroundJobError('Failed to update RDS SIS sections from Nessie.')
-            self.after_sis_data_refresh(term_id)
-            _queue_schedule_updates(term_id)
+            _for_each_term(term_ids, _load_sis_sections)
+            changed_section_ids_per_term = self.after_sis_data_refresh(term_ids=term_ids)
+            for term_id, changed_section_ids in changed_section_ids_per_term.items():
+                # Schedule updates are checked for sections with changed SIS rows or cross-listings.
+                changed_section_ids = set(changed_section_ids)
+                refresh_log = SisRefreshLog.get_latest(term_id)
+                if refresh_log:
+                    changed_section_ids.update(refresh_log.changed_section_ids)
+                app.logger.info(f'{len(changed_section_ids)} sections changed in term {term_id}.')
+                _queue_schedule_updates(term_id, section_ids=changed_section_ids)
         except Exception as e:
             app.logger.exception(e)
             raise BackgroundJobError('Failed to refresh SIS data.')
@@ -55,14 +67,78 @@ class SisDataRefreshJob(BaseJob):
         return 'sis_data_refresh'
 
     @classmethod
-    def after_sis_data_refresh(cls, term_id):
+    def after_sis_data_refresh(cls, term_ids):
+        # Instructors and rooms are shared by all terms, so they are refreshed once. Per-term refreshes run concurrently.
         app.logger.info('Starting instructor update')
-        distinct_instructor_uids = SisSection.get_distinct_instructor_uids()
-        insert_or_update_instructors(distinct_instructor_uids)
-        app.logger.info(f'{len(distinct_instructor_uids)} instructors updated')
+        instructor_uids, distinct_instructor_uids = refresh_instructors()
+        app.logger.info(f'{len(instructor_uids)} of {len(distinct_instructor_uids)} instructors updated')
 
         refresh_rooms()
         app.logger.info('RDS indexes updated.')
+        std_commit()
+
+        return _for_each_term(term_ids, _after_term_refresh)
+
+
+def get_sis_refresh_term_ids():
+    return app.config['SIS_REFRESH_TERM_IDS'] or [app.config['CURRENT_TERM_ID']]
+
+
+def _for_each_term(term_ids, fn):
+    # Return {term_id: fn(term_id)}. With many terms, each runs in its own thread, app context and database connection.
+    if len(term_ids) == 1:
+        return {term_ids[0]: fn(term_ids[0])}
+    app_ = app._get_current_object()
+
+    def _run_in_app_context(term_id):
+        with app_.app_context():
+            return fn(term_id)
+    with ThreadPoolExecutor(max_workers=len(term_ids)) as executor:
+        return dict(zip(term_ids, executor.map(_run_in_app_context, term_ids)))
+
+
+def _load_sis_sections(term_id):
+    staged = execute(resolve_sql_template('stage_rds_sis_sections.template.sql', term_id=term_id))
+    if not staged:
+        raise BackgroundJobError(f'Failed to stage SIS sections of term {term_id} from Nessie.')
+    _validate_staged_sis_sections(term_id)
+    refresh = execute(resolve_sql_template('update_rds_sis_sections.template.sql', term_id=term_id))
+    if not refresh:
+        raise BackgroundJobError(f'Failed to update RDS SIS sections of term {term_id} from Nessie.')
+
+
+def _after_term_refresh(term_id):
+    cross_listings_before = CrossListing.get_cross_listings(term_id=term_id)
+    cross_listings = refresh_cross_listings(term_id=term_id)
+    app.logger.info(f'Cross-listings of term {term_id} updated.')
+
+    refresh_eligible_sections(term_id=term_id)
+    app.logger.info(f'Eligible sections of term {term_id} updated.')
+
+    feed_count = SisSection.refresh_course_feeds(term_id=term_id)
+    app.logger.info(f'{feed_count} course feeds of term {term_id} refreshed.')
+
+    # Return ids of sections whose cross-listings changed.
+    changed_section_ids = set()
+    for section_id in set(cross_listings_before) | set(cross_listings):
+        before = cross_listings_before.get(section_id, [])
+        after = cross_listings.get(section_id, [])
+        if sorted(before) != sorted(after):
+            changed_section_ids.update([section_id] + before + after)
+    # This runs in an app context of its own when several terms are refreshed, so commit rather than rely on teardown.
+    std_commit()
+    return sorted(changed_section_ids)
+
 
-        refresh_cross_listings(term_id=term_id)
-        app.logger.info('Cross-listings updated.')
+def _validate_staged_sis_sections(term_id):
+    sql = """
+        SELECT
+            (SELECT COUNT(*) FROM sis_sections_staged WHERE term_id = :term_id) AS staged_count,
+            (SELECT COUNT(*) FROM sis_sections WHERE term_id = :term_id AND deleted_at IS NULL) AS current_count
+    """
+    row = db.session.execute(text(sql), {'term_id': term_id}).first()
+    staged_count, current_count = row['staged_count'], row['current_count']
+    app.logger.info(f'{staged_count} SIS rows staged; {current_count} in sis_sections.')
+    # A term new to Diablo (e.g., the upcoming term, early on) may have no rows yet, in SIS or here.
+    if current_count and (not staged_count or staged_count < current_count * app.config['SIS_REFRESH_MIN_STAGED_ROW_RATIO']):
+        raise BackgroundJobError(f'Refusing to refresh {current_count} SIS rows with {staged_count} staged rows.')
@@ -22,13 +22,15 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from itertools import islice
 import re
 import traceback
 
 from diablo import db, std_commit
-from diablo.externals.kaltura import CREATED_BY_DIABLO_TAG, Kaltura
-from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date
+from diablo.externals.kaltura import CREATED_BY_DIABLO_TAG, DEFAULT_KALTURA_PAGE_SIZE, Kaltura
+from diablo.lib.berkeley import get_meeting_pattern_of
 from diablo.lib.kaltura_util import represents_recording_series
 from diablo.lib.util import localize_datetime, utc_now
 from diablo.merged.calnet import get_calnet_users_for_uids
@@ -37,12 +39,13 @@ from diablo.models.blackout import Blackout
 from diablo.models.course_preference import CoursePreference
 from diablo.models.cross_listing import CrossListing
 from diablo.models.instructor import Instructor
-from diablo.models.opt_out import OptOut
+from diablo.models.instructor_section import InstructorSection
+from diablo.models.kaltura_event import KalturaEvent
 from diablo.models.queued_email import notify_instructor_recordings_scheduled
 from diablo.models.room import Room
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.scheduled import Scheduled
-from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
+from diablo.models.sis_section import ALL_INSTRUCTOR_ROLE_CODES, AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
 from flask import current_app as app
 from KalturaClient.Plugins.Schedule import KalturaScheduleEventRecurrenceType
 from sqlalchemy import text
@@ -87,8 +90,9 @@ def build_merged_collaborators_list(course, manually_set_collaborator_uids):
         return set(manually_set_collaborator_uids)
 
 
-def get_eligible_courses(term_id):
+def get_eligible_courses(term_id, as_records=False):
     return SisSection.get_courses(
+        as_records=as_records,
         include_administrative_proxies=True,
         term_id=term_id,
     )
@@ -110,6 +114,19 @@ def get_scheduled_courses_per_instructor_uids(term_id, instructor_uids):
     )
 
 
+def refresh_instructors():
+    distinct_instructor_uids = SisSection.get_distinct_instructor_uids()
+    ttl_days = app.config['INSTRUCTOR_VERIFICATION_TTL_DAYS']
+    instructor_uids = Instructor.get_uids_to_verify(
+        uids=distinct_instructor_uids,
+        verified_before=utc_now() - timedelta(days=ttl_days),
+        stale_limit=app.config['INSTRUCTOR_VERIFICATION_MAX_STALE'],
+    )
+    if instructor_uids:
+        insert_or_update_instructors(instructor_uids)
+    return instructor_uids, distinct_instructor_uids
+
+
 def insert_or_update_instructors(instructor_uids):
     instructors = []
     for instructor in get_calnet_users_for_uids(app=app, uids=instructor_uids).values():
@@ -163,60 +180,60 @@ def refresh_cross_listings(term_id):
     #  3. We collapse the names of the three section into a single name/title for section 123
 
     # IMPORTANT: These will be ordered by schedule (time and location)
+    _create_cross_listing_schedules_table()
     sql = """
-                SELECT
-                    section_id,
-                    trim(concat(
-                        meeting_days,
-                        meeting_end_date,
-                        meeting_end_time,
-                        meeting_location,
-                        meeting_start_date,
-                        meeting_start_time
-                    )) as schedule
-                FROM sis_sections
-                WHERE
-                    term_id = :term_id
-                    AND meeting_days <> ''
-                    AND meeting_end_date IS NOT NULL
-                    AND meeting_end_time <> ''
-                    AND meeting_location IS NOT NULL
-                    AND meeting_location NOT IN ('', 'Internet/Online', 'Off Campus', 'Requested General Assignment')
-                    AND meeting_start_date IS NOT NULL
-                    AND meeting_start_time <> ''
-                    AND deleted_at IS NULL
-                ORDER BY schedule, section_id
-            """
-    rows = []
-    for row in db.session.execute(text(sql), {'term_id': term_id}):
-        rows.append({'schedule': row['schedule'], 'section_id': row['section_id']})
-    register_cross_listings(rows, term_id)
-
-
-def register_cross_listings(rows, term_id):  # noqa C901
-    cross_listings = {}
-    previous_schedule = None
-    primary_section = None
-
-    for row in rows:
-        section_id = row['section_id']
-        schedule = row['schedule']
-        if section_id not in cross_listings:
-            if schedule == previous_schedule:
-                primary_schedule = primary_section['schedule']
-                primary_section_id = primary_section['section_id']
-                if section_id not in cross_listings[primary_section_id] and schedule == primary_schedule:
-                    cross_listings[primary_section_id].append(section_id)
-            else:
-                primary_section = row
-                cross_listings[primary_section['section_id']] = []
-        previous_schedule = schedule
-
-    # Toss out section_ids with no cross-listings
-    for section_id, section_ids in cross_listings.copy().items():
-        if not section_ids:
-            cross_listings.pop(section_id)
+        INSERT INTO tmp_cross_listing_schedules (ordinal, schedule, section_id)
+        SELECT row_number() OVER (ORDER BY schedule, section_id), schedule, section_id
+        FROM (
+            SELECT
+                section_id,
+                trim(concat(
+                    meeting_days,
+                    meeting_end_date,
+                    meeting_end_time,
+                    meeting_location,
+                    meeting_start_date,
+                    meeting_start_time
+                )) as schedule
+            FROM sis_sections
+            WHERE
+                term_id = :term_id
+                AND meeting_days <> ''
+                AND meeting_end_date IS NOT NULL
+                AND meeting_end_time <> ''
+                AND meeting_location IS NOT NULL
+                AND meeting_location NOT IN ('', 'Internet/Online', 'Off Campus', 'Requested General Assignment')
+                AND meeting_start_date IS NOT NULL
+                AND meeting_start_time <> ''
+                AND deleted_at IS NULL
+        ) s
+    """
+    db.session.execute(text(sql), {'term_id': term_id})
+    return _register_cross_listings(term_id)
+
+
+def register_cross_listings(rows, term_id):
+    # Rows of section_id and schedule, ordered by schedule.
+    _create_cross_listing_schedules_table()
+    sql = """
+        INSERT INTO tmp_cross_listing_schedules (ordinal, schedule, section_id)
+        SELECT r.ordinal, r.schedule, r.section_id
+        FROM unnest(CAST(:schedules AS TEXT[]), CAST(:section_ids AS INTEGER[])) WITH ORDINALITY AS r(schedule, section_id, ordinal)
+    """
+    params = {
+        'schedules': [row['schedule'] for row in rows],
+        'section_ids': [row['section_id'] for row in rows],
+    }
+    db.session.execute(text(sql), params)
+    return _register_cross_listings(term_id)
+
+
+def _create_cross_listing_schedules_table():
+    db.session.execute(text('DROP TABLE IF EXISTS tmp_cross_listing_schedules'))
+    db.session.execute(text('CREATE TEMPORARY TABLE tmp_cross_listing_schedules (ordinal BIGINT, schedule TEXT, section_id INTEGER)'))
 
+
+def _register_cross_listings(term_id):
     # These tables link by section id to the principal cross-listing only.
     principal_listing_linked_tables = ('queued_emails', 'schedule_updates', 'scheduled')
     # These tables link by section id to all cross-listings.
@@ -230,24 +247,37 @@ def register_cross_listings(rows, term_id):  # noqa C901
     # Prepare for refresh by deleting old rows
     db.session.execute(CrossListing.__table__.delete().where(CrossListing.term_id == term_id))
 
-    def chunks(data, chunk_size=500):
-        iterator = iter(data)
-        for i in range(0, len(data), chunk_size):
-            yield {k: data[k] for k in islice(iterator, chunk_size)}
-
-    non_principal_section_ids = []
-
-    for cross_listings_chunk in chunks(cross_listings):
-        cross_listing_count = len(cross_listings_chunk)
-        query = 'INSERT INTO cross_listings (term_id, section_id, cross_listed_section_ids, created_at) VALUES'
-        for index, (section_id, cross_listed_section_ids) in enumerate(cross_listings_chunk.items()):
-            query += f' (:term_id, {section_id}, ' + "'{" + _join(cross_listed_section_ids, ', ') + "}', now())"
-            if index < cross_listing_count - 1:
-                query += ','
-            non_principal_section_ids.extend(cross_listed_section_ids)
-        db.session.execute(query, {'term_id': term_id})
+    # Sections sharing a schedule are cross-listed, and the lowest section_id is the principal listing. Walking schedules
+    # in order, a section already the principal listing of an earlier schedule is not cross-listed again: if it is the
+    # lowest section_id then the whole schedule is skipped.
+    sql = """
+        WITH schedules AS (
+            SELECT schedule, MIN(ordinal) AS ordinal, MIN(section_id) AS section_id
+            FROM tmp_cross_listing_schedules
+            GROUP BY schedule
+        ),
+        principal_schedules AS (
+            SELECT DISTINCT ON (section_id) schedule, ordinal, section_id
+            FROM schedules
+            ORDER BY section_id, ordinal
+        )
+        INSERT INTO cross_listings (term_id, section_id, cross_listed_section_ids, created_at)
+        SELECT :term_id, p.section_id, array_agg(DISTINCT t.section_id ORDER BY t.section_id), now()
+        FROM principal_schedules p
+        JOIN tmp_cross_listing_schedules t ON t.schedule = p.schedule AND t.section_id <> p.section_id
+        WHERE NOT EXISTS (
+            SELECT FROM schedules s WHERE s.section_id = t.section_id AND s.ordinal < p.ordinal
+        )
+        GROUP BY p.section_id
+        RETURNING section_id, cross_listed_section_ids
+    """
+    rows = db.session.execute(text(sql), {'term_id': term_id})
+    cross_listings = {row['section_id']: row['cross_listed_section_ids'] for row in rows}
+    db.session.execute(text('DROP TABLE tmp_cross_listing_schedules'))
+    CrossListing.refresh_metadata(term_id=term_id, instructor_role_codes=ALL_INSTRUCTOR_ROLE_CODES)
 
     # Mark cross-listed section_ids as non-principal listings to keep duplicate results out of SisSection queries.
+    non_principal_section_ids = [section_id for section_ids in cross_listings.values() for section_id in section_ids]
     SisSection.set_non_principal_listings(section_ids=non_principal_section_ids, term_id=term_id)
 
     # Update any Diablo tables pointing to no-longer-principal section listings.
@@ -255,11 +285,10 @@ def register_cross_listings(rows, term_id):  # noqa C901
         update_no_longer_principal_listing_references(term_id, table)
 
     # Add in any needed Diablo table rows for entirely new cross-listings.
-    for section_id, section_ids in cross_listings.items():
-        all_section_ids = section_ids + [section_id]
-        for tablename in all_listing_linked_tables:
-            update_new_cross_listings(term_id, all_section_ids, tablename)
+    for tablename in all_listing_linked_tables:
+        update_new_cross_listings(term_id, tablename)
 
+    InstructorSection.refresh(term_id=term_id, instructor_role_codes=AUTHORIZED_INSTRUCTOR_ROLE_CODES)
     std_commit()
     return cross_listings
 
@@ -290,54 +319,188 @@ def update_no_longer_principal_listing_references(term_id, tablename):
     db.session.execute(text(sql), {'term_id': term_id})
 
 
-def update_new_cross_listings(term_id, section_ids, tablename):
-    # Copy preferences and opt-out settings to any newly added cross-listings.
-    sql = f'SELECT * FROM {tablename} WHERE term_id = :term_id AND section_id = ANY(:section_ids)'
-    rows = list(db.session.execute(text(sql), {'term_id': term_id, 'section_ids': section_ids}))
-    if not rows:
-        return
-    new_section_ids = set(section_ids) - set(r['section_id'] for r in rows)
-    for new_section_id in new_section_ids:
-        if tablename == 'course_preferences':
-            db.session.add(CoursePreference(
-                term_id=term_id,
-                section_id=new_section_id,
-                publish_type=rows[0]['publish_type'],
-                recording_type=rows[0]['recording_type'],
-                canvas_site_ids=rows[0]['canvas_site_ids'],
-                collaborator_uids=rows[0]['collaborator_uids'],
-            ))
-        elif tablename == 'opt_outs':
-            db.session.add(OptOut(
-                term_id=term_id,
-                section_id=new_section_id,
-                instructor_uid=rows[0]['instructor_uid'],
-            ))
+def update_new_cross_listings(term_id, tablename):
+    # Copy preferences and opt-out settings to any newly added cross-listings. Within each set of cross-listings, the row
+    # of the lowest section_id is copied to sections with no row.
+    columns = {
+        'course_preferences': 'publish_type, recording_type, canvas_site_ids, collaborator_uids',
+        'opt_outs': 'instructor_uid',
+    }[tablename]
+    sql = f"""
+        WITH listings AS (
+            SELECT section_id AS principal_section_id, section_id FROM cross_listings WHERE term_id = :term_id
+            UNION ALL
+            SELECT section_id, UNNEST(cross_listed_section_ids) FROM cross_listings WHERE term_id = :term_id
+        ),
+        sources AS (
+            SELECT DISTINCT ON (l.principal_section_id) l.principal_section_id, t.*
+            FROM listings l
+            JOIN {tablename} t ON t.term_id = :term_id AND t.section_id = l.section_id
+            ORDER BY l.principal_section_id, t.section_id, t.created_at
+        )
+        INSERT INTO {tablename} (term_id, section_id, {columns}, created_at)
+        SELECT DISTINCT ON (l.section_id) :term_id, l.section_id, {columns}, now()
+        FROM listings l
+        JOIN sources s ON s.principal_section_id = l.principal_section_id
+        WHERE NOT EXISTS (
+            SELECT FROM {tablename} t WHERE t.term_id = :term_id AND t.section_id = l.section_id
+        )
+        ORDER BY l.section_id, l.principal_section_id
+    """
+    db.session.execute(text(sql), {'term_id': term_id})
 
 
 def remove_blackout_events(kaltura_schedule_id=None):
+    if kaltura_schedule_id is None:
+        # Blackouts apply to recordings scheduled moments ago, too, so bring the mirror of Kaltura events up to date.
+        sync_kaltura_events()
     kaltura = Kaltura()
+    for blackout in _get_current_blackouts():
+        _remove_blackout_events(kaltura, blackout, kaltura_schedule_id)
+
+
+def schedule_recordings(course, remove_blackout_conflicts=False, updates=None):
+    meetings_to_schedule = _get_meetings_to_schedule(course, updates)
+    if meetings_to_schedule is None:
+        return None
+    all_scheduled = []
+    for meeting_to_schedule in meetings_to_schedule:
+        try:
+            kaltura_schedule_id = _schedule_in_kaltura(Kaltura(), meeting_to_schedule)
+            if remove_blackout_conflicts:
+                remove_blackout_events(kaltura_schedule_id=kaltura_schedule_id)
+            all_scheduled.append(_create_scheduled(meeting_to_schedule, kaltura_schedule_id))
+        except Exception as e:
+            _report_scheduling_error(course, e)
+    return all_scheduled
+
+
+def schedule_recordings_concurrently(courses, remove_blackout_conflicts=False):
+    # Same as schedule_recordings, per course, but Kaltura calls for up to KALTURA_SCHEDULING_MAX_WORKERS meetings are in flight
+    # at once. Workers do not touch the database: reads happen up front and writes, including those to the mirror of Kaltura
+    # events, are made by this thread, in course order, so results match serial scheduling.
+    meetings_to_schedule_per_course = [_get_meetings_to_schedule(course) for course in courses]
+    blackouts = _get_current_blackouts() if remove_blackout_conflicts else []
+    app_ = app._get_current_object()
+    kaltura = Kaltura()
+
+    def _schedule(meeting_to_schedule):
+        with app_.app_context():
+            worker_kaltura = Kaltura(defer_mirror_refresh=True)
+            kaltura_schedule_id = _schedule_in_kaltura(worker_kaltura, meeting_to_schedule)
+            for blackout in blackouts:
+                _remove_blackout_events(worker_kaltura, blackout, kaltura_schedule_id)
+            return kaltura_schedule_id
+
+    scheduled_per_course = []
+    with ThreadPoolExecutor(max_workers=app.config['KALTURA_SCHEDULING_MAX_WORKERS']) as executor:
+        futures_per_course = [
+            [executor.submit(_schedule, m) for m in meetings_to_schedule] if meetings_to_schedule is not None else None
+            for meetings_to_schedule in meetings_to_schedule_per_course
+        ]
+        for course, meetings_to_schedule, futures in zip(courses, meetings_to_schedule_per_course, futures_per_course):
+            if meetings_to_schedule is None:
+                scheduled_per_course.append(None)
+                continue
+            all_scheduled = []
+            for meeting_to_schedule, future in zip(meetings_to_schedule, futures):
+                try:
+                    kaltura_schedule_id = future.result()
+                    kaltura.refresh_mirrored_events(event_ids=[kaltura_schedule_id])
+                    all_scheduled.append(_create_scheduled(meeting_to_schedule, kaltura_schedule_id))
+                except Exception as e:
+                    _report_scheduling_error(course, e)
+            scheduled_per_course.append(all_scheduled)
+    return scheduled_per_course
+
+
+def sync_kaltura_events():
+    # Incremental sync asks Kaltura for events updated since the start of the last sync, less KALTURA_EVENTS_SYNC_OVERLAP. The
+    # first sync copies every event. Progress is committed page by page; the sync is marked done only at the end.
+    if not KalturaEvent.is_enabled():
+        app.logger.info('Mirror of Kaltura events is disabled; sync skipped.')
+        return
+    synced_at = KalturaEvent.get_synced_at()
+    updated_since = synced_at and synced_at - timedelta(seconds=app.config['KALTURA_EVENTS_SYNC_OVERLAP'])
+    sync_started_at = utc_now()
+    kaltura = Kaltura()
+    events = iter(kaltura.iter_events_updated_since(updated_since=updated_since))
+    event_count = 0
+    while True:
+        page = list(islice(events, DEFAULT_KALTURA_PAGE_SIZE))
+        if not page:
+            break
+        KalturaEvent.upsert(page)
+        # Rooms are attached to series and one-off events, not to recurrences.
+        event_ids = [event['id'] for event in page if event['recurrenceType'] != 'Recurrence']
+        KalturaEvent.update_resource_ids(kaltura.get_resource_ids_per_event(event_ids) if event_ids else {})
+        std_commit()
+        event_count += len(page)
+    KalturaEvent.mark_synced(synced_at=sync_started_at)
+    std_commit()
+    app.logger.info(f"Synced {event_count} Kaltura events {f'updated since {updated_since}' if updated_since else '(full sync)'}")
+
+
+def notify_newly_scheduled_instructors(term_id, instructor_uids):
+    courses_by_instructor_uid = {}
+    for course in get_scheduled_courses_per_instructor_uids(term_id, instructor_uids):
+        for instructor in list(filter(lambda i: i['roleCode'] in AUTHORIZED_INSTRUCTOR_ROLE_CODES, course['instructors'])):
+            if instructor['uid'] not in courses_by_instructor_uid:
+                courses_by_instructor_uid[instructor['uid']] = {'instructor': instructor, 'courses': []}
+            courses_by_instructor_uid[instructor['uid']]['courses'].append(course)
+    for uid, instructor_courses in courses_by_instructor_uid.items():
+        notify_instructor_recordings_scheduled(instructor_courses['instructor'], instructor_courses['courses'])
+
+
+def _create_scheduled(meeting_to_schedule, kaltura_schedule_id):
+    meeting = meeting_to_schedule['meeting']
+    section_id = meeting_to_schedule['section_id']
+    term_id = meeting_to_schedule['term_id']
+    collaborator_uids = [collaborator['uid'] for collaborator in meeting_to_schedule['collaborators']]
+    meeting_pattern = get_meeting_pattern_of(meeting)
+
+    scheduled = Scheduled.create(
+        course_display_name=meeting_to_schedule['course_label'],
+        instructor_uids=[instructor['uid'] for instructor in meeting_to_schedule['instructors']],
+        collaborator_uids=collaborator_uids,
+        kaltura_schedule_id=kaltura_schedule_id,
+        meeting_days=meeting['days'],
+        meeting_end_date=meeting_pattern.recording_end_date,
+        meeting_end_time=meeting['endTime'],
+        meeting_start_date=meeting_pattern.get_recording_start_date(return_today_if_past_start=True),
+        meeting_start_time=meeting['startTime'],
+        publish_type_=meeting_to_schedule['publish_type'],
+        recording_type_=meeting_to_schedule['recording_type'],
+        room_id=meeting_to_schedule['room']['id'],
+        section_id=section_id,
+        term_id=term_id,
+    )
+    CoursePreference.update_collaborator_uids(
+        term_id=term_id,
+        section_id=section_id,
+        collaborator_uids=collaborator_uids,
+    )
+    app.logger.info(f'Recordings scheduled for course {section_id}')
+    return scheduled
+
+
+def _get_current_blackouts():
+    # Past blackouts are deleted. The rest are returned as plain dicts, safe to share with worker threads.
+    blackouts = []
     for blackout in Blackout.all_blackouts():
         if blackout.end_date < utc_now():
             app.logger.info(f'Removing past blackout: {blackout}')
             Blackout.delete_blackout(blackout.id)
         else:
-            end_date = localize_datetime(blackout.end_date)
-            start_date = localize_datetime(blackout.start_date)
-            events = kaltura.get_events_in_date_range(
-                end_date=end_date,
-                kaltura_schedule_id=kaltura_schedule_id,
-                recurrence_type=KalturaScheduleEventRecurrenceType.RECURRENCE,
-                start_date=start_date,
-            )
-            for event in events:
-                created_by_diablo = CREATED_BY_DIABLO_TAG in event['tags']
-                if created_by_diablo and not represents_recording_series(event):
-                    kaltura.delete(event['id'])
-                    app.logger.info(f"'Event {event['summary']} deleted per {blackout}.")
+            blackouts.append({
+                'endDate': localize_datetime(blackout.end_date),
+                'name': blackout.name,
+                'startDate': localize_datetime(blackout.start_date),
+            })
+    return blackouts
 
 
-def schedule_recordings(course, remove_blackout_conflicts=False, updates=None):
+def _get_meetings_to_schedule(course, updates=None):
     def _report_error(subject):
         message = f'{subject}\n\n<pre>{course}</pre>'
         app.logger.error(message)
@@ -365,8 +528,7 @@ def schedule_recordings(course, remove_blackout_conflicts=False, updates=None):
     # code to give these users access in Kaltura but not include them in the series description.
     collaborators = [{'uid': collaborator_uid, 'roleCode': 'Collaborator'} for collaborator_uid in collaborator_uids]
 
-    all_scheduled = []
-
+    meetings_to_schedule = []
     for meeting in meetings:
         location = meeting.get('room', {}).get('location')
         room = Room.find_room(location=location)
@@ -378,82 +540,63 @@ def schedule_recordings(course, remove_blackout_conflicts=False, updates=None):
             _report_error(subject=f"{course['label']} not scheduled. Invalid SIS meeting schedule.")
             continue
 
-        term_id = course['termId']
-        section_id = int(course['sectionId'])
         if room.kaltura_resource_id:
-            try:
-                kaltura_schedule_id = Kaltura().schedule_recording(
-                    canvas_course_site_ids=course['canvasSiteIds'],
-                    course_label=course['label'],
-                    instructors=(instructors + collaborators),
-                    meeting=meeting,
-                    publish_type=publish_type,
-                    recording_type=recording_type,
-                    room=room,
-                    term_id=term_id,
-                )
-
-                if remove_blackout_conflicts:
-                    remove_blackout_events(kaltura_schedule_id=kaltura_schedule_id)
-
-                collaborator_uids = [collaborator['uid'] for collaborator in collaborators]
-
-                scheduled = Scheduled.create(
-                    course_display_name=course['label'],
-                    instructor_uids=[instructor['uid'] for instructor in instructors],
-                    collaborator_uids=collaborator_uids,
-                    kaltura_schedule_id=kaltura_schedule_id,
-                    meeting_days=meeting['days'],
-                    meeting_end_date=get_recording_end_date(meeting),
-                    meeting_end_time=meeting['endTime'],
-                    meeting_start_date=get_recording_start_date(meeting, return_today_if_past_start=True),
-                    meeting_start_time=meeting['startTime'],
-                    publish_type_=publish_type,
-                    recording_type_=recording_type,
-                    room_id=room.id,
-                    section_id=section_id,
-                    term_id=term_id,
-                )
-                CoursePreference.update_collaborator_uids(
-                    term_id=term_id,
-                    section_id=section_id,
-                    collaborator_uids=collaborator_uids,
-                )
-
-                all_scheduled.append(scheduled)
-                app.logger.info(f'Recordings scheduled for course {section_id}')
-
-            except Exception as e:
-                # Exceptions generated by the Kaltura API client will include one of these codes:
-                # https://developer.kaltura.com/api-docs/Error_Codes. Otherwise they're standard Python exceptions.
-                summary = f"Failed to schedule recordings {course['label']} (section_id: {course['sectionId']})"
-                app.logger.error(summary)
-                app.logger.exception(e)
-                send_system_error_email(
-                    message=f'{summary}\n\n<pre>{traceback.format_exc()}</pre>',
-                    subject=f'{summary[:50]}...' if len(summary) > 50 else summary,
-                )
-
+            # Everything Kaltura needs is resolved here, so that scheduling can proceed without the database.
+            meetings_to_schedule.append({
+                'canvas_course_site_ids': course['canvasSiteIds'],
+                'collaborators': collaborators,
+                'course_label': course['label'],
+                'instructors': instructors,
+                'meeting': meeting,
+                'publish_type': publish_type,
+                'recording_type': recording_type,
+                'room': room.to_api_json(),
+                'section_id': int(course['sectionId']),
+                'term_id': course['termId'],
+            })
         else:
             app.logger.warn(f"""
                 SKIP schedule recordings because room has no 'kaltura_resource_id'.
                 Course: {course['label']}
                 Room: {room.location}
             """)
-
-    return all_scheduled
+    return meetings_to_schedule
 
 
-def notify_newly_scheduled_instructors(term_id, instructor_uids):
-    courses_by_instructor_uid = {}
-    for course in get_scheduled_courses_per_instructor_uids(term_id, instructor_uids):
-        for instructor in list(filter(lambda i: i['roleCode'] in AUTHORIZED_INSTRUCTOR_ROLE_CODES, course['instructors'])):
-            if instructor['uid'] not in courses_by_instructor_uid:
-                courses_by_instructor_uid[instructor['uid']] = {'instructor': instructor, 'courses': []}
-            courses_by_instructor_uid[instructor['uid']]['courses'].append(course)
-    for uid, instructor_courses in courses_by_instructor_uid.items():
-        notify_instructor_recordings_scheduled(instructor_courses['instructor'], instructor_courses['courses'])
+def _remove_blackout_events(kaltura, blackout, kaltura_schedule_id):
+    events = kaltura.get_events_in_date_range(
+        end_date=blackout['endDate'],
+        kaltura_schedule_id=kaltura_schedule_id,
+        recurrence_type=KalturaScheduleEventRecurrenceType.RECURRENCE,
+        start_date=blackout['startDate'],
+    )
+    for event in events:
+        created_by_diablo = CREATED_BY_DIABLO_TAG in event['tags']
+        if created_by_diablo and not represents_recording_series(event):
+            kaltura.delete(event['id'])
+            app.logger.info(f"'Event {event['summary']} deleted per blackout {blackout['name']}.")
+
+
+def _report_scheduling_error(course, e):
+    # Exceptions generated by the Kaltura API client will include one of these codes:
+    # https://developer.kaltura.com/api-docs/Error_Codes. Otherwise they're standard Python exceptions.
+    summary = f"Failed to schedule recordings {course['label']} (section_id: {course['sectionId']})"
+    app.logger.error(summary)
+    app.logger.exception(e)
+    send_system_error_email(
+        message=f'{summary}\n\n<pre>{traceback.format_exc()}</pre>',
+        subject=f'{summary[:50]}...' if len(summary) > 50 else summary,
+    )
 
 
-def _join(items, separator=', '):
-    return separator.join(str(item) for item in items)
+def _schedule_in_kaltura(kaltura, meeting_to_schedule):
+    return kaltura.schedule_recording(
+        canvas_course_site_ids=meeting_to_schedule['canvas_course_site_ids'],
+        course_label=meeting_to_schedule['course_label'],
+        instructors=(meeting_to_schedule['instructors'] + meeting_to_schedule['collaborators']),
+        meeting=meeting_to_schedule['meeting'],
+        publish_type=meeting_to_schedule['publish_type'],
+        recording_type=meeting_to_schedule['recording_type'],
+        room=meeting_to_schedule['room'],
+        term_id=meeting_to_schedule['term_id'],
+    )
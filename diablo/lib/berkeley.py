@@ -22,14 +22,131 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from diablo.lib.util import default_timezone, format_days, safe_strftime
+from diablo.lib.util import default_timezone, format_days, format_time, get_names_of_days, safe_strftime
 from flask import current_app as app
 
 # This order of days is aligned with datetime module: https://pythontic.com/datetime/date/weekday
 DAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
 
+# Values derived from a meeting pattern depend on these, and on nothing else but the pattern itself.
+MEETING_PATTERN_CONFIG_KEYS = (
+    'CURRENT_TERM_BEGIN',
+    'CURRENT_TERM_END',
+    'CURRENT_TERM_ID',
+    'CURRENT_TERM_RECORDINGS_BEGIN',
+    'CURRENT_TERM_RECORDINGS_END',
+)
+
+_NOT_COMPUTED = object()
+
+# (config key, patterns per (days, end_date, end_time, start_date, start_time)). Replaced whenever term config changes.
+_meeting_patterns = (None, {})
+
+
+class MeetingPattern:
+    """Days, times and dates shared by the meetings of a term, with derived values computed at most once per term.
+
+    Recording start dates 'as of today' are computed at most once per day.
+    """
+
+    __slots__ = (
+        '_first_occurrences',
+        '_recording_end_date',
+        '_recording_start_date',
+        '_recording_start_date_as_of_today',
+        'days',
+        'days_formatted',
+        'days_names',
+        'end_date',
+        'end_time',
+        'end_time_formatted',
+        'start_date',
+        'start_time',
+        'start_time_formatted',
+    )
+
+    def __init__(self, days, end_date, end_time, start_date, start_time):
+        self._first_occurrences = (None, {})
+        self._recording_end_date = _NOT_COMPUTED
+        self._recording_start_date = _NOT_COMPUTED
+        self._recording_start_date_as_of_today = (None, None)
+        self.days = days
+        self.days_formatted = tuple(format_days(days))
+        self.days_names = tuple(get_names_of_days(self.days_formatted))
+        self.end_date = end_date
+        self.end_time = end_time
+        self.end_time_formatted = format_time(end_time)
+        self.start_date = start_date
+        self.start_time = start_time
+        self.start_time_formatted = format_time(start_time)
+
+    @property
+    def recording_end_date(self):
+        if self._recording_end_date is _NOT_COMPUTED:
+            self._recording_end_date = get_recording_end_date(self._to_meeting())
+        return self._recording_end_date
+
+    def get_first_occurrence(self, time_hours, time_minutes):
+        # First meeting on or after the recording start date, as of today, at the given time.
+        today = date.today()
+        day, occurrences = self._first_occurrences
+        if day != today:
+            occurrences = {}
+            self._first_occurrences = (today, occurrences)
+        if (time_hours, time_minutes) not in occurrences:
+            occurrences[(time_hours, time_minutes)] = get_first_matching_datetime_of_term(
+                meeting_days=self.days_formatted,
+                start_date=self.get_recording_start_date(return_today_if_past_start=True),
+                time_hours=time_hours,
+                time_minutes=time_minutes,
+            )
+        return occurrences[(time_hours, time_minutes)]
+
+    def get_recording_start_date(self, return_today_if_past_start=False):
+        if return_today_if_past_start:
+            today = date.today()
+            day, recording_start_date = self._recording_start_date_as_of_today
+            if day != today:
+                recording_start_date = get_recording_start_date(self._to_meeting(), return_today_if_past_start=True)
+                self._recording_start_date_as_of_today = (today, recording_start_date)
+            return recording_start_date
+        if self._recording_start_date is _NOT_COMPUTED:
+            self._recording_start_date = get_recording_start_date(self._to_meeting())
+        return self._recording_start_date
+
+    def _to_meeting(self):
+        return {
+            'days': self.days,
+            'endDate': self.end_date,
+            'startDate': self.start_date,
+        }
+
+
+def get_meeting_pattern(days, end_date, end_time, start_date, start_time):
+    global _meeting_patterns
+    config_key = tuple(app.config.get(key) for key in MEETING_PATTERN_CONFIG_KEYS)
+    interned_config_key, patterns = _meeting_patterns
+    if interned_config_key != config_key:
+        patterns = {}
+        _meeting_patterns = (config_key, patterns)
+    key = (days, end_date, end_time, start_date, start_time)
+    pattern = patterns.get(key)
+    if not pattern:
+        pattern = patterns[key] = MeetingPattern(*key)
+    return pattern
+
+
+def get_meeting_pattern_of(meeting):
+    return get_meeting_pattern(
+        days=meeting.get('days'),
+        end_date=meeting.get('endDate'),
+        end_time=meeting.get('endTime'),
+        start_date=meeting.get('startDate'),
+        start_time=meeting.get('startTime'),
+    )
+
 
 def flatten_location(name):
     return name and ''.join(name.split()).lower()
@@ -127,11 +244,12 @@ def get_canvas_sis_term_id(sis_id=None):
 
 def are_scheduled_dates_obsolete(meeting, scheduled):
     if meeting:
-        recording_start_date = get_recording_start_date(meeting, return_today_if_past_start=False)
+        meeting_pattern = get_meeting_pattern_of(meeting)
+        recording_start_date = meeting_pattern.get_recording_start_date()
         formatted_start_date = safe_strftime(recording_start_date, '%Y-%m-%d')
         start_date_mismatch = formatted_start_date != scheduled['meetingStartDate']
 
-        recording_end_date = get_recording_end_date(meeting)
+        recording_end_date = meeting_pattern.recording_end_date
         end_date_mismatch = safe_strftime(recording_end_date, '%Y-%m-%d') != scheduled['meetingEndDate']
 
         # If we've moved beyond the SIS start date, ignore start_date mismatch
@@ -55,18 +55,18 @@ def get_psycopg_cursor(operation='read', autocommit=True, **kwargs):
             connection.close()
 
 
-def resolve_sql_template(sql_filename):
+def resolve_sql_template(sql_filename, term_id=None):
     with open(app.config['BASE_DIR'] + f'/diablo/sql_templates/{sql_filename}', encoding='utf-8') as file:
         template_string = file.read()
     # Omit copyright and license text
     template_string = re.sub(r'^/\*.*?\*/\s*', '', template_string, flags=re.DOTALL)
-    return resolve_sql_template_string(template_string)
+    return resolve_sql_template_string(template_string, term_id=term_id)
 
 
-def resolve_sql_template_string(template_string):
+def resolve_sql_template_string(template_string, term_id=None):
     return template_string.format(
         **{
             'dblink_nessie_rds': app.config['DBLINK_NESSIE_RDS'],
-            'term_id': app.config['CURRENT_TERM_ID'],
+            'term_id': term_id or app.config['CURRENT_TERM_ID'],
         },
     )
@@ -51,9 +51,9 @@ def _get_calnet_users(app, uids):
                 users_by_uid[uid] = {'uid': uid}
     else:
         calnet_client = calnet.client(app)
-        calnet_results = calnet_client.search_uids(uids)
+        calnet_results_by_uid = {r['uid']: r for r in calnet_client.search_uids(uids)}
         for uid in uids:
-            calnet_result = next((r for r in calnet_results if r['uid'] == uid), None)
+            calnet_result = calnet_results_by_uid.get(uid)
             feed = {
                 **_calnet_user_api_feed(calnet_result),
                 **{'uid': uid},
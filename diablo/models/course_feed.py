@@ -0,0 +1,161 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+import json
+
+from diablo import db
+from diablo.models.base import Base
+from diablo.models.data_version import DataVersion, get_course_version_keys
+from flask import current_app as app
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Course feeds depend on these settings (e.g., recording dates) so a change in config means stale feeds.
+COURSE_FEED_CONFIG_KEYS = [
+    'COURSE_CAPTURE_PREMIUM_COST',
+    'CURRENT_TERM_BEGIN',
+    'CURRENT_TERM_END',
+    'CURRENT_TERM_RECORDINGS_BEGIN',
+    'CURRENT_TERM_RECORDINGS_END',
+]
+
+
+class CourseFeed(Base):
+    __tablename__ = 'course_feeds'
+
+    term_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    section_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    include_deleted = db.Column(db.Boolean, nullable=False, primary_key=True)
+    config_key = db.Column(db.String(255), nullable=False)
+    version_key = db.Column(db.String(255), nullable=False)
+    feed = db.Column(JSONB, nullable=False)
+
+    def __init__(
+            self,
+            config_key,
+            feed,
+            include_deleted,
+            section_id,
+            term_id,
+            version_key,
+    ):
+        self.config_key = config_key
+        self.feed = feed
+        self.include_deleted = include_deleted
+        self.section_id = section_id
+        self.term_id = term_id
+        self.version_key = version_key
+
+    def __repr__(self):
+        return f"""<CourseFeed
+                    term_id={self.term_id},
+                    section_id={self.section_id},
+                    include_deleted={self.include_deleted},
+                    config_key={self.config_key},
+                    version_key={self.version_key},
+                    created_at={self.created_at},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def get(cls, term_id, section_id, include_deleted):
+        # A feed is stale if data it depends on changed after it was built, even if the change was committed first.
+        row = cls.query.filter_by(term_id=term_id, section_id=section_id, include_deleted=include_deleted).first()
+        if row and row.config_key == get_config_key():
+            versions = DataVersion.get_versions(get_course_version_keys(term_id=term_id, section_id=section_id))
+            if row.version_key == get_version_key(term_id=term_id, section_id=section_id, versions=versions):
+                return row
+        return None
+
+    @classmethod
+    def upsert(cls, term_id, feeds_per_section_id, include_deleted, versions):
+        # Versions, per DataVersion.get_versions, must be read before the feeds are built.
+        count_per_chunk = 1000
+        items = list(feeds_per_section_id.items())
+        for chunk in range(0, len(items), count_per_chunk):
+            query = """
+                INSERT INTO course_feeds (
+                    term_id, section_id, include_deleted, config_key, version_key, feed, created_at, updated_at
+                )
+                SELECT
+                    :term_id, section_id, :include_deleted, :config_key, version_key, feed, now(), now()
+                FROM json_to_recordset(:json_dumps) AS f(section_id INTEGER, version_key VARCHAR, feed JSONB)
+                ON CONFLICT(term_id, section_id, include_deleted) DO
+                UPDATE SET
+                    config_key = EXCLUDED.config_key,
+                    version_key = EXCLUDED.version_key,
+                    feed = EXCLUDED.feed,
+                    updated_at = EXCLUDED.updated_at;
+            """
+            data = [
+                {
+                    'feed': feed,
+                    'section_id': section_id,
+                    'version_key': get_version_key(term_id=term_id, section_id=section_id, versions=versions),
+                } for section_id, feed in items[chunk:chunk + count_per_chunk]
+            ]
+            db.session.execute(
+                text(query),
+                {
+                    'config_key': get_config_key(),
+                    'include_deleted': include_deleted,
+                    'json_dumps': json.dumps(data),
+                    'term_id': term_id,
+                },
+            )
+
+    @classmethod
+    def delete_all(cls, term_id=None):
+        if term_id is None:
+            db.session.execute(text('DELETE FROM course_feeds'))
+        else:
+            db.session.execute(text('DELETE FROM course_feeds WHERE term_id = :term_id'), {'term_id': term_id})
+
+    @classmethod
+    def delete_per_section_ids(cls, section_ids, term_id):
+        # Feed of a principal section includes data (e.g., update history) of its cross-listings.
+        section_ids = [int(section_id) for section_id in section_ids if section_id is not None]
+        if section_ids:
+            sql = """
+                DELETE FROM course_feeds
+                WHERE term_id = :term_id
+                AND (
+                    section_id = ANY(:section_ids)
+                    OR section_id IN (
+                        SELECT section_id FROM cross_listings
+                        WHERE term_id = :term_id AND cross_listed_section_ids && CAST(:section_ids AS INTEGER[])
+                    )
+                )
+            """
+            db.session.execute(text(sql), {'section_ids': section_ids, 'term_id': term_id})
+
+
+def get_config_key():
+    return '|'.join(str(app.config[key]) for key in COURSE_FEED_CONFIG_KEYS)
+
+
+def get_version_key(term_id, section_id, versions):
+    # Keys missing from 'versions' were never bumped.
+    keys = get_course_version_keys(term_id=term_id, section_id=section_id)
+    return '|'.join(str(versions.get(key, (0, None))[0]) for key in keys)
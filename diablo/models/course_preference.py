@@ -28,7 +28,9 @@ from diablo import db, std_commit
 from diablo.externals.canvas import get_course_sites_by_id
 from diablo.externals.loch import get_loch_basic_attributes
 from diablo.lib.util import basic_attributes_to_api_json, to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.cross_listing import CrossListing
+from diablo.models.data_version import DataVersion
 from sqlalchemy import and_
 from sqlalchemy.dialects.postgresql import ARRAY, ENUM
 
@@ -104,8 +106,8 @@ class CoursePreference(db.Model):
                 """
 
     @classmethod
-    def get_all_course_preferences(cls, term_id):
-        return cls.query.filter_by(term_id=term_id).all()
+    def get_course_preferences_for_section_ids(cls, section_ids, term_id):
+        return cls.query.filter(and_(cls.section_id.in_(section_ids), cls.term_id == term_id)).all()
 
     @classmethod
     def get_course_preferences(cls, section_id, term_id):
@@ -119,6 +121,8 @@ class CoursePreference(db.Model):
             collaborator_uids,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.delete_per_section_ids(section_ids=section_ids, term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.collaborator_uids = list(collaborator_uids)
@@ -143,6 +147,8 @@ class CoursePreference(db.Model):
             canvas_site_ids,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.delete_per_section_ids(section_ids=section_ids, term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.publish_type = publish_type
@@ -167,6 +173,8 @@ class CoursePreference(db.Model):
             recording_type,
     ):
         section_ids = _get_section_ids_with_xlistings(section_id, term_id)
+        CourseFeed.delete_per_section_ids(section_ids=section_ids, term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=section_ids)
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         for existing_row in cls.query.filter(criteria).all():
             existing_row.recording_type = recording_type
@@ -0,0 +1,405 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+import re
+
+from diablo.externals.loch import get_loch_basic_attributes
+from diablo.lib.berkeley import get_meeting_pattern
+from diablo.lib.util import basic_attributes_to_api_json, format_days, format_time, get_names_of_days, safe_strftime, to_isoformat
+from diablo.models.course_preference import NAMES_PER_PUBLISH_TYPE, NAMES_PER_RECORDING_TYPE
+from flask import current_app as app
+
+# Optional fields are left UNSET until assigned; unset fields are omitted from the API feed.
+UNSET = type('Unset', (), {'__repr__': lambda self: 'UNSET', '__slots__': ()})()
+
+
+class Record:
+    """Compact, read-mostly stand-in for a dict of the course feed.
+
+    Subclasses list their feed keys, in feed order, as API_KEYS. Item access by feed key (e.g., course['sectionId'])
+    reads the snake_case attribute of the same name, so code written against the dict form works on records, too.
+    """
+
+    __slots__ = ()
+    API_KEYS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._attribute_per_key = {key: re.sub(r'([A-Z])', r'_\1', key).lower() for key in cls.API_KEYS}
+
+    def __contains__(self, key):
+        return key in self._attribute_per_key and getattr(self, self._attribute_per_key[key]) is not UNSET
+
+    def __getitem__(self, key):
+        value = getattr(self, self._attribute_per_key[key])
+        if value is UNSET:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self):
+        # Render as the feed would, e.g., in error messages that interpolate a course.
+        return repr(self.to_api_json())
+
+    def __setitem__(self, key, value):
+        setattr(self, self._attribute_per_key[key], value)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return [key for key in self.API_KEYS if key in self]
+
+    def to_api_json(self):
+        feed = {}
+        for key in self.API_KEYS:
+            value = getattr(self, self._attribute_per_key[key])
+            if value is not UNSET:
+                feed[key] = _to_api_json(value)
+        return feed
+
+
+class Instructor(Record):
+
+    __slots__ = ('deleted_at', 'dept_code', 'email', 'has_opted_out', 'name', 'role_code', 'uid')
+    API_KEYS = ('deletedAt', 'deptCode', 'email', 'name', 'roleCode', 'uid', 'hasOptedOut')
+
+    def __init__(self, deleted_at, dept_code, email, name, role_code, uid):
+        self.deleted_at = deleted_at
+        self.dept_code = dept_code
+        self.email = email
+        self.has_opted_out = UNSET
+        self.name = name
+        self.role_code = role_code
+        self.uid = uid
+
+
+class Meeting(Record):
+
+    __slots__ = ('_pattern', 'days', 'eligible', 'end_date', 'end_time', 'location', 'room', 'start_date', 'start_time')
+    API_KEYS = (
+        'days',
+        'daysFormatted',
+        'daysNames',
+        'endDate',
+        'endTime',
+        'endTimeFormatted',
+        'location',
+        'startDate',
+        'startTime',
+        'startTimeFormatted',
+        'eligible',
+        'recordingEndDate',
+        'recordingStartDate',
+        'room',
+    )
+
+    def __init__(self, days, end_date, end_time, location, start_date, start_time):
+        # Meetings of a term share a few hundred interned patterns, from which derived values are read.
+        self._pattern = get_meeting_pattern(days, end_date, end_time, start_date, start_time)
+        self.days = days
+        self.eligible = UNSET
+        self.end_date = end_date
+        self.end_time = end_time
+        self.location = location
+        self.room = UNSET
+        self.start_date = start_date
+        self.start_time = start_time
+
+    @property
+    def days_formatted(self):
+        return list(self._pattern.days_formatted)
+
+    @property
+    def days_names(self):
+        return list(self._pattern.days_names)
+
+    @property
+    def end_time_formatted(self):
+        return self._pattern.end_time_formatted
+
+    @property
+    def pattern(self):
+        return self._pattern
+
+    @property
+    def start_time_formatted(self):
+        return self._pattern.start_time_formatted
+
+    @property
+    def recording_end_date(self):
+        return safe_strftime(self._pattern.recording_end_date, '%Y-%m-%d') if self.eligible is True else UNSET
+
+    @property
+    def recording_start_date(self):
+        return safe_strftime(self._pattern.get_recording_start_date(), '%Y-%m-%d') if self.eligible is True else UNSET
+
+    def has_same_pattern(self, other):
+        return (self.days, self.end_date, self.end_time, self.location, self.start_date, self.start_time) == \
+            (other['days'], other['endDate'], other['endTime'], other['location'], other['startDate'], other['startTime'])
+
+
+class ScheduledSeries(Record):
+
+    __slots__ = (
+        '_collaborators',
+        '_created_at',
+        '_meeting_end_date',
+        '_meeting_start_date',
+        '_room',
+        '_room_json',
+        'collaborator_uids',
+        'course_display_name',
+        'id',
+        'instructor_uids',
+        'kaltura_schedule_id',
+        'meeting_days_raw',
+        'meeting_end_time',
+        'meeting_start_time',
+        'publish_type',
+        'recording_type',
+        'section_id',
+        'term_id',
+    )
+    API_KEYS = (
+        'id',
+        'courseDisplayName',
+        'createdAt',
+        'instructorUids',
+        'collaborators',
+        'collaboratorUids',
+        'kalturaScheduleId',
+        'meetingDays',
+        'meetingDaysNames',
+        'meetingEndDate',
+        'meetingEndTime',
+        'meetingEndTimeFormatted',
+        'meetingStartDate',
+        'meetingStartTime',
+        'meetingStartTimeFormatted',
+        'publishType',
+        'publishTypeName',
+        'recordingType',
+        'recordingTypeName',
+        'room',
+        'sectionId',
+        'termId',
+    )
+
+    def __init__(self, scheduled, room):
+        self._collaborators = UNSET
+        self._created_at = scheduled.created_at
+        self._meeting_end_date = scheduled.meeting_end_date
+        self._meeting_start_date = scheduled.meeting_start_date
+        self._room = room
+        self._room_json = UNSET
+        self.collaborator_uids = scheduled.collaborator_uids
+        self.course_display_name = scheduled.course_display_name
+        self.id = scheduled.id
+        self.instructor_uids = scheduled.instructor_uids
+        self.kaltura_schedule_id = scheduled.kaltura_schedule_id
+        self.meeting_days_raw = scheduled.meeting_days
+        self.meeting_end_time = scheduled.meeting_end_time
+        self.meeting_start_time = scheduled.meeting_start_time
+        self.publish_type = scheduled.publish_type
+        self.recording_type = scheduled.recording_type
+        self.section_id = scheduled.section_id
+        self.term_id = scheduled.term_id
+
+    @property
+    def collaborators(self):
+        if self._collaborators is UNSET:
+            collaborator_attributes = get_loch_basic_attributes(self.collaborator_uids) if self.collaborator_uids else []
+            self._collaborators = [basic_attributes_to_api_json(a) for a in collaborator_attributes]
+        return self._collaborators
+
+    @property
+    def created_at(self):
+        return to_isoformat(self._created_at)
+
+    @property
+    def meeting_days(self):
+        return format_days(self.meeting_days_raw)
+
+    @property
+    def meeting_days_names(self):
+        return get_names_of_days(self.meeting_days)
+
+    @property
+    def meeting_end_date(self):
+        return self._meeting_end_date.strftime('%Y-%m-%d')
+
+    @property
+    def meeting_end_time_formatted(self):
+        return format_time(self.meeting_end_time)
+
+    @property
+    def meeting_start_date(self):
+        return self._meeting_start_date.strftime('%Y-%m-%d')
+
+    @property
+    def meeting_start_time_formatted(self):
+        return format_time(self.meeting_start_time)
+
+    @property
+    def publish_type_name(self):
+        return NAMES_PER_PUBLISH_TYPE[self.publish_type]
+
+    @property
+    def recording_type_name(self):
+        return NAMES_PER_RECORDING_TYPE[self.recording_type]
+
+    @property
+    def room(self):
+        if self._room_json is UNSET:
+            self._room_json = self._room.to_api_json() if self._room else None
+        return self._room_json
+
+
+class ScheduledSeriesSummary(Record):
+
+    __slots__ = ('_created_at', 'id', 'publish_type')
+    API_KEYS = ('id', 'publishTypeName', 'createdAt')
+
+    def __init__(self, scheduled):
+        self._created_at = scheduled.created_at
+        self.id = scheduled.id
+        self.publish_type = scheduled.publish_type
+
+    @property
+    def created_at(self):
+        return to_isoformat(self._created_at)
+
+    @property
+    def publish_type_name(self):
+        return NAMES_PER_PUBLISH_TYPE[self.publish_type]
+
+
+class Course(Record):
+
+    __slots__ = (
+        'allowed_units',
+        'canvas_site_ids',
+        'collaborator_uids',
+        'collaborators',
+        'course_name',
+        'course_title',
+        'cross_listings',
+        'deleted_at',
+        'has_blanket_opted_out',
+        'has_opted_out',
+        'instruction_format',
+        'instructors',
+        'is_primary',
+        'meetings',
+        'note',
+        'opt_outs',
+        'publish_type',
+        'publish_type_name',
+        'recording_type',
+        'recording_type_name',
+        'scheduled',
+        'section_id',
+        'section_num',
+        'term_id',
+        'update_history',
+    )
+    API_KEYS = (
+        'allowedUnits',
+        'collaboratorUids',
+        'canvasSiteIds',
+        'courseName',
+        'courseTitle',
+        'crossListings',
+        'deletedAt',
+        'hasBlanketOptedOut',
+        'hasOptedOut',
+        'instructionFormat',
+        'instructors',
+        'isPrimary',
+        'label',
+        'meetings',
+        'nonstandardMeetingDates',
+        'optOuts',
+        'publishType',
+        'publishTypeName',
+        'recordingType',
+        'recordingTypeName',
+        'sectionId',
+        'sectionNum',
+        'scheduled',
+        'termId',
+        'collaborators',
+        'updateHistory',
+        'note',
+        'meetingType',
+    )
+
+    def __init__(self, **kwargs):
+        for attribute in self.__slots__:
+            setattr(self, attribute, kwargs.pop(attribute, UNSET))
+        if kwargs:
+            raise TypeError(f'Unexpected course attributes: {list(kwargs)}')
+
+    @property
+    def label(self):
+        def _label(course_name_, instruction_format_, section_num_):
+            return f'{course_name_}, {instruction_format_} {section_num_}'
+
+        label = _label(self.course_name, self.instruction_format, self.section_num)
+        if self.cross_listings:
+            other_labels = [_label(c['courseName'], c['instructionFormat'], c['sectionNum']) for c in self.cross_listings]
+            if label in other_labels:
+                other_labels.remove(label)
+            return ' | '.join([label] + list(set(other_labels)))
+        else:
+            return label
+
+    @property
+    def meeting_type(self):
+        # 'meetingType' is our own homegrown typology. See DIABLO-436.
+        if len(self.meetings['eligible']) > 1:
+            return 'D'
+        elif self.nonstandard_meeting_dates:
+            return 'C'
+        elif len(self.meetings['eligible'] + self.meetings['ineligible']) > 1:
+            return 'B'
+        else:
+            return 'A'
+
+    @property
+    def nonstandard_meeting_dates(self):
+        term_begin = app.config['CURRENT_TERM_BEGIN']
+        term_end = app.config['CURRENT_TERM_END']
+        return next((True for m in self.meetings['eligible'] if m['startDate'] != term_begin or m['endDate'] != term_end), False)
+
+
+def _to_api_json(value):
+    if isinstance(value, Record):
+        return value.to_api_json()
+    elif isinstance(value, list):
+        return [_to_api_json(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: _to_api_json(item) for key, item in value.items()}
+    else:
+        return value
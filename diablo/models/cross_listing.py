@@ -27,7 +27,7 @@ from datetime import datetime
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
 from sqlalchemy import and_, text
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 
 
 class CrossListing(db.Model):
@@ -36,6 +36,9 @@ class CrossListing(db.Model):
     term_id = db.Column(db.Integer, nullable=False, primary_key=True)
     section_id = db.Column(db.Integer, nullable=False, primary_key=True)
     cross_listed_section_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    # Course and instructor metadata of the cross-listed sections, derived at refresh time for feeds.
+    courses = db.Column(JSONB, nullable=False, server_default=text("'[]'"))
+    instructors = db.Column(JSONB, nullable=False, server_default=text("'[]'"))
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
     def __init__(
@@ -98,12 +101,116 @@ class CrossListing(db.Model):
         row = cls.query.filter_by(section_id=section_id, term_id=term_id).first()
         return row.cross_listed_section_ids if row else []
 
+    @classmethod
+    def get_cross_listings(cls, term_id):
+        return {row.section_id: row.cross_listed_section_ids for row in cls.query.filter_by(term_id=term_id).all()}
+
+    @classmethod
+    def get_principal_section_ids(cls, section_ids, term_id):
+        # Principal listings of cross-listings that include any of the given (non-principal) section ids.
+        sql = """
+            SELECT section_id FROM cross_listings
+            WHERE term_id = :term_id AND cross_listed_section_ids && CAST(:section_ids AS INTEGER[])
+        """
+        rows = db.session.execute(text(sql), {'section_ids': list(section_ids), 'term_id': term_id})
+        return [row['section_id'] for row in rows]
+
     @classmethod
     def get_cross_listings_for_section_ids(cls, section_ids, term_id):
         criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
         rows = cls.query.filter(criteria).all()
         return {row.section_id: row.cross_listed_section_ids for row in rows}
 
+    @classmethod
+    def get_metadata_for_section_ids(cls, section_ids, term_id):
+        criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id)
+        return cls.query.filter(criteria).all()
+
+    @classmethod
+    def refresh_metadata(cls, term_id, instructor_role_codes):
+        # Per cross-listed section, in cross_listed_section_ids order: course data from any one of its SIS rows with an
+        # instructor role and, once per UID, its active instructors. If an instructor has many roles then the highest
+        # ranking role wins. Sections are "deleted" during SIS data refresh job but their rows still count.
+        sql = """
+            WITH sections AS (
+                SELECT
+                    c.section_id AS principal_section_id,
+                    x.ordinal,
+                    s.course_name,
+                    s.course_title,
+                    s.instruction_format,
+                    s.instructor_role_code,
+                    s.instructor_uid,
+                    s.is_primary,
+                    s.section_id,
+                    s.section_num
+                FROM cross_listings c
+                CROSS JOIN unnest(c.cross_listed_section_ids) WITH ORDINALITY AS x(section_id, ordinal)
+                JOIN sis_sections s
+                    ON s.term_id = c.term_id
+                    AND s.section_id = x.section_id
+                    AND s.instructor_role_code = ANY(:instructor_role_codes)
+                    AND s.deleted_at IS NULL
+                WHERE c.term_id = :term_id
+            ),
+            courses AS (
+                SELECT
+                    principal_section_id,
+                    jsonb_agg(jsonb_build_object(
+                        'courseName', course_name,
+                        'courseTitle', course_title,
+                        'instructionFormat', instruction_format,
+                        'isPrimary', is_primary,
+                        'label', concat(course_name, ', ', instruction_format, ' ', section_num),
+                        'sectionId', section_id,
+                        'sectionNum', section_num,
+                        'termId', :term_id
+                    ) ORDER BY ordinal) AS courses
+                FROM (
+                    SELECT DISTINCT ON (principal_section_id, ordinal) *
+                    FROM sections
+                    ORDER BY principal_section_id, ordinal
+                ) s
+                GROUP BY principal_section_id
+            ),
+            instructors AS (
+                SELECT
+                    principal_section_id,
+                    jsonb_agg(jsonb_build_object(
+                        'deptCode', dept_code,
+                        'email', email,
+                        'name', name,
+                        'roleCode', instructor_role_code,
+                        'uid', uid
+                    ) ORDER BY ordinal, uid) AS instructors
+                FROM (
+                    SELECT DISTINCT ON (s.principal_section_id, i.uid)
+                        s.principal_section_id,
+                        s.ordinal,
+                        s.instructor_role_code,
+                        i.dept_code,
+                        i.email,
+                        i.first_name || ' ' || i.last_name AS name,
+                        i.uid
+                    FROM sections s
+                    JOIN instructors i ON i.uid = s.instructor_uid
+                    WHERE trim(i.uid) <> ''
+                    ORDER BY
+                        s.principal_section_id,
+                        i.uid,
+                        s.ordinal,
+                        array_position(ARRAY['APRX', 'ICNT', 'TNIC', 'PI'], s.instructor_role_code) DESC NULLS LAST
+                ) s
+                GROUP BY principal_section_id
+            )
+            UPDATE cross_listings c
+            SET
+                courses = COALESCE((SELECT courses FROM courses WHERE principal_section_id = c.section_id), '[]'),
+                instructors = COALESCE((SELECT instructors FROM instructors WHERE principal_section_id = c.section_id), '[]')
+            WHERE c.term_id = :term_id
+        """
+        db.session.execute(text(sql), {'instructor_role_codes': instructor_role_codes, 'term_id': term_id})
+
     def to_api_json(self):
         return {
             'sectionId': self.section_id,
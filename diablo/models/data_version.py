@@ -0,0 +1,120 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from datetime import datetime
+
+from diablo import db
+from diablo.models.cross_listing import CrossListing
+from sqlalchemy import and_, or_, text
+
+# Change counters, per key:
+#   'courses'                       Any course in any term (e.g., blanket opt-out of all terms)
+#   'courses:<term_id>'             Any course of the term, including changes to a single section
+#   'course:<term_id>:<section_id>' A single course
+#   'term:<term_id>'                All courses of the term (e.g., SIS data refresh)
+#   'email_templates', 'rooms'      Reference data. Rooms are part of course feeds, too.
+#   'kaltura_events'                Sync of the local mirror of Kaltura events. Time of change is the time synced as of.
+EMAIL_TEMPLATES_VERSION_KEY = 'email_templates'
+KALTURA_EVENTS_VERSION_KEY = 'kaltura_events'
+ROOMS_VERSION_KEY = 'rooms'
+
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    key = db.Column(db.String(255), nullable=False, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __init__(self, key, version):
+        self.key = key
+        self.version = version
+
+    def __repr__(self):
+        return f"""<DataVersion
+                    key={self.key},
+                    version={self.version},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def bump(cls, keys, updated_at=None):
+        # Keys are sorted so that concurrent transactions lock rows in the same order.
+        sql = """
+            INSERT INTO data_versions (key, version, updated_at)
+            SELECT key, 1, COALESCE(CAST(:updated_at AS TIMESTAMP WITH TIME ZONE), now()) FROM unnest(CAST(:keys AS VARCHAR[])) AS key
+            ON CONFLICT (key) DO
+            UPDATE SET
+                version = data_versions.version + 1,
+                updated_at = EXCLUDED.updated_at
+        """
+        db.session.execute(text(sql), {'keys': sorted(set(keys)), 'updated_at': updated_at})
+
+    @classmethod
+    def bump_courses(cls, term_id=None, section_ids=None):
+        if term_id is None:
+            cls.bump(['courses'])
+        elif section_ids is None:
+            cls.bump([f'courses:{term_id}', f'term:{term_id}'])
+        else:
+            section_ids = [int(section_id) for section_id in section_ids if section_id is not None]
+            if section_ids:
+                # Feed of a principal section includes data (e.g., update history) of its cross-listings.
+                section_ids = set(section_ids + CrossListing.get_principal_section_ids(section_ids=section_ids, term_id=term_id))
+                cls.bump([f'courses:{term_id}'] + [f'course:{term_id}:{section_id}' for section_id in section_ids])
+
+    @classmethod
+    def bump_email_templates(cls):
+        cls.bump([EMAIL_TEMPLATES_VERSION_KEY])
+
+    @classmethod
+    def bump_rooms(cls):
+        cls.bump([ROOMS_VERSION_KEY])
+
+    @classmethod
+    def get_changed_course_section_ids(cls, term_id, since):
+        prefix = f'course:{term_id}:'
+        criteria = and_(cls.key.startswith(prefix, autoescape=True), cls.updated_at >= since)
+        return [int(row.key[len(prefix):]) for row in cls.query.filter(criteria).all()]
+
+    @classmethod
+    def get_course_versions(cls, term_id):
+        # Versions of every key in get_course_version_keys of the term's courses. Keys never bumped are left out.
+        criteria = or_(
+            cls.key.in_(['courses', ROOMS_VERSION_KEY, f'term:{term_id}']),
+            cls.key.startswith(f'course:{term_id}:', autoescape=True),
+        )
+        return {row.key: (row.version, row.updated_at) for row in cls.query.filter(criteria).all()}
+
+    @classmethod
+    def get_versions(cls, keys):
+        # Returns version and time of last change per key. Keys never bumped are at version zero.
+        versions = {key: (0, None) for key in keys}
+        for data_version in cls.query.filter(cls.key.in_(keys)).all():
+            versions[data_version.key] = (data_version.version, data_version.updated_at)
+        return versions
+
+
+def get_course_version_keys(term_id, section_id):
+    return ['courses', f'course:{term_id}:{section_id}', ROOMS_VERSION_KEY, f'term:{term_id}']
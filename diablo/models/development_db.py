@@ -92,7 +92,7 @@ def _load_courses():
     term_id = app.config['CURRENT_TERM_ID']
     db.session.execute(SisSection.__table__.delete().where(SisSection.term_id == term_id))
     save_mock_courses(f"{app.config['FIXTURES_PATH']}/sis/courses.json")
-    SisDataRefreshJob.after_sis_data_refresh(term_id=term_id)
+    SisDataRefreshJob.after_sis_data_refresh(term_ids=[term_id])
     std_commit(allow_test_environment=True)
 
 
@@ -197,6 +197,7 @@ def _set_up_and_run_jobs():
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='120', key='blackouts')
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='120', key='clear_schedules')
     Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='5', key='doomed_to_fail')
+    Job.create(disabled=True, job_schedule_type='minutes', job_schedule_value='10', key='kaltura_events')
     Job.create(is_schedulable=False, job_schedule_type='day_at', job_schedule_value='16:00', key='remind_instructors')
     Job.create(is_schedulable=False, job_schedule_type='minutes', job_schedule_value='820', key='schedule_updates')
     Job.create(is_schedulable=False, job_schedule_type='minutes', job_schedule_value='720', key='semester_start')
@@ -0,0 +1,74 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from diablo import db
+from sqlalchemy import text
+
+# The 'eligible_sections' table holds principal listings with at least one meeting in a room with recording capability.
+# Rows are distinct per instructor role code, which is null for meetings with no instructor, so that queries can apply
+# their own role codes. It must be refreshed whenever SIS data, cross-listings or room capabilities change.
+
+
+def eligible_section_ids_sql():
+    # Expects :term_id and :instructor_role_codes parameters.
+    return """
+        SELECT e.section_id
+        FROM eligible_sections e
+        WHERE
+            e.term_id = :term_id
+            AND (e.instructor_role_code IS NULL OR e.instructor_role_code = ANY(:instructor_role_codes))
+    """
+
+
+def refresh_eligible_sections(term_id=None, location=None):
+    # Refresh all terms, one term and/or the sections meeting in one room. Such sections are refreshed in full, since they
+    # might meet in other rooms, too.
+    criteria = ''
+    if term_id is not None:
+        criteria += ' AND s.term_id = :term_id'
+    if location is not None:
+        criteria += ' AND (s.term_id, s.section_id) IN (SELECT term_id, section_id FROM sis_sections WHERE meeting_location = :location)'
+    params = {'location': location, 'term_id': term_id}
+    if location is None:
+        sql = f"DELETE FROM eligible_sections{'' if term_id is None else ' WHERE term_id = :term_id'}"
+    else:
+        sql = f"""
+            DELETE FROM eligible_sections e
+            USING sis_sections s
+            WHERE s.term_id = e.term_id AND s.section_id = e.section_id {criteria}
+        """
+    db.session.execute(text(sql), params)
+    sql = f"""
+        INSERT INTO eligible_sections (term_id, section_id, instructor_role_code)
+        SELECT DISTINCT s.term_id, s.section_id, CASE WHEN s.instructor_uid IS NULL THEN NULL ELSE s.instructor_role_code END
+        FROM sis_sections s
+        JOIN rooms r ON r.location = s.meeting_location AND r.capability IS NOT NULL
+        WHERE
+            s.is_principal_listing IS TRUE
+            AND s.deleted_at IS NULL
+            AND (s.instructor_uid IS NULL OR s.instructor_role_code IS NOT NULL)
+            {criteria}
+    """
+    db.session.execute(text(sql), params)
@@ -25,6 +25,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
 from diablo.models.base import Base
+from diablo.models.data_version import DataVersion
 from sqlalchemy.dialects.postgresql import ENUM
 
 
@@ -85,12 +86,14 @@ class EmailTemplate(Base):
             message=message,
         )
         db.session.add(email_template)
+        DataVersion.bump_email_templates()
         std_commit()
         return email_template
 
     @classmethod
     def delete_template(cls, template_id):
         db.session.delete(cls.query.filter_by(id=template_id).first())
+        DataVersion.bump_email_templates()
         std_commit()
 
     @classmethod
@@ -117,6 +120,7 @@ class EmailTemplate(Base):
         email_template.subject_line = subject_line
         email_template.message = message
         db.session.add(email_template)
+        DataVersion.bump_email_templates()
         std_commit()
         return email_template
 
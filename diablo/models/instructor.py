@@ -38,6 +38,7 @@ class Instructor(Base):
     email = db.Column(db.String(255))
     first_name = db.Column(db.String(255))
     last_name = db.Column(db.String(255))
+    verified_at = db.Column(db.DateTime)
 
     def __init__(
             self,
@@ -60,10 +61,32 @@ class Instructor(Base):
                     first_name={self.first_name},
                     last_name={self.last_name},
                     uid={self.uid},
+                    verified_at={self.verified_at},
                     created_at={self.created_at},
                     updated_at={self.updated_at}>
                 """
 
+    @classmethod
+    def get_uids_to_verify(cls, uids, verified_before, stale_limit):
+        # UIDs with no instructors row, plus up to stale_limit UIDs last verified (per CalNet) before the given time,
+        # oldest first.
+        sql = """
+            SELECT u.uid
+            FROM unnest(CAST(:uids AS VARCHAR[])) AS u(uid)
+            LEFT JOIN instructors i ON i.uid = u.uid
+            WHERE i.uid IS NULL
+        """
+        new_uids = [row['uid'] for row in db.session.execute(text(sql), {'uids': list(uids)})]
+        sql = """
+            SELECT uid FROM instructors
+            WHERE uid = ANY(:uids) AND (verified_at IS NULL OR verified_at < :verified_before)
+            ORDER BY verified_at NULLS FIRST, uid
+            LIMIT :stale_limit
+        """
+        params = {'stale_limit': stale_limit, 'uids': list(uids), 'verified_before': verified_before}
+        stale_uids = [row['uid'] for row in db.session.execute(text(sql), params)]
+        return new_uids + stale_uids
+
     @classmethod
     def upsert(cls, rows):
         now = utc_now().strftime('%Y-%m-%dT%H:%M:%S+00')
@@ -72,17 +95,18 @@ class Instructor(Base):
             rows_subset = rows[chunk:chunk + count_per_chunk]
             query = """
                 INSERT INTO instructors (
-                    created_at, dept_code, email, first_name, last_name, uid, updated_at
+                    created_at, dept_code, email, first_name, last_name, uid, updated_at, verified_at
                 )
                 SELECT
-                    created_at, dept_code, email, first_name, last_name, uid, updated_at
+                    created_at, dept_code, email, first_name, last_name, uid, updated_at, verified_at
                 FROM json_populate_recordset(null::instructors, :json_dumps)
                 ON CONFLICT(uid) DO
                 UPDATE SET
                     dept_code = EXCLUDED.dept_code,
                     email = EXCLUDED.email,
                     first_name = EXCLUDED.first_name,
-                    last_name = EXCLUDED.last_name;
+                    last_name = EXCLUDED.last_name,
+                    verified_at = EXCLUDED.verified_at;
             """
             data = [
                 {
@@ -93,6 +117,7 @@ class Instructor(Base):
                     'last_name': row['last_name'],
                     'uid': row['uid'],
                     'updated_at': now,
+                    'verified_at': now,
                 } for row in rows_subset
             ]
             db.session.execute(query, {'json_dumps': json.dumps(data)})
@@ -0,0 +1,74 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from diablo import db
+from sqlalchemy import text
+
+
+class InstructorSection(db.Model):
+    __tablename__ = 'instructor_sections'
+
+    term_id = db.Column(db.Integer, nullable=False, primary_key=True)
+    instructor_uid = db.Column(db.String(80), nullable=False, primary_key=True)
+    section_id = db.Column(db.Integer, nullable=False, primary_key=True)
+
+    def __init__(self, term_id, instructor_uid, section_id):
+        self.term_id = term_id
+        self.instructor_uid = instructor_uid
+        self.section_id = section_id
+
+    def __repr__(self):
+        return f"""<InstructorSection
+                    term_id={self.term_id},
+                    instructor_uid={self.instructor_uid},
+                    section_id={self.section_id}>
+                """
+
+    @classmethod
+    def get_section_ids(cls, term_id, instructor_uid):
+        rows = cls.query.filter_by(term_id=term_id, instructor_uid=instructor_uid).order_by(cls.section_id).all()
+        return [row.section_id for row in rows]
+
+    @classmethod
+    def refresh(cls, term_id, instructor_role_codes):
+        # Map each instructor to the principal listing of the sections they teach. Instructors of a non-principal
+        # listing are mapped via cross_listings, so the table must be rebuilt whenever cross-listings are.
+        db.session.execute(cls.__table__.delete().where(cls.term_id == term_id))
+        sql = """
+            INSERT INTO instructor_sections (term_id, instructor_uid, section_id)
+            SELECT DISTINCT s.term_id, s.instructor_uid, COALESCE(c.section_id, s.section_id)
+            FROM sis_sections s
+            JOIN instructors i ON i.uid = s.instructor_uid
+            LEFT JOIN cross_listings c
+                ON s.is_principal_listing IS FALSE
+                AND c.term_id = s.term_id
+                AND s.section_id = ANY(c.cross_listed_section_ids)
+            WHERE
+                s.term_id = :term_id
+                AND s.instructor_role_code = ANY(:instructor_role_codes)
+                AND s.deleted_at IS NULL
+                AND (s.is_principal_listing IS NOT FALSE OR c.section_id IS NOT NULL)
+        """
+        db.session.execute(text(sql), {'instructor_role_codes': instructor_role_codes, 'term_id': term_id})
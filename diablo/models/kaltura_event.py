@@ -0,0 +1,179 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from datetime import timedelta
+import json
+
+from diablo import db
+from diablo.lib.util import utc_now
+from diablo.models.base import Base
+from diablo.models.data_version import DataVersion, KALTURA_EVENTS_VERSION_KEY
+from flask import current_app as app
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+class KalturaEvent(Base):
+    __tablename__ = 'kaltura_events'
+
+    # Local mirror of Kaltura record schedule events: series ('Recurring'), their recurrences and one-off events. Column values
+    # are copied out of 'api_json' so that lookups by id, parent, room and date are indexed.
+    id = db.Column(db.Integer, nullable=False, primary_key=True)  # noqa: A003
+    parent_id = db.Column(db.Integer)
+    resource_id = db.Column(db.Integer)
+    recurrence_type = db.Column(db.String(80))
+    status = db.Column(db.String(80))
+    start_date = db.Column(db.DateTime(timezone=True))
+    end_date = db.Column(db.DateTime(timezone=True))
+    api_json = db.Column(JSONB, nullable=False)
+
+    def __repr__(self):
+        return f"""<KalturaEvent
+                    id={self.id},
+                    parent_id={self.parent_id},
+                    resource_id={self.resource_id},
+                    recurrence_type={self.recurrence_type},
+                    status={self.status},
+                    start_date={self.start_date},
+                    end_date={self.end_date},
+                    created_at={self.created_at},
+                    updated_at={self.updated_at}>
+                """
+
+    @classmethod
+    def get_events(cls, event_ids):
+        sql = """
+            SELECT api_json FROM kaltura_events
+            WHERE id = ANY(:event_ids) AND status IS DISTINCT FROM 'Deleted'
+            ORDER BY id
+        """
+        return _to_api_json(db.session.execute(text(sql), {'event_ids': [int(event_id) for event_id in event_ids]}))
+
+    @classmethod
+    def get_events_by_resource(cls, kaltura_resource_id):
+        # Same order as Kaltura's '-startDate'.
+        sql = """
+            SELECT api_json FROM kaltura_events
+            WHERE resource_id = :resource_id AND status IS DISTINCT FROM 'Deleted'
+            ORDER BY start_date DESC, id
+        """
+        return _to_api_json(db.session.execute(text(sql), {'resource_id': int(kaltura_resource_id)}))
+
+    @classmethod
+    def get_events_in_date_range(cls, end_date, start_date, recurrence_type=None):
+        sql = f"""
+            SELECT api_json FROM kaltura_events
+            WHERE start_date >= :start_date AND end_date <= :end_date AND status IS DISTINCT FROM 'Deleted'
+            {'' if recurrence_type is None else 'AND recurrence_type = :recurrence_type'}
+            ORDER BY start_date, id
+        """
+        params = {
+            'end_date': end_date,
+            'recurrence_type': recurrence_type,
+            'start_date': start_date,
+        }
+        return _to_api_json(db.session.execute(text(sql), params))
+
+    @classmethod
+    def get_synced_at(cls):
+        # Time as of which the mirror holds every change made in Kaltura, or None if the mirror was never synced.
+        return DataVersion.get_versions([KALTURA_EVENTS_VERSION_KEY])[KALTURA_EVENTS_VERSION_KEY][1]
+
+    @classmethod
+    def is_enabled(cls):
+        # With KALTURA_EVENTS_MAX_STALENESS of zero, events are neither read from nor copied into the mirror.
+        return bool(app.config['KALTURA_EVENTS_MAX_STALENESS'])
+
+    @classmethod
+    def is_fresh(cls):
+        max_staleness = app.config['KALTURA_EVENTS_MAX_STALENESS']
+        synced_at = cls.get_synced_at()
+        return bool(cls.is_enabled() and synced_at and utc_now() - synced_at <= timedelta(seconds=max_staleness))
+
+    @classmethod
+    def mark_synced(cls, synced_at):
+        DataVersion.bump([KALTURA_EVENTS_VERSION_KEY], updated_at=synced_at)
+
+    @classmethod
+    def update_resource_ids(cls, resource_id_per_event_id):
+        # Kaltura attaches rooms (i.e., resources) to series and one-off events. Recurrences are in the room of their series.
+        sql = """
+            UPDATE kaltura_events e
+            SET resource_id = r.resource_id
+            FROM json_to_recordset(:json_dumps) AS r(event_id INTEGER, resource_id INTEGER)
+            WHERE e.id = r.event_id AND e.resource_id IS DISTINCT FROM r.resource_id;
+            UPDATE kaltura_events e
+            SET resource_id = s.resource_id
+            FROM kaltura_events s
+            WHERE e.parent_id = s.id AND e.resource_id IS DISTINCT FROM s.resource_id;
+        """
+        data = [{'event_id': event_id, 'resource_id': resource_id} for event_id, resource_id in resource_id_per_event_id.items()]
+        db.session.execute(text(sql), {'json_dumps': json.dumps(data)})
+
+    @classmethod
+    def upsert(cls, events):
+        # Events are API JSON per _event_to_json, without 'recurrences'. Events deleted in Kaltura are kept, with status
+        # 'Deleted', and skipped by reads.
+        sql = """
+            INSERT INTO kaltura_events (
+                id, parent_id, recurrence_type, status, start_date, end_date, api_json, created_at, updated_at
+            )
+            SELECT
+                CAST(e->>'id' AS INTEGER),
+                NULLIF(CAST(e->>'parentId' AS INTEGER), 0),
+                e->>'recurrenceType',
+                e->>'status',
+                CAST(e->>'startDate' AS TIMESTAMP WITH TIME ZONE),
+                CAST(e->>'endDate' AS TIMESTAMP WITH TIME ZONE),
+                e,
+                now(),
+                now()
+            FROM jsonb_array_elements(CAST(:json_dumps AS JSONB)) AS e
+            ON CONFLICT (id) DO
+            UPDATE SET
+                parent_id = EXCLUDED.parent_id,
+                recurrence_type = EXCLUDED.recurrence_type,
+                status = EXCLUDED.status,
+                start_date = EXCLUDED.start_date,
+                end_date = EXCLUDED.end_date,
+                api_json = EXCLUDED.api_json,
+                updated_at = EXCLUDED.updated_at;
+        """
+        events = [{k: v for k, v in event.items() if k != 'recurrences'} for event in events]
+        if events:
+            db.session.execute(text(sql), {'json_dumps': json.dumps(events, default=str)})
+
+    @classmethod
+    def delete_events(cls, event_ids):
+        # Recurrences go with their series.
+        sql = 'DELETE FROM kaltura_events WHERE id = ANY(:event_ids) OR parent_id = ANY(:event_ids)'
+        db.session.execute(text(sql), {'event_ids': [int(event_id) for event_id in event_ids]})
+
+    @classmethod
+    def delete_all(cls):
+        db.session.execute(text('DELETE FROM kaltura_events'))
+
+
+def _to_api_json(rows):
+    return [row.api_json for row in rows]
@@ -25,6 +25,7 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from diablo import db, std_commit
 from diablo.lib.util import utc_now
 from diablo.models.base import Base
+from diablo.models.data_version import DataVersion
 from sqlalchemy import and_
 
 
@@ -74,6 +75,8 @@ class Note(Base):
                 uid=uid,
             )
         db.session.add(note)
+        if note.section_id:
+            DataVersion.bump_courses(term_id=note.term_id, section_ids=[note.section_id])
         std_commit()
         return note
 
@@ -87,6 +90,8 @@ class Note(Base):
             note = cls.query.filter_by(term_id=term_id, section_id=section_id).first()
         if note:
             note.deleted_at = now
+            if note.section_id:
+                DataVersion.bump_courses(term_id=note.term_id, section_ids=[note.section_id])
         std_commit()
         return note
 
@@ -26,8 +26,10 @@ from datetime import datetime
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.cross_listing import CrossListing
-from sqlalchemy import and_, or_
+from diablo.models.data_version import DataVersion
+from sqlalchemy import and_, or_, text
 
 
 class OptOut(db.Model):
@@ -58,13 +60,33 @@ class OptOut(db.Model):
                 """
 
     @classmethod
-    def get_all_opt_outs(cls, term_id):
-        return cls.query.filter(or_(cls.term_id == term_id, cls.term_id == None)).all()  # noqa E711
+    def get_opt_outs_for_section_ids(cls, section_ids, term_id):
+        criteria = and_(cls.section_id.in_(section_ids), or_(cls.term_id == term_id, cls.term_id == None))  # noqa E711
+        return cls.query.filter(criteria).all()
+
+    @classmethod
+    def get_blanket_opt_outs_for_uids(cls, uids, term_id):
+        criteria = and_(cls.instructor_uid.in_(uids), cls.section_id == None, or_(cls.term_id == term_id, cls.term_id == None))  # noqa E711
+        return cls.query.filter(criteria).all()
 
     @classmethod
     def get_blanket_opt_outs_for_uid(cls, uid):
         return cls.query.filter(and_(cls.instructor_uid == uid, cls.section_id == None)).all()  # noqa E711
 
+    @classmethod
+    def get_scheduled_section_ids_opted_out(cls, term_id):
+        sql = """
+            SELECT DISTINCT d.section_id
+            FROM scheduled d
+            JOIN sis_sections s ON s.term_id = d.term_id AND s.section_id = d.section_id
+            JOIN opt_outs o ON
+                o.instructor_uid = s.instructor_uid AND
+                (o.section_id = s.section_id OR o.section_id IS NULL) AND
+                (o.term_id = d.term_id OR o.term_id IS NULL)
+            WHERE d.term_id = :term_id AND d.deleted_at IS NULL
+        """
+        return [row['section_id'] for row in db.session.execute(text(sql), {'term_id': term_id})]
+
     @classmethod
     def get_opt_outs_for_section(cls, section_id=None, term_id=None):
         return cls.query.filter_by(section_id=section_id, term_id=term_id).all()
@@ -74,9 +96,14 @@ class OptOut(db.Model):
         if section_id is None:
             section_ids = [None]
             criteria = and_(cls.section_id == None, cls.term_id == term_id, cls.instructor_uid == instructor_uid)  # noqa E711
+            for term_id_, instructor_section_ids in _get_section_ids_per_term_id(instructor_uid, term_id).items():
+                CourseFeed.delete_per_section_ids(section_ids=instructor_section_ids, term_id=term_id_)
+                DataVersion.bump_courses(term_id=term_id_, section_ids=instructor_section_ids)
         else:
             section_ids = _get_section_ids_with_xlistings(section_id, term_id)
             criteria = and_(cls.section_id.in_(section_ids), cls.term_id == term_id, cls.instructor_uid == instructor_uid)
+            CourseFeed.delete_per_section_ids(section_ids=section_ids, term_id=term_id)
+            DataVersion.bump_courses(term_id=term_id, section_ids=section_ids)
 
         if opt_out is False:
             cls.query.filter(criteria).delete()
@@ -103,5 +130,17 @@ class OptOut(db.Model):
         }
 
 
+def _get_section_ids_per_term_id(instructor_uid, term_id=None):
+    # Sections of the instructor in any role. Feeds count blanket opt-outs of instructors (e.g., APRX) whom they do not list.
+    sql = f"""
+        SELECT term_id, array_agg(DISTINCT section_id) AS section_ids FROM sis_sections
+        WHERE instructor_uid = :instructor_uid
+        {'' if term_id is None else 'AND term_id = :term_id'}
+        GROUP BY term_id
+    """
+    rows = db.session.execute(text(sql), {'instructor_uid': instructor_uid, 'term_id': term_id})
+    return {row['term_id']: row['section_ids'] for row in rows}
+
+
 def _get_section_ids_with_xlistings(section_id, term_id):
     return CrossListing.get_cross_listed_section_ids(section_id=section_id, term_id=term_id) + [section_id]
@@ -27,7 +27,10 @@ from datetime import datetime
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import NAMES_PER_RECORDING_TYPE
+from diablo.models.data_version import DataVersion
+from diablo.models.eligible_section import refresh_eligible_sections
 from flask import current_app as app
 from sqlalchemy import func, text
 from sqlalchemy.dialects.postgresql import ENUM
@@ -81,6 +84,11 @@ class Room(db.Model):
             location=location,
         )
         db.session.add(room)
+        if capability:
+            db.session.flush()
+            refresh_eligible_sections(location=location)
+        CourseFeed.delete_all()
+        DataVersion.bump_rooms()
         std_commit()
         return room
 
@@ -144,19 +152,27 @@ class Room(db.Model):
         room = cls.query.filter_by(id=room_id).first()
         room.capability = capability
         db.session.add(room)
+        db.session.flush()
+        refresh_eligible_sections(location=room.location)
+        CourseFeed.delete_all()
+        DataVersion.bump_rooms()
         std_commit()
         return room
 
     @classmethod
     def update_kaltura_resource_mappings(cls, kaltura_resource_ids_per_room):
-        # First, set kaltura_resource_id = null on all rows
-        cls.query.update({cls.kaltura_resource_id: None})
-        # Next, insert the latest mappings
-        all_rooms_per_id = dict((room.id, room) for room in cls.all_rooms())
-        for room_id, kaltura_resource_id in kaltura_resource_ids_per_room.items():
-            room = all_rooms_per_id[room_id]
-            room.kaltura_resource_id = kaltura_resource_id
-            db.session.add(room)
+        # Rooms absent from the latest mappings have no Kaltura resource. Feeds and ETags are invalidated only if a mapping
+        # actually changed, since SIS data refresh calls this every time.
+        changed_rooms = []
+        for room in cls.all_rooms():
+            kaltura_resource_id = kaltura_resource_ids_per_room.get(room.id)
+            if room.kaltura_resource_id != kaltura_resource_id:
+                room.kaltura_resource_id = kaltura_resource_id
+                db.session.add(room)
+                changed_rooms.append(room)
+        if changed_rooms:
+            CourseFeed.delete_all()
+            DataVersion.bump_rooms()
         std_commit()
 
     @classmethod
@@ -164,6 +180,8 @@ class Room(db.Model):
         room = cls.query.filter_by(id=room_id).first()
         room.is_auditorium = is_auditorium
         db.session.add(room)
+        CourseFeed.delete_all()
+        DataVersion.bump_rooms()
         std_commit()
         return room
 
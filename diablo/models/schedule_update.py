@@ -28,6 +28,8 @@ import json
 
 from diablo import db, std_commit
 from diablo.lib.util import to_isoformat
+from diablo.models.course_feed import CourseFeed
+from diablo.models.data_version import DataVersion
 from sqlalchemy import and_, text
 from sqlalchemy.dialects.postgresql import ENUM
 
@@ -116,6 +118,8 @@ class ScheduleUpdate(db.Model):
             status='queued',
         )
         db.session.add(schedule_update)
+        CourseFeed.delete_per_section_ids(section_ids=[section_id], term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=[section_id])
         std_commit()
         return schedule_update
 
@@ -189,12 +193,16 @@ class ScheduleUpdate(db.Model):
         self.status = 'succeeded'
         self.published_at = datetime.now()
         db.session.add(self)
+        CourseFeed.delete_per_section_ids(section_ids=[self.section_id], term_id=self.term_id)
+        DataVersion.bump_courses(term_id=self.term_id, section_ids=[self.section_id])
         std_commit()
 
     def mark_error(self):
         self.status = 'errored'
         self.published_at = datetime.now()
         db.session.add(self)
+        CourseFeed.delete_per_section_ids(section_ids=[self.section_id], term_id=self.term_id)
+        DataVersion.bump_courses(term_id=self.term_id, section_ids=[self.section_id])
         std_commit()
 
     def to_api_json(self):
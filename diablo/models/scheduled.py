@@ -25,9 +25,11 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime, timedelta
 
 from diablo import db, std_commit
-from diablo.externals.loch import get_loch_basic_attributes
-from diablo.lib.util import basic_attributes_to_api_json, format_days, format_time, get_names_of_days, local_now, to_isoformat
-from diablo.models.course_preference import NAMES_PER_PUBLISH_TYPE, NAMES_PER_RECORDING_TYPE, publish_type, recording_type
+from diablo.lib.util import local_now
+from diablo.models.course_feed import CourseFeed
+from diablo.models.course_preference import publish_type, recording_type
+from diablo.models.course_records import ScheduledSeries, ScheduledSeriesSummary
+from diablo.models.data_version import DataVersion
 from diablo.models.email_template import email_template_type
 from diablo.models.room import Room
 from sqlalchemy import and_, func, text
@@ -144,6 +146,8 @@ class Scheduled(db.Model):
             term_id=term_id,
         )
         db.session.add(scheduled)
+        CourseFeed.delete_per_section_ids(section_ids=[section_id], term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=[section_id])
         std_commit()
         return scheduled
 
@@ -170,7 +174,8 @@ class Scheduled(db.Model):
 
     @classmethod
     def get_scheduled_per_instructor_uid(cls, instructor_uid, term_id):
-        criteria = and_(cls.instructor_uids.any(instructor_uid), cls.term_id == term_id, cls.deleted_at == None)  # noqa: E711
+        # Containment (@>) rather than ANY so that the GIN index on instructor_uids applies.
+        criteria = and_(cls.instructor_uids.contains([instructor_uid]), cls.term_id == term_id, cls.deleted_at == None)  # noqa: E711
         return [r[0] for r in db.session.query(cls.section_id).filter(criteria).all()]
 
     @classmethod
@@ -185,53 +190,27 @@ class Scheduled(db.Model):
             sql += ' AND kaltura_schedule_id = :kaltura_schedule_id'
             params['kaltura_schedule_id'] = kaltura_schedule_id
         db.session.execute(text(sql), params)
+        CourseFeed.delete_per_section_ids(section_ids=[section_id], term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=[section_id])
 
     def update(self, **kwargs):
         for key, value in kwargs.items():
             setattr(self, key, value)
         db.session.add(self)
+        CourseFeed.delete_per_section_ids(section_ids=[self.section_id], term_id=self.term_id)
+        DataVersion.bump_courses(term_id=self.term_id, section_ids=[self.section_id])
         std_commit()
 
     def to_api_json(self, include_full_schedule=True, rooms_by_id=None):
-        room_feed = None
+        return self.to_record(include_full_schedule=include_full_schedule, rooms_by_id=rooms_by_id).to_api_json()
+
+    def to_record(self, include_full_schedule=True, rooms_by_id=None):
+        if not include_full_schedule:
+            return ScheduledSeriesSummary(self)
+        room = None
         if self.room_id:
-            if rooms_by_id:
-                room_feed = rooms_by_id.get(self.room_id, None).to_api_json()
-            else:
-                room_feed = Room.get_room(self.room_id).to_api_json()
-        formatted_days = format_days(self.meeting_days)
-        if include_full_schedule:
-            collaborator_attributes = get_loch_basic_attributes(self.collaborator_uids) if self.collaborator_uids else []
-            return {
-                'id': self.id,
-                'courseDisplayName': self.course_display_name,
-                'createdAt': to_isoformat(self.created_at),
-                'instructorUids': self.instructor_uids,
-                'collaborators': [basic_attributes_to_api_json(a) for a in collaborator_attributes],
-                'collaboratorUids': self.collaborator_uids,
-                'kalturaScheduleId': self.kaltura_schedule_id,
-                'meetingDays': formatted_days,
-                'meetingDaysNames': get_names_of_days(formatted_days),
-                'meetingEndDate': datetime.strftime(self.meeting_end_date, '%Y-%m-%d'),
-                'meetingEndTime': self.meeting_end_time,
-                'meetingEndTimeFormatted': format_time(self.meeting_end_time),
-                'meetingStartDate': datetime.strftime(self.meeting_start_date, '%Y-%m-%d'),
-                'meetingStartTime': self.meeting_start_time,
-                'meetingStartTimeFormatted': format_time(self.meeting_start_time),
-                'publishType': self.publish_type,
-                'publishTypeName': NAMES_PER_PUBLISH_TYPE[self.publish_type],
-                'recordingType': self.recording_type,
-                'recordingTypeName': NAMES_PER_RECORDING_TYPE[self.recording_type],
-                'room': room_feed,
-                'sectionId': self.section_id,
-                'termId': self.term_id,
-            }
-        else:
-            return {
-                'id': self.id,
-                'publishTypeName': NAMES_PER_PUBLISH_TYPE[self.publish_type],
-                'createdAt': to_isoformat(self.created_at),
-            }
+            room = rooms_by_id.get(self.room_id, None) if rooms_by_id else Room.get_room(self.room_id)
+        return ScheduledSeries(self, room=room)
 
 
 def is_meeting_in_session(scheduled_json):
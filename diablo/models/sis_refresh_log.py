@@ -0,0 +1,70 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from datetime import datetime
+
+from diablo import db
+from diablo.lib.util import to_isoformat
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+class SisRefreshLog(db.Model):
+    __tablename__ = 'sis_refresh_log'
+
+    # Rows are written by update_rds_sis_sections.template.sql, one per SIS data refresh.
+    id = db.Column(db.Integer, nullable=False, primary_key=True)  # noqa: A003
+    term_id = db.Column(db.Integer, nullable=False)
+    inserted_section_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    updated_section_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    deleted_section_ids = db.Column(ARRAY(db.Integer), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f"""<SisRefreshLog
+                    id={self.id},
+                    term_id={self.term_id},
+                    inserted_section_ids={self.inserted_section_ids},
+                    updated_section_ids={self.updated_section_ids},
+                    deleted_section_ids={self.deleted_section_ids},
+                    created_at={self.created_at}>
+                """
+
+    @classmethod
+    def get_latest(cls, term_id):
+        return cls.query.filter_by(term_id=term_id).order_by(cls.id.desc()).first()
+
+    @property
+    def changed_section_ids(self):
+        return sorted(set(self.inserted_section_ids + self.updated_section_ids + self.deleted_section_ids))
+
+    def to_api_json(self):
+        return {
+            'id': self.id,
+            'termId': self.term_id,
+            'insertedSectionIds': self.inserted_section_ids,
+            'updatedSectionIds': self.updated_section_ids,
+            'deletedSectionIds': self.deleted_section_ids,
+            'createdAt': to_isoformat(self.created_at),
+        }
@@ -22,25 +22,37 @@ SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
 "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
 ENHANCEMENTS, OR MODIFICATIONS.
 """
+import copy
 from datetime import datetime
+import re
 
 from diablo import db
 from diablo.externals.canvas import get_course_sites_by_id
-from diablo.lib.berkeley import get_recording_end_date, get_recording_start_date
-from diablo.lib.util import format_days, format_time, get_names_of_days, safe_strftime
+from diablo.lib.util import safe_strftime
+from diablo.models.course_feed import CourseFeed
 from diablo.models.course_preference import CoursePreference
+from diablo.models.course_records import Course, Instructor, Meeting
 from diablo.models.cross_listing import CrossListing
+from diablo.models.data_version import DataVersion
+from diablo.models.eligible_section import eligible_section_ids_sql
+from diablo.models.instructor_section import InstructorSection
 from diablo.models.note import Note
 from diablo.models.opt_out import OptOut
 from diablo.models.room import Room
 from diablo.models.schedule_update import ScheduleUpdate
 from diablo.models.scheduled import Scheduled
-from flask import current_app as app
 from sqlalchemy import text
 
 AUTHORIZED_INSTRUCTOR_ROLE_CODES = ['ICNT', 'PI', 'TNIC']
 ALL_INSTRUCTOR_ROLE_CODES = ['APRX'] + AUTHORIZED_INSTRUCTOR_ROLE_CODES
 
+COURSE_ROWS_ORDER_BY = 's.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST'
+
+COURSE_PAGE_SORT_KEYS = {
+    'courseName': "COALESCE(s.course_name, '')",
+    'sectionId': 's.section_id',
+}
+
 
 class SisSection(db.Model):
     __tablename__ = 'sis_sections'
@@ -130,7 +142,11 @@ class SisSection(db.Model):
 
     @classmethod
     def set_non_principal_listings(cls, section_ids, term_id):
-        sql = 'UPDATE sis_sections SET is_principal_listing = FALSE WHERE term_id = :term_id AND section_id  = ANY(:section_ids)'
+        # SIS data refresh updates rows in place, so sections no longer cross-listed must be reset, too.
+        sql = """
+            UPDATE sis_sections SET is_principal_listing = NOT (section_id = ANY(:section_ids))
+            WHERE term_id = :term_id AND is_principal_listing IS DISTINCT FROM NOT (section_id = ANY(:section_ids))
+        """
         db.session.execute(
             text(sql),
             {
@@ -167,47 +183,41 @@ class SisSection(db.Model):
             include_notes=False,
             include_update_history=True,
     ):
-        sql = f"""
-            SELECT
-                s.*,
-                i.dept_code AS instructor_dept_code,
-                i.email AS instructor_email,
-                i.first_name || ' ' || i.last_name AS instructor_name,
-                i.uid AS instructor_uid,
-                r.id AS room_id,
-                r.location AS room_location
-            FROM sis_sections s
-            LEFT JOIN rooms r ON r.location = s.meeting_location
-            LEFT JOIN instructors i
-              ON i.uid = s.instructor_uid
-              AND s.instructor_role_code = ANY(:instructor_role_codes)
-            WHERE
-                s.term_id = :term_id
-                AND s.section_id = :section_id
-                AND s.is_principal_listing IS TRUE
-                {'' if include_deleted else ' AND s.deleted_at IS NULL '}
-            ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
-        """
-        rows = db.session.execute(
-            text(sql),
-            {
-                'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
-                'section_id': section_id,
-                'term_id': term_id,
-            },
-        )
-        api_json = _to_api_json(
-            term_id=term_id,
-            rows=rows,
-            include_notes=include_notes,
-            include_update_history=include_update_history,
-        )
-        feed = api_json[0] if api_json else None
-        if feed and include_canvas_sites:
-            feed['canvasSites'] = get_course_sites_by_id(feed['canvasSiteIds'])
-
+        term_id = int(term_id)
+        section_id = int(section_id)
+        # Stored feeds are written by refresh_course_feeds only. A missing or stale feed is built anew, and not stored.
+        course_feed = CourseFeed.get(term_id=term_id, section_id=section_id, include_deleted=include_deleted)
+        if course_feed:
+            # The stored feed belongs to an identity-mapped row. Decorate a copy, lest later reads in the session see the changes.
+            feed = copy.deepcopy(course_feed.feed)
+        else:
+            feed = _get_course_feeds(term_id=term_id, section_ids=[section_id], include_deleted=include_deleted).get(section_id)
+        if feed:
+            if include_canvas_sites:
+                feed['canvasSites'] = get_course_sites_by_id(feed['canvasSiteIds'])
+            if include_notes:
+                note = next(iter(Note.get_notes_for_section_ids(section_ids=[section_id], term_id=term_id)), None)
+                if note:
+                    feed['note'] = note.body
+            if not include_update_history:
+                feed.pop('updateHistory', None)
         return feed
 
+    @classmethod
+    def refresh_course_feeds(cls, term_id):
+        CourseFeed.delete_all(term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id)
+        for include_deleted in [False, True]:
+            versions = DataVersion.get_course_versions(term_id=term_id)
+            feeds_per_section_id = _get_course_feeds(term_id=term_id, include_deleted=include_deleted)
+            CourseFeed.upsert(
+                term_id=term_id,
+                feeds_per_section_id=feeds_per_section_id,
+                include_deleted=include_deleted,
+                versions=versions,
+            )
+        return len(feeds_per_section_id)
+
     @classmethod
     def get_courses(
             cls,
@@ -221,6 +231,8 @@ class SisSection(db.Model):
             include_null_meeting_locations=False,
             instructor_uids=None,
             section_ids=None,
+            aggregate_in_sql=False,
+            as_records=False,
     ):
         instructor_role_codes = ALL_INSTRUCTOR_ROLE_CODES
         params = {
@@ -233,7 +245,7 @@ class SisSection(db.Model):
             if include_ineligible:
                 course_filter = 'TRUE'
             else:
-                course_filter = f's.section_id IN ({_sections_with_at_least_one_eligible_room()})'
+                course_filter = f's.section_id IN ({eligible_section_ids_sql()})'
         else:
             course_filter = 's.section_id = ANY(:section_ids)'
             params['section_ids'] = section_ids
@@ -247,16 +259,7 @@ class SisSection(db.Model):
         else:
             exclude_scheduled_join = ''
 
-        sql = f"""
-            SELECT
-                s.*,
-                i.dept_code AS instructor_dept_code,
-                i.email AS instructor_email,
-                i.first_name || ' ' || i.last_name AS instructor_name,
-                i.uid AS instructor_uid,
-                {'sch.kaltura_schedule_id,' if exclude_scheduled else ''}
-                r.id AS room_id,
-                r.location AS room_location
+        from_sql = f"""
             FROM sis_sections s
             {'LEFT' if include_null_meeting_locations or include_ineligible else ''} JOIN rooms r ON r.location = s.meeting_location
             LEFT JOIN instructors i ON i.uid = s.instructor_uid
@@ -268,7 +271,28 @@ class SisSection(db.Model):
                 {'' if include_non_principal_sections else 'AND s.is_principal_listing IS TRUE'}
                 {'' if include_deleted else ' AND s.deleted_at IS NULL '}
                 {'AND sch.kaltura_schedule_id IS NULL' if exclude_scheduled else ''}
-            ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
+        """
+        if aggregate_in_sql:
+            rows = db.session.execute(text(_to_aggregated_courses_sql(from_sql)), params)
+            return _aggregated_rows_to_api_json(
+                term_id=term_id,
+                rows=rows,
+                include_administrative_proxies=include_administrative_proxies,
+                include_full_schedules=include_full_schedules,
+                as_records=as_records,
+            )
+        sql = f"""
+            SELECT
+                s.*,
+                i.dept_code AS instructor_dept_code,
+                i.email AS instructor_email,
+                i.first_name || ' ' || i.last_name AS instructor_name,
+                i.uid AS instructor_uid,
+                {'sch.kaltura_schedule_id,' if exclude_scheduled else ''}
+                r.id AS room_id,
+                r.location AS room_location
+            {from_sql}
+            ORDER BY {COURSE_ROWS_ORDER_BY}
         """
         rows = db.session.execute(text(sql), params)
         return _to_api_json(
@@ -276,10 +300,110 @@ class SisSection(db.Model):
             rows=rows,
             include_administrative_proxies=include_administrative_proxies,
             include_full_schedules=include_full_schedules,
+            as_records=as_records,
         )
 
     @classmethod
-    def get_courses_opted_out(cls, term_id, include_full_schedules=True):
+    def get_courses_page(
+            cls,
+            term_id,
+            filter_,
+            limit,
+            after=None,
+            search_text=None,
+            sort_by='courseName',
+            sort_desc=False,
+    ):
+        # Keyset pagination: sections are ordered by (sort_key, section_id) and 'after' is the key of the last section
+        # on the previous page. Only sections on the requested page are fetched in full.
+        keys_sql, instructor_role_codes = _section_keys_per_filter(filter_)
+        params = {
+            'instructor_role_codes': instructor_role_codes,
+            'term_id': term_id,
+        }
+        if search_text:
+            keys_sql += """
+                AND (
+                    s.course_name ILIKE :search_text
+                    OR s.course_title ILIKE :search_text
+                    OR s.instructor_name ILIKE :search_text
+                    OR s.meeting_location ILIKE :search_text
+                    OR CAST(s.section_id AS VARCHAR) LIKE :search_text
+                )
+            """
+            params['search_text'] = '%' + re.sub(r'([%_\\])', r'\\\1', search_text.strip()) + '%'
+        sort_key = COURSE_PAGE_SORT_KEYS[sort_by]
+        section_keys_sql = f"""
+            WITH section_keys AS (
+                SELECT s.section_id, MIN({sort_key}) AS sort_key
+                {keys_sql}
+                GROUP BY s.section_id
+            )
+        """
+        total_count = db.session.execute(text(f'{section_keys_sql} SELECT COUNT(*) FROM section_keys'), params).scalar()
+
+        direction = 'DESC' if sort_desc else 'ASC'
+        if after:
+            keyset_filter = f"WHERE (sort_key, section_id) {'<' if sort_desc else '>'} (:after_sort_key, :after_section_id)"
+            params.update({
+                'after_section_id': int(after['sectionId']),
+                'after_sort_key': after['sortKey'],
+            })
+        else:
+            keyset_filter = ''
+        sql = f"""
+            {section_keys_sql}
+            SELECT section_id, sort_key FROM section_keys
+            {keyset_filter}
+            ORDER BY sort_key {direction}, section_id {direction}
+            LIMIT :limit
+        """
+        params['limit'] = limit
+        page_keys = [(row['section_id'], row['sort_key']) for row in db.session.execute(text(sql), params)]
+        section_ids = [section_id for section_id, _ in page_keys]
+
+        courses = cls._get_courses_per_filter(term_id=term_id, filter_=filter_, section_ids=section_ids)
+
+        if len(page_keys) == limit:
+            last_section_id, last_sort_key = page_keys[-1]
+            next_cursor = {'sectionId': last_section_id, 'sortKey': last_sort_key}
+        else:
+            next_cursor = None
+        return {
+            'courses': courses,
+            'nextCursor': next_cursor,
+            'totalCount': total_count,
+        }
+
+    @classmethod
+    def stream_courses(cls, term_id, filter_, chunk_size=500):
+        # Generate the courses of a filter, ordered by course name. Section ids are read through a server-side cursor
+        # and courses are assembled a chunk of sections at a time, so memory use does not grow with the size of the term.
+        keys_sql, instructor_role_codes = _section_keys_per_filter(filter_)
+        sql = f"""
+            SELECT s.section_id
+            {keys_sql}
+            GROUP BY s.section_id
+            ORDER BY MIN(s.course_name), s.section_id
+        """
+        rows = db.session.execute(
+            text(sql).execution_options(stream_results=True),
+            {
+                'instructor_role_codes': instructor_role_codes,
+                'term_id': term_id,
+            },
+        )
+        section_ids = []
+        for row in rows:
+            section_ids.append(row['section_id'])
+            if len(section_ids) == chunk_size:
+                yield from cls._get_courses_per_filter(term_id=term_id, filter_=filter_, section_ids=section_ids)
+                section_ids = []
+        if section_ids:
+            yield from cls._get_courses_per_filter(term_id=term_id, filter_=filter_, section_ids=section_ids)
+
+    @classmethod
+    def get_courses_opted_out(cls, term_id, include_full_schedules=True, section_ids=None):
         sql = f"""
             SELECT
                 s.*,
@@ -300,14 +424,16 @@ class SisSection(db.Model):
                 s.term_id = :term_id
                 AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
                 AND s.is_principal_listing IS TRUE
-                AND s.section_id IN ({_sections_with_at_least_one_eligible_room()})
+                AND s.section_id IN ({eligible_section_ids_sql()})
                 AND s.deleted_at IS NULL
+                {'' if section_ids is None else 'AND s.section_id = ANY(:section_ids)'}
             ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
         """
         rows = db.session.execute(
             text(sql),
             {
                 'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+                'section_ids': section_ids,
                 'term_id': term_id,
             },
         )
@@ -315,42 +441,8 @@ class SisSection(db.Model):
 
     @classmethod
     def get_courses_per_instructor_uid(cls, term_id, instructor_uid):
-        # Find all section_ids, including cross-listings
-        sql = """
-            SELECT s.section_id, s.is_principal_listing
-            FROM sis_sections s
-            JOIN instructors i
-                ON i.uid = s.instructor_uid
-                AND s.term_id = :term_id
-                AND s.instructor_uid = :instructor_uid
-                AND s.instructor_role_code = ANY(:instructor_role_codes)
-            WHERE s.deleted_at IS NULL
-        """
-        non_principal_section_ids = []
-        section_ids = []
-        args = {
-            'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
-            'instructor_uid': instructor_uid,
-            'term_id': term_id,
-        }
-        for row in db.session.execute(text(sql), args):
-            if row['is_principal_listing'] is False:
-                non_principal_section_ids.append(row['section_id'])
-            else:
-                section_ids.append(row['section_id'])
-
-        if non_principal_section_ids:
-            # Instructor is associated with cross-listed section_ids
-            sql = f"""
-                SELECT section_id
-                FROM cross_listings
-                WHERE
-                    term_id = :term_id
-                    AND cross_listed_section_ids && ARRAY[{','.join(str(id_) for id_ in non_principal_section_ids)}]
-            """
-            for row in db.session.execute(text(sql), {'section_ids': instructor_uid, 'term_id': term_id}):
-                section_ids.append(row['section_id'])
-
+        # The index includes principal listings of sections cross-listed with those the instructor teaches.
+        section_ids = InstructorSection.get_section_ids(term_id=term_id, instructor_uid=instructor_uid)
         return cls.get_courses(term_id=term_id, section_ids=section_ids)
 
     @classmethod
@@ -396,8 +488,20 @@ class SisSection(db.Model):
         return _to_api_json(term_id=term_id, rows=rows, include_rooms=False)
 
     @classmethod
-    def get_courses_scheduled(cls, term_id, include_administrative_proxies=False, include_full_schedules=True, instructor_uids=None):
-        scheduled_section_ids = list(cls._section_ids_scheduled(term_id))
+    def get_courses_scheduled(
+            cls,
+            term_id,
+            include_administrative_proxies=False,
+            include_full_schedules=True,
+            instructor_uids=None,
+            section_ids=None,
+            as_records=False,
+    ):
+        scheduled_section_ids = cls._section_ids_scheduled(term_id)
+        if section_ids is None:
+            scheduled_section_ids = list(scheduled_section_ids)
+        else:
+            scheduled_section_ids = [section_id for section_id in section_ids if section_id in scheduled_section_ids]
         return cls.get_courses(
             term_id=term_id,
             section_ids=scheduled_section_ids,
@@ -405,10 +509,11 @@ class SisSection(db.Model):
             include_deleted=True,
             include_administrative_proxies=include_administrative_proxies,
             include_full_schedules=include_full_schedules,
+            as_records=as_records,
         )
 
     @classmethod
-    def get_courses_without_instructors(cls, term_id, include_full_schedules=True):
+    def get_courses_without_instructors(cls, term_id, include_full_schedules=True, section_ids=None):
         sql = f"""
             SELECT
                 s.*,
@@ -424,14 +529,16 @@ class SisSection(db.Model):
                 s.term_id = :term_id
                 AND s.instructor_uid IS NULL
                 AND s.is_principal_listing IS TRUE
-                AND s.section_id IN ({_sections_with_at_least_one_eligible_room()})
+                AND s.section_id IN ({eligible_section_ids_sql()})
                 AND s.deleted_at IS NULL
+                {'' if section_ids is None else 'AND s.section_id = ANY(:section_ids)'}
             ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
         """
         rows = db.session.execute(
             text(sql),
             {
                 'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+                'section_ids': section_ids,
                 'term_id': term_id,
             },
         )
@@ -481,6 +588,26 @@ class SisSection(db.Model):
         )
         return results.rowcount > 0
 
+    @classmethod
+    def _get_courses_per_filter(cls, term_id, filter_, section_ids):
+        if not section_ids:
+            courses = []
+        elif filter_ == 'All':
+            courses = cls.get_courses(term_id, include_full_schedules=False, include_ineligible=True, section_ids=section_ids)
+        elif filter_ == 'Eligible':
+            courses = cls.get_courses(term_id, include_full_schedules=False, section_ids=section_ids)
+        elif filter_ == 'Opted Out':
+            courses = cls.get_courses_opted_out(term_id, include_full_schedules=False, section_ids=section_ids)
+        elif filter_ == 'Scheduled':
+            courses = cls.get_courses_scheduled(term_id, include_full_schedules=False, section_ids=section_ids)
+        elif filter_ == 'No Instructors':
+            courses = cls.get_courses_without_instructors(term_id, include_full_schedules=False, section_ids=section_ids)
+
+        # Feed generation orders courses by name; restore the order of section_ids.
+        position_per_section_id = {section_id: index for index, section_id in enumerate(section_ids)}
+        courses.sort(key=lambda c: position_per_section_id[c['sectionId']])
+        return courses
+
     @classmethod
     def _section_ids_scheduled(cls, term_id):
         sql = """
@@ -505,7 +632,7 @@ class SisSection(db.Model):
         return set([row['section_id'] for row in rows])
 
 
-def _to_api_json(  # noqa C901
+def _to_api_json(
     term_id,
     rows,
     include_administrative_proxies=False,
@@ -513,46 +640,22 @@ def _to_api_json(  # noqa C901
     include_notes=False,
     include_rooms=True,
     include_update_history=False,
+    as_records=False,
 ):
+    # Courses are built as compact records (see course_records.py) and, unless 'as_records', rendered as dicts.
     rows = rows.fetchall()
     section_ids = list(set(int(row['section_id']) for row in rows))
+    feed_data = _get_feed_data(
+        term_id=term_id,
+        section_ids=section_ids,
+        instructor_uids=set(row['instructor_uid'] for row in rows),
+        room_ids=set(row['room_id'] for row in rows),
+        include_full_schedules=include_full_schedules,
+        include_notes=include_notes,
+        include_update_history=include_update_history,
+    )
     courses_per_id = {}
 
-    # Perform bulk queries and build data structures for feed generation.
-    all_course_preferences = CoursePreference.get_all_course_preferences(term_id=term_id)
-    course_preferences_by_section_id = dict((p.section_id, p) for p in all_course_preferences)
-
-    opt_outs_by_section_id = {}
-    blanket_opt_outs_by_instructor_uid = {}
-    for o in OptOut.get_all_opt_outs(term_id=term_id):
-        if o.section_id:
-            if o.section_id not in opt_outs_by_section_id:
-                opt_outs_by_section_id[o.section_id] = []
-            opt_outs_by_section_id[o.section_id].append(o)
-        else:
-            if o.instructor_uid not in blanket_opt_outs_by_instructor_uid:
-                blanket_opt_outs_by_instructor_uid[o.instructor_uid] = []
-            blanket_opt_outs_by_instructor_uid[o.instructor_uid].append(o)
-
-    scheduled_results = Scheduled.get_scheduled_per_section_ids(section_ids=section_ids, term_id=term_id)
-
-    room_ids = set(row['room_id'] for row in rows)
-    room_ids.update(s.room_id for s in scheduled_results)
-    rooms = Room.get_rooms(list(room_ids))
-    rooms_by_id = {room.id: room for room in rooms}
-
-    scheduled_by_section_id = {}
-    for s in scheduled_results:
-        if s.section_id not in scheduled_by_section_id:
-            scheduled_by_section_id[s.section_id] = []
-        scheduled_by_section_id[s.section_id].append(s.to_api_json(include_full_schedule=include_full_schedules, rooms_by_id=rooms_by_id))
-
-    if include_notes:
-        note_results = Note.get_notes_for_section_ids(section_ids=section_ids, term_id=term_id)
-        notes_by_section_id = {note.section_id: note.body for note in note_results}
-
-    cross_listings_per_section_id, instructors_per_section_id = _get_cross_listed_courses(term_id=term_id, section_ids=section_ids)
-
     # Construct course objects.
     # If course has multiple instructors or multiple rooms then the section_id will be represented across multiple rows.
     # Multiple rooms are rare, but a course is sometimes associated with both an eligible and an ineligible room. We
@@ -562,296 +665,513 @@ def _to_api_json(  # noqa C901
         if section_id in courses_per_id:
             course = courses_per_id[section_id]
         else:
-            # Instructors per cross-listings
-            cross_listed_courses = cross_listings_per_section_id.get(section_id, [])
-            instructors = instructors_per_section_id.get(section_id, [])
-
-            cross_listed_section_ids = [c['sectionId'] for c in cross_listed_courses]
-            cross_listed_section_ids.append(section_id)
-
-            # Construct course
-            scheduled = scheduled_by_section_id.get(section_id)
-            opt_outs = opt_outs_by_section_id.get(section_id) or []
-
-            preferences = course_preferences_by_section_id.get(section_id)
-            if preferences:
-                preferences = preferences.to_api_json(include_collaborator_attributes=include_full_schedules)
-            elif scheduled:
-                preferences = scheduled[0]
-            else:
-                preferences = {}
-
-            if preferences.get('canvasSiteIds'):
-                canvas_site_ids = [int(site_id) for site_id in preferences['canvasSiteIds']]
-            else:
-                canvas_site_ids = None
-
-            course = {
-                'allowedUnits': row['allowed_units'],
-                'collaboratorUids': preferences.get('collaboratorUids'),
-                'canvasSiteIds': canvas_site_ids,
-                'courseName': row['course_name'],
-                'courseTitle': row['course_title'],
-                'crossListings': cross_listed_courses,
-                'deletedAt': safe_strftime(row['deleted_at'], '%Y-%m-%d'),
-                'hasBlanketOptedOut': False,
-                'hasOptedOut': True if len(opt_outs) else False,
-                'instructionFormat': row['instruction_format'],
-                'instructors': instructors,
-                'isPrimary': row['is_primary'],
-                'label': _construct_course_label(
-                    course_name=row['course_name'],
-                    instruction_format=row['instruction_format'],
-                    section_num=row['section_num'],
-                    cross_listings=cross_listed_courses,
-                ),
-                'meetings': {
-                    'eligible': [],
-                    'ineligible': [],
-                },
-                'nonstandardMeetingDates': False,
-                'optOuts': [],
-                'publishType': preferences.get('publishType'),
-                'publishTypeName': preferences.get('publishTypeName'),
-                'recordingType': preferences.get('recordingType'),
-                'recordingTypeName': preferences.get('recordingTypeName'),
-                'sectionId': section_id,
-                'sectionNum': row['section_num'],
-                'scheduled': scheduled,
-                'termId': row['term_id'],
-            }
-
-            if include_full_schedules:
-                course['collaborators'] = preferences.get('collaborators')
-
-            if include_update_history:
-                schedule_updates = ScheduleUpdate.get_update_history_for_section_ids(term_id=row['term_id'], section_ids=cross_listed_section_ids)
-                course['updateHistory'] = [u.to_api_json() for u in schedule_updates]
-
+            course = _to_course(
+                row=row,
+                feed_data=feed_data,
+                include_full_schedules=include_full_schedules,
+                include_update_history=include_update_history,
+            )
             courses_per_id[section_id] = course
 
         # Note: Instructors associated with cross-listings were slurped up above, as part of the _get_cross_listed_courses method call.
         instructor_uid = row['instructor_uid']
         instructor_uid = instructor_uid.strip() if instructor_uid else None
         if instructor_uid:
-            existing_instructor = next((i for i in course['instructors'] if i['uid'] == instructor_uid), None)
+            existing_instructor = next((i for i in course.instructors if i.uid == instructor_uid), None)
             if existing_instructor:
-                if _get_role_code_rank(row['instructor_role_code']) > _get_role_code_rank(existing_instructor['roleCode']):
-                    existing_instructor['roleCode'] = row['instructor_role_code']
+                if _get_role_code_rank(row['instructor_role_code']) > _get_role_code_rank(existing_instructor.role_code):
+                    existing_instructor.role_code = row['instructor_role_code']
             else:
-                instructor_json = _to_instructor_json(row)
+                instructor = _to_instructor(row)
                 # Note:
                 # 1. If the course IS NOT DELETED then include only non-deleted instructors.
                 # 2. If the course IS DELETED then include deleted instructors.
-                if not instructor_json['deletedAt'] or course['deletedAt']:
-                    course['instructors'].append(instructor_json)
-
-        blanket_opt_outs = []
-        decorated_course_instructors = []
-        for i in course['instructors']:
-            instructor_has_opted_out = False
-            blanket_opt_outs_for_instructor = blanket_opt_outs_by_instructor_uid.get(i['uid'])
-            if blanket_opt_outs_for_instructor:
-                instructor_has_opted_out = True
-                blanket_opt_outs += blanket_opt_outs_for_instructor
-            else:
-                instructor_opt_out = next((o for o in opt_outs if o.instructor_uid == i['uid']), None)
-                if instructor_opt_out:
-                    course['optOuts'].append(instructor_opt_out.to_api_json())
-                    instructor_has_opted_out = True
-            decorated_course_instructors.append({**i, **{'hasOptedOut': instructor_has_opted_out}})
-
-        if include_administrative_proxies:
-            course['instructors'] = decorated_course_instructors
-        else:
-            course['instructors'] = [i for i in decorated_course_instructors if i['roleCode'] != 'APRX']
-
-        if blanket_opt_outs:
-            course['hasBlanketOptedOut'] = True
-            course['optOuts'] += [o.to_api_json() for o in blanket_opt_outs]
-        if len(course['optOuts']):
-            course['hasOptedOut'] = True
-        meeting = _to_meeting_json(row)
-        eligible_meetings = course['meetings']['eligible']
-        ineligible_meetings = course['meetings']['ineligible']
-        if not next((m for m in (eligible_meetings + ineligible_meetings) if meeting.items() <= m.items()), None):
-            room = rooms_by_id.get(row['room_id']) if 'room_id' in row.keys() else None
-            if room and room.capability:
-                meeting['eligible'] = True
-                meeting.update({
-                    'recordingEndDate': safe_strftime(get_recording_end_date(meeting), '%Y-%m-%d'),
-                    'recordingStartDate': safe_strftime(get_recording_start_date(meeting), '%Y-%m-%d'),
-                })
-                eligible_meetings.append(meeting)
-                eligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
-                if meeting['startDate'] != app.config['CURRENT_TERM_BEGIN'] or meeting['endDate'] != app.config['CURRENT_TERM_END']:
-                    course['nonstandardMeetingDates'] = True
-            else:
-                meeting['eligible'] = False
-                ineligible_meetings.append(meeting)
-                ineligible_meetings.sort(key=lambda m: f"{m['startDate']} {m['startTime']}")
+                if not instructor.deleted_at or course.deleted_at:
+                    course.instructors.append(instructor)
+
+        _decorate_course_opt_outs(course, feed_data, include_administrative_proxies)
+
+        meeting = _to_meeting(row)
+        eligible_meetings = course.meetings['eligible']
+        ineligible_meetings = course.meetings['ineligible']
+        if not next((m for m in (eligible_meetings + ineligible_meetings) if meeting.has_same_pattern(m)), None):
+            room = feed_data['rooms_by_id'].get(row['room_id']) if 'room_id' in row.keys() else None
+            _add_course_meeting(course, meeting, room)
+            eligible_meetings.sort(key=lambda m: f'{m.start_date} {m.start_time}')
+            ineligible_meetings.sort(key=lambda m: f'{m.start_date} {m.start_time}')
             if include_rooms:
                 if room:
-                    meeting['room'] = room.to_api_json()
+                    meeting.room = room.to_api_json()
                 elif 'meeting_location' in row.keys():
-                    meeting['room'] = {'location': row['meeting_location']}
+                    meeting.room = {'location': row['meeting_location']}
                 else:
-                    meeting['room'] = None
+                    meeting.room = None
 
-        if include_notes and section_id in notes_by_section_id:
-            course['note'] = notes_by_section_id[section_id]
+        if include_notes and section_id in feed_data['notes_by_section_id']:
+            course.note = feed_data['notes_by_section_id'][section_id]
 
-    # Next, construct the feed
-    api_json = []
-    for section_id, course in courses_per_id.items():
-        _decorate_course_meeting_type(course)
-        # Add course to the feed
-        api_json.append(course)
+    courses = list(courses_per_id.values())
+    return courses if as_records else [course.to_api_json() for course in courses]
 
-    return api_json
+
+def _to_aggregated_courses_sql(from_sql):
+    # One row per course. Course-level columns come from the course's first row in COURSE_ROWS_ORDER_BY order, as in
+    # _to_api_json. Instructors are de-duplicated per UID, keeping the highest-ranked role code. Meetings are
+    # de-duplicated per meeting pattern, keeping the room of highest capability.
+    role_code_rank = ' '.join(f"WHEN '{code}' THEN {rank}" for code, rank in INSTRUCTOR_ROLE_CODE_RANK.items())
+    return f"""
+        WITH course_rows AS (
+            SELECT
+                s.allowed_units, s.course_name, s.course_title, s.deleted_at, s.instruction_format, s.instructor_role_code,
+                s.is_primary, s.meeting_days, s.meeting_end_date, s.meeting_end_time, s.meeting_location, s.meeting_start_date,
+                s.meeting_start_time, s.section_id, s.section_num, s.term_id,
+                i.dept_code AS instructor_dept_code,
+                i.email AS instructor_email,
+                i.first_name || ' ' || i.last_name AS instructor_name,
+                i.uid AS instructor_uid,
+                r.id AS room_id,
+                ROW_NUMBER() OVER (ORDER BY {COURSE_ROWS_ORDER_BY}) AS row_number
+            {from_sql}
+        ),
+        courses AS (
+            SELECT DISTINCT ON (section_id) *
+            FROM course_rows
+            ORDER BY section_id, row_number
+        ),
+        course_instructors AS (
+            SELECT
+                c.section_id,
+                json_agg(
+                    json_build_object(
+                        'deletedAt', to_char(c.deleted_at, 'YYYY-MM-DD'),
+                        'deptCode', c.instructor_dept_code,
+                        'email', c.instructor_email,
+                        'name', c.instructor_name,
+                        'roleCode', c.instructor_role_code,
+                        'uid', c.instructor_uid
+                    ) ORDER BY c.row_number
+                ) AS instructors
+            FROM (
+                SELECT DISTINCT ON (c.section_id, TRIM(c.instructor_uid))
+                    c.section_id, c.deleted_at, c.instructor_dept_code, c.instructor_email, c.instructor_name, c.instructor_uid,
+                    FIRST_VALUE(c.instructor_role_code) OVER (
+                        PARTITION BY c.section_id, TRIM(c.instructor_uid)
+                        ORDER BY CASE c.instructor_role_code {role_code_rank} ELSE -1 END DESC, c.row_number
+                    ) AS instructor_role_code,
+                    c.row_number
+                FROM course_rows c
+                JOIN courses f ON f.section_id = c.section_id
+                WHERE TRIM(c.instructor_uid) != ''
+                AND (c.deleted_at IS NULL OR f.deleted_at IS NOT NULL)
+                ORDER BY c.section_id, TRIM(c.instructor_uid), c.row_number
+            ) c
+            GROUP BY c.section_id
+        ),
+        course_meetings AS (
+            SELECT
+                m.section_id,
+                json_agg(
+                    json_build_object(
+                        'days', m.meeting_days,
+                        'endDate', to_char(m.meeting_end_date, 'YYYY-MM-DD'),
+                        'endTime', m.meeting_end_time,
+                        'location', m.meeting_location,
+                        'roomId', m.room_id,
+                        'startDate', to_char(m.meeting_start_date, 'YYYY-MM-DD'),
+                        'startTime', m.meeting_start_time
+                    ) ORDER BY m.row_number
+                ) AS meetings
+            FROM (
+                SELECT DISTINCT ON (
+                    section_id, meeting_days, to_char(meeting_end_date, 'YYYY-MM-DD'), meeting_end_time, meeting_location,
+                    to_char(meeting_start_date, 'YYYY-MM-DD'), meeting_start_time
+                ) *
+                FROM course_rows
+                ORDER BY
+                    section_id, meeting_days, to_char(meeting_end_date, 'YYYY-MM-DD'), meeting_end_time, meeting_location,
+                    to_char(meeting_start_date, 'YYYY-MM-DD'), meeting_start_time, row_number
+            ) m
+            GROUP BY m.section_id
+        )
+        SELECT f.*, ci.instructors, cm.meetings
+        FROM courses f
+        LEFT JOIN course_instructors ci ON ci.section_id = f.section_id
+        JOIN course_meetings cm ON cm.section_id = f.section_id
+        ORDER BY f.row_number
+    """
 
 
-def _decorate_course_meeting_type(course):
-    # 'meetingType' is our own homegrown typology. See DIABLO-436.
-    if len(course['meetings']['eligible']) > 1:
-        course['meetingType'] = 'D'
-    elif course['nonstandardMeetingDates']:
-        course['meetingType'] = 'C'
-    elif len(course['meetings']['eligible'] + course['meetings']['ineligible']) > 1:
-        course['meetingType'] = 'B'
+def _aggregated_rows_to_api_json(
+    term_id,
+    rows,
+    include_administrative_proxies=False,
+    include_full_schedules=True,
+    as_records=False,
+):
+    # Rows come from _to_aggregated_courses_sql: one row per course, instructors and meetings already grouped and
+    # de-duplicated by Postgres, in the order the per-row query would have encountered them.
+    rows = rows.fetchall()
+    feed_data = _get_feed_data(
+        term_id=term_id,
+        section_ids=[int(row['section_id']) for row in rows],
+        instructor_uids=set(i['uid'] for row in rows for i in row['instructors'] or []),
+        room_ids=set(m['roomId'] for row in rows for m in row['meetings']),
+        include_full_schedules=include_full_schedules,
+    )
+    courses = []
+    for row in rows:
+        course = _to_course(row=row, feed_data=feed_data, include_full_schedules=include_full_schedules)
+        instructors_per_uid = {i.uid: i for i in course.instructors}
+        for i in row['instructors'] or []:
+            existing_instructor = instructors_per_uid.get(i['uid'].strip())
+            if existing_instructor:
+                if _get_role_code_rank(i['roleCode']) > _get_role_code_rank(existing_instructor.role_code):
+                    existing_instructor.role_code = i['roleCode']
+            else:
+                instructor = Instructor(
+                    deleted_at=i['deletedAt'],
+                    dept_code=i['deptCode'],
+                    email=i['email'],
+                    name=i['name'],
+                    role_code=i['roleCode'],
+                    uid=i['uid'],
+                )
+                course.instructors.append(instructor)
+                instructors_per_uid[instructor.uid.strip()] = instructor
+        _decorate_course_opt_outs(course, feed_data, include_administrative_proxies)
+
+        for m in row['meetings']:
+            meeting = Meeting(
+                days=m['days'],
+                end_date=m['endDate'],
+                end_time=m['endTime'],
+                location=m['location'],
+                start_date=m['startDate'],
+                start_time=m['startTime'],
+            )
+            room = feed_data['rooms_by_id'].get(m['roomId'])
+            _add_course_meeting(course, meeting, room)
+            meeting.room = room.to_api_json() if room else {'location': m['location']}
+        course.meetings['eligible'].sort(key=lambda m: f'{m.start_date} {m.start_time}')
+        course.meetings['ineligible'].sort(key=lambda m: f'{m.start_date} {m.start_time}')
+        courses.append(course)
+    return courses if as_records else [course.to_api_json() for course in courses]
+
+
+def _get_feed_data(
+    term_id,
+    section_ids,
+    instructor_uids,
+    room_ids,
+    include_full_schedules=True,
+    include_notes=False,
+    include_update_history=False,
+):
+    # Perform bulk queries and build data structures for feed generation. Preferences and opt-outs are fetched for the
+    # sections at hand, their cross-listings and their instructors only.
+    cross_listings_per_section_id, instructors_per_section_id = _get_cross_listed_courses(term_id=term_id, section_ids=section_ids)
+    section_ids_with_xlistings = set(section_ids)
+    for cross_listed_courses in cross_listings_per_section_id.values():
+        section_ids_with_xlistings.update(c['sectionId'] for c in cross_listed_courses)
+    instructor_uids = set(uid for uid in instructor_uids if uid)
+    for instructors in instructors_per_section_id.values():
+        instructor_uids.update(i.uid for i in instructors)
+
+    course_preferences = CoursePreference.get_course_preferences_for_section_ids(section_ids=list(section_ids_with_xlistings), term_id=term_id)
+    course_preferences_by_section_id = dict((p.section_id, p) for p in course_preferences)
+
+    opt_outs_by_section_id = {}
+    for o in OptOut.get_opt_outs_for_section_ids(section_ids=list(section_ids_with_xlistings), term_id=term_id):
+        if o.section_id not in opt_outs_by_section_id:
+            opt_outs_by_section_id[o.section_id] = []
+        opt_outs_by_section_id[o.section_id].append(o)
+
+    blanket_opt_outs_by_instructor_uid = {}
+    for o in OptOut.get_blanket_opt_outs_for_uids(uids=list(instructor_uids), term_id=term_id):
+        if o.instructor_uid not in blanket_opt_outs_by_instructor_uid:
+            blanket_opt_outs_by_instructor_uid[o.instructor_uid] = []
+        blanket_opt_outs_by_instructor_uid[o.instructor_uid].append(o)
+
+    scheduled_results = Scheduled.get_scheduled_per_section_ids(section_ids=section_ids, term_id=term_id)
+
+    room_ids = set(room_ids)
+    room_ids.update(s.room_id for s in scheduled_results)
+    rooms = Room.get_rooms(list(room_ids))
+    rooms_by_id = {room.id: room for room in rooms}
+
+    scheduled_by_section_id = {}
+    for s in scheduled_results:
+        if s.section_id not in scheduled_by_section_id:
+            scheduled_by_section_id[s.section_id] = []
+        scheduled_by_section_id[s.section_id].append(s.to_record(include_full_schedule=include_full_schedules, rooms_by_id=rooms_by_id))
+
+    notes_by_section_id = {}
+    if include_notes:
+        note_results = Note.get_notes_for_section_ids(section_ids=section_ids, term_id=term_id)
+        notes_by_section_id = {note.section_id: note.body for note in note_results}
+
+    schedule_updates_by_section_id = {}
+    if include_update_history:
+        # A course's update history includes updates of its cross-listings. Fetch all in one query, newest first, and
+        # remember each update's position so that per-course merges keep that order.
+        schedule_updates = ScheduleUpdate.get_update_history_for_section_ids(term_id=term_id, section_ids=list(section_ids_with_xlistings))
+        for index, schedule_update in enumerate(schedule_updates):
+            if schedule_update.section_id not in schedule_updates_by_section_id:
+                schedule_updates_by_section_id[schedule_update.section_id] = []
+            schedule_updates_by_section_id[schedule_update.section_id].append((index, schedule_update))
+
+    return {
+        'blanket_opt_outs_by_instructor_uid': blanket_opt_outs_by_instructor_uid,
+        'course_preferences_by_section_id': course_preferences_by_section_id,
+        'cross_listings_per_section_id': cross_listings_per_section_id,
+        'instructors_per_section_id': instructors_per_section_id,
+        'notes_by_section_id': notes_by_section_id,
+        'opt_outs_by_section_id': opt_outs_by_section_id,
+        'rooms_by_id': rooms_by_id,
+        'schedule_updates_by_section_id': schedule_updates_by_section_id,
+        'scheduled_by_section_id': scheduled_by_section_id,
+    }
+
+
+def _to_course(row, feed_data, include_full_schedules=True, include_update_history=False):
+    section_id = int(row['section_id'])
+    # Instructors per cross-listings
+    cross_listed_courses = feed_data['cross_listings_per_section_id'].get(section_id, [])
+    instructors = feed_data['instructors_per_section_id'].get(section_id, [])
+
+    cross_listed_section_ids = [c['sectionId'] for c in cross_listed_courses]
+    cross_listed_section_ids.append(section_id)
+
+    # Construct course
+    scheduled = feed_data['scheduled_by_section_id'].get(section_id)
+    opt_outs = feed_data['opt_outs_by_section_id'].get(section_id) or []
+
+    preferences = feed_data['course_preferences_by_section_id'].get(section_id)
+    if preferences:
+        preferences = preferences.to_api_json(include_collaborator_attributes=include_full_schedules)
+    elif scheduled:
+        preferences = scheduled[0]
     else:
-        course['meetingType'] = 'A'
+        preferences = {}
 
+    if preferences.get('canvasSiteIds'):
+        canvas_site_ids = [int(site_id) for site_id in preferences['canvasSiteIds']]
+    else:
+        canvas_site_ids = None
+
+    course = Course(
+        allowed_units=row['allowed_units'],
+        collaborator_uids=preferences.get('collaboratorUids'),
+        canvas_site_ids=canvas_site_ids,
+        course_name=row['course_name'],
+        course_title=row['course_title'],
+        cross_listings=cross_listed_courses,
+        deleted_at=safe_strftime(row['deleted_at'], '%Y-%m-%d'),
+        has_blanket_opted_out=False,
+        has_opted_out=True if len(opt_outs) else False,
+        instruction_format=row['instruction_format'],
+        instructors=instructors,
+        is_primary=row['is_primary'],
+        meetings={
+            'eligible': [],
+            'ineligible': [],
+        },
+        opt_outs=[],
+        publish_type=preferences.get('publishType'),
+        publish_type_name=preferences.get('publishTypeName'),
+        recording_type=preferences.get('recordingType'),
+        recording_type_name=preferences.get('recordingTypeName'),
+        section_id=section_id,
+        section_num=row['section_num'],
+        scheduled=scheduled,
+        term_id=row['term_id'],
+    )
+
+    if include_full_schedules:
+        course.collaborators = preferences.get('collaborators')
+
+    if include_update_history:
+        indexed_updates = []
+        for id_ in set(cross_listed_section_ids):
+            indexed_updates += feed_data['schedule_updates_by_section_id'].get(id_, [])
+        course.update_history = [u.to_api_json() for _, u in sorted(indexed_updates, key=lambda indexed: indexed[0])]
+    return course
+
+
+def _decorate_course_opt_outs(course, feed_data, include_administrative_proxies):
+    opt_outs = feed_data['opt_outs_by_section_id'].get(course.section_id) or []
+    blanket_opt_outs = []
+    for i in course.instructors:
+        instructor_has_opted_out = False
+        blanket_opt_outs_for_instructor = feed_data['blanket_opt_outs_by_instructor_uid'].get(i.uid)
+        if blanket_opt_outs_for_instructor:
+            instructor_has_opted_out = True
+            blanket_opt_outs += blanket_opt_outs_for_instructor
+        else:
+            instructor_opt_out = next((o for o in opt_outs if o.instructor_uid == i.uid), None)
+            if instructor_opt_out:
+                course.opt_outs.append(instructor_opt_out.to_api_json())
+                instructor_has_opted_out = True
+        i.has_opted_out = instructor_has_opted_out
+
+    if not include_administrative_proxies:
+        course.instructors = [i for i in course.instructors if i.role_code != 'APRX']
+
+    if blanket_opt_outs:
+        course.has_blanket_opted_out = True
+        course.opt_outs += [o.to_api_json() for o in blanket_opt_outs]
+    if len(course.opt_outs):
+        course.has_opted_out = True
 
-def _get_cross_listed_courses(section_ids, term_id):
-    # Return course and instructor info for cross-listings as well as the
-    # principal section. Although cross-listed sections were "deleted" during SIS data refresh job, we still rely
-    # on metadata from those deleted records.
-    cross_listings_by_section_id = CrossListing.get_cross_listings_for_section_ids(section_ids=section_ids, term_id=term_id)
-    all_cross_listing_ids = list(set(section_id for k, v in cross_listings_by_section_id.items() for section_id in v))
 
-    sql = """
+def _add_course_meeting(course, meeting, room):
+    # Recording dates, 'nonstandardMeetingDates' and 'meetingType' are derived from eligible meetings on demand.
+    meeting.eligible = bool(room and room.capability)
+    course.meetings['eligible' if meeting.eligible else 'ineligible'].append(meeting)
+
+
+def _get_course_feeds(term_id, include_deleted, section_ids=None):
+    # Per section, the feed of SisSection.get_course (with update history; without notes or Canvas sites).
+    sql = f"""
         SELECT
             s.*,
             i.dept_code AS instructor_dept_code,
             i.email AS instructor_email,
             i.first_name || ' ' || i.last_name AS instructor_name,
-            i.uid AS instructor_uid
+            i.uid AS instructor_uid,
+            r.id AS room_id,
+            r.location AS room_location
         FROM sis_sections s
-        LEFT JOIN instructors i ON i.uid = s.instructor_uid
+        LEFT JOIN rooms r ON r.location = s.meeting_location
+        LEFT JOIN instructors i
+          ON i.uid = s.instructor_uid
+          AND s.instructor_role_code = ANY(:instructor_role_codes)
         WHERE
             s.term_id = :term_id
-            AND s.section_id = ANY(:all_cross_listing_ids)
-            AND s.instructor_role_code = ANY(:instructor_role_codes)
-            AND s.deleted_at IS NULL
-        ORDER BY course_name, section_id
+            {'' if section_ids is None else 'AND s.section_id = ANY(:section_ids)'}
+            AND s.is_principal_listing IS TRUE
+            {'' if include_deleted else ' AND s.deleted_at IS NULL '}
+        ORDER BY s.course_name, s.section_id, s.instructor_uid, r.capability NULLS LAST
     """
     rows = db.session.execute(
         text(sql),
         {
-            'all_cross_listing_ids': all_cross_listing_ids,
-            'instructor_role_codes': ALL_INSTRUCTOR_ROLE_CODES,
+            'instructor_role_codes': AUTHORIZED_INSTRUCTOR_ROLE_CODES,
+            'section_ids': section_ids,
             'term_id': term_id,
         },
     )
-    rows_by_cross_listing_id = {section_id: [] for section_id in all_cross_listing_ids}
-    for row in rows:
-        rows_by_cross_listing_id[row['section_id']].append(row)
+    api_json = _to_api_json(term_id=term_id, rows=rows, include_update_history=True)
+    return {course['sectionId']: course for course in api_json}
 
+
+def _get_cross_listed_courses(section_ids, term_id):
+    # Return course and instructor info for cross-listings as well as the principal section, as stored by SIS data refresh.
     courses_by_section_id = {}
     instructors_by_section_id = {}
-
-    # Collect course and instructor data associated with cross-listings.
-    for section_id, cross_listing_ids in cross_listings_by_section_id.items():
-        courses_by_section_id[section_id] = []
-        instructors_by_section_id[section_id] = []
-        for cross_listing_id in cross_listing_ids:
-            if rows_by_cross_listing_id[cross_listing_id]:
-                # Our first row provides course-specific data.
-                row = rows_by_cross_listing_id[cross_listing_id][0]
-                courses_by_section_id[section_id].append({
-                    'courseName': row['course_name'],
-                    'courseTitle': row['course_title'],
-                    'instructionFormat': row['instruction_format'],
-                    'sectionNum': row['section_num'],
-                    'isPrimary': row['is_primary'],
-                    'label': f"{row['course_name']}, {row['instruction_format']} {row['section_num']}",
-                    'sectionId': row['section_id'],
-                    'termId': row['term_id'],
-                })
-                # Instructor-specific data may be spread across multiple rows.
-                for row in rows_by_cross_listing_id[cross_listing_id]:
-                    if row['instructor_uid'] and row['instructor_uid'] not in [i['uid'] for i in instructors_by_section_id[section_id]]:
-                        instructor_json = _to_instructor_json(row)
-                        uid = (instructor_json['uid'] or '').strip() if instructor_json else None
-                        if uid and not instructor_json['deletedAt']:
-                            instructors_by_section_id[section_id].append(instructor_json)
-
+    for cross_listing in CrossListing.get_metadata_for_section_ids(section_ids=section_ids, term_id=term_id):
+        courses_by_section_id[cross_listing.section_id] = [
+            {
+                'courseName': c['courseName'],
+                'courseTitle': c['courseTitle'],
+                'instructionFormat': c['instructionFormat'],
+                'sectionNum': c['sectionNum'],
+                'isPrimary': c['isPrimary'],
+                'label': c['label'],
+                'sectionId': c['sectionId'],
+                'termId': c['termId'],
+            } for c in cross_listing.courses
+        ]
+        instructors_by_section_id[cross_listing.section_id] = [
+            Instructor(
+                deleted_at=None,
+                dept_code=i['deptCode'],
+                email=i['email'],
+                name=i['name'],
+                role_code=i['roleCode'],
+                uid=i['uid'],
+            ) for i in cross_listing.instructors
+        ]
     return courses_by_section_id, instructors_by_section_id
 
 
-def _sections_with_at_least_one_eligible_room():
-    return """
-        SELECT DISTINCT s2.section_id
-        FROM sis_sections s2 JOIN rooms r2
-            ON r2.location = s2.meeting_location
-            AND r2.capability IS NOT NULL
-            AND s2.term_id = :term_id
-            AND (s2.instructor_uid IS NULL OR s2.instructor_role_code = ANY(:instructor_role_codes))
-            AND s2.is_principal_listing IS TRUE
-            AND s2.deleted_at IS NULL
-    """
-
-
-def _to_instructor_json(row):
-    instructor_uid = row['instructor_uid']
-    instructor_json = {
-        'deletedAt': safe_strftime(row['deleted_at'], '%Y-%m-%d'),
-        'deptCode': row['instructor_dept_code'],
-        'email': row['instructor_email'],
-        'name': row['instructor_name'],
-        'roleCode': row['instructor_role_code'],
-        'uid': instructor_uid,
-    }
-    return instructor_json
-
-
-def _to_meeting_json(row):
-    end_date = row['meeting_end_date']
-    start_date = row['meeting_start_date']
-    formatted_days = format_days(row['meeting_days'])
-    return {
-        'days': row['meeting_days'],
-        'daysFormatted': formatted_days,
-        'daysNames': get_names_of_days(formatted_days),
-        'endDate': safe_strftime(end_date, '%Y-%m-%d'),
-        'endTime': row['meeting_end_time'],
-        'endTimeFormatted': format_time(row['meeting_end_time']),
-        'location': row['meeting_location'],
-        'startDate': safe_strftime(start_date, '%Y-%m-%d'),
-        'startTime': row['meeting_start_time'],
-        'startTimeFormatted': format_time(row['meeting_start_time']),
-    }
-
+def _section_keys_per_filter(filter_):
+    # Returns FROM and WHERE clauses selecting the same sections as the corresponding get_courses* method, plus the
+    # instructor role codes those clauses expect.
+    if filter_ in ['All', 'Eligible']:
+        sql = f"""
+            FROM sis_sections s
+            WHERE
+                s.term_id = :term_id
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+                AND s.deleted_at IS NULL
+                {'' if filter_ == 'All' else f'AND s.section_id IN ({eligible_section_ids_sql()})'}
+        """
+        return sql, ALL_INSTRUCTOR_ROLE_CODES
+    elif filter_ == 'Opted Out':
+        sql = f"""
+            FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location
+            JOIN opt_outs o ON
+                o.instructor_uid = s.instructor_uid AND
+                (o.section_id = s.section_id OR o.section_id IS NULL) AND
+                (o.term_id = :term_id OR o.term_id IS NULL)
+            WHERE
+                s.term_id = :term_id
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+                AND s.section_id IN ({eligible_section_ids_sql()})
+                AND s.deleted_at IS NULL
+        """
+        return sql, AUTHORIZED_INSTRUCTOR_ROLE_CODES
+    elif filter_ == 'Scheduled':
+        sql = """
+            FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location
+            JOIN scheduled d ON d.section_id = s.section_id AND d.term_id = :term_id AND d.deleted_at IS NULL
+            WHERE
+                s.term_id = :term_id
+                AND (s.instructor_uid IS NULL OR s.instructor_role_code = ANY(:instructor_role_codes))
+                AND s.is_principal_listing IS TRUE
+        """
+        return sql, AUTHORIZED_INSTRUCTOR_ROLE_CODES
+    elif filter_ == 'No Instructors':
+        sql = f"""
+            FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location
+            WHERE
+                s.term_id = :term_id
+                AND s.instructor_uid IS NULL
+                AND s.is_principal_listing IS TRUE
+                AND s.section_id IN ({eligible_section_ids_sql()})
+                AND s.deleted_at IS NULL
+        """
+        return sql, AUTHORIZED_INSTRUCTOR_ROLE_CODES
+    else:
+        raise ValueError(f'Unrecognized filter: {filter_}')
 
-def _merge_distinct(label, other_labels):
-    if label in other_labels:
-        other_labels.remove(label)
-    return [label] + list(set(other_labels))
 
+def _to_instructor(row):
+    return Instructor(
+        deleted_at=safe_strftime(row['deleted_at'], '%Y-%m-%d'),
+        dept_code=row['instructor_dept_code'],
+        email=row['instructor_email'],
+        name=row['instructor_name'],
+        role_code=row['instructor_role_code'],
+        uid=row['instructor_uid'],
+    )
 
-def _construct_course_label(course_name, instruction_format, section_num, cross_listings):
-    def _label(course_name_, instruction_format_, section_num_):
-        return f'{course_name_}, {instruction_format_} {section_num_}'
 
-    if cross_listings:
-        merged = _merge_distinct(
-            _label(course_name, instruction_format, section_num),
-            [_label(c['courseName'], c['instructionFormat'], c['sectionNum']) for c in cross_listings],
-        )
-        return ' | '.join(merged)
-    else:
-        return _label(course_name, instruction_format, section_num)
+def _to_meeting(row):
+    return Meeting(
+        days=row['meeting_days'],
+        end_date=safe_strftime(row['meeting_end_date'], '%Y-%m-%d'),
+        end_time=row['meeting_end_time'],
+        location=row['meeting_location'],
+        start_date=safe_strftime(row['meeting_start_date'], '%Y-%m-%d'),
+        start_time=row['meeting_start_time'],
+    )
 
 
 # In the rare case of a single instructor UID having multiple role code assignments for the same course, a higher
@@ -0,0 +1,63 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+-- Nessie data is copied into a staging table, not into sis_sections, so the network transfer holds no lock on
+-- sis_sections. The table is UNLOGGED: its rows are replaced on every refresh and need not survive a crash. Terms are
+-- staged concurrently, each in its own rows.
+
+DELETE FROM sis_sections_staged WHERE term_id = {term_id};
+
+INSERT INTO sis_sections_staged (
+  SELECT * FROM dblink('{dblink_nessie_rds}',$NESSIE$
+    SELECT
+       allowed_units, sis_course_name, sis_course_title, sis_instruction_format, instructor_name, instructor_role_code,
+       instructor_uid, is_primary, meeting_days, meeting_end_date::TIMESTAMP, meeting_end_time, meeting_location,
+       meeting_start_date::TIMESTAMP, meeting_start_time, sis_section_id::INTEGER, sis_section_num, sis_term_id::INTEGER
+    FROM sis_data.sis_sections
+    WHERE sis_term_id='{term_id}'
+  $NESSIE$)
+  AS data_loch_sis_sections (
+    allowed_units DOUBLE PRECISION,
+    course_name VARCHAR(80),
+    course_title TEXT,
+    instruction_format VARCHAR(80),
+    instructor_name TEXT,
+    instructor_role_code VARCHAR(80),
+    instructor_uid VARCHAR(80),
+    is_primary BOOLEAN,
+    meeting_days VARCHAR(80),
+    meeting_end_date TIMESTAMP,
+    meeting_end_time VARCHAR(80),
+    meeting_location VARCHAR(80),
+    meeting_start_date TIMESTAMP,
+    meeting_start_time VARCHAR(80),
+    section_id INTEGER,
+    section_num VARCHAR(80),
+    term_id INTEGER
+  )
+);
+
+-- Our source data may use blank spaces for UIDs that should be null.
+UPDATE sis_sections_staged SET instructor_uid = NULL WHERE term_id = {term_id} AND instructor_uid = '';
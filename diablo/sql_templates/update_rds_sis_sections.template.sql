@@ -23,61 +23,128 @@
  * ENHANCEMENTS, OR MODIFICATIONS.
  */
 
-CREATE TABLE tmp_sis_sections AS SELECT * FROM sis_sections WHERE term_id = '{term_id}';
+-- Differential refresh: apply to sis_sections only the rows that changed in sis_sections_staged (see
+-- stage_rds_sis_sections.template.sql). Rows have no natural key, so they are compared by content hash, per section,
+-- with duplicates paired by ordinal. The template runs as one transaction over local tables: readers of sis_sections
+-- see the old rows until it commits, and changed rows are locked only for the final writes.
 
-DELETE FROM sis_sections WHERE term_id = '{term_id}';
-
---
+CREATE TEMPORARY TABLE tmp_staged AS (
+  SELECT h.*, ROW_NUMBER() OVER (PARTITION BY h.section_id, h.content_hash) AS ordinal
+  FROM (
+    SELECT
+      s.*,
+      md5(ROW(
+        s.allowed_units::TEXT, s.course_name, s.course_title, s.instruction_format, s.instructor_name,
+        s.instructor_role_code, s.instructor_uid, s.is_primary, s.meeting_days, s.meeting_end_date, s.meeting_end_time,
+        s.meeting_location, s.meeting_start_date, s.meeting_start_time, s.section_num
+      )::TEXT) AS content_hash
+    FROM sis_sections_staged s
+    WHERE s.term_id = {term_id}
+  ) h
+);
 
-INSERT INTO sis_sections (allowed_units, course_name, course_title, instruction_format, instructor_name,
-                          instructor_role_code, instructor_uid, is_primary, meeting_days, meeting_end_date,
-                          meeting_end_time, meeting_location, meeting_start_date, meeting_start_time, section_id,
-                          section_num, term_id)
-   (SELECT * FROM dblink('{dblink_nessie_rds}',$NESSIE$
+CREATE TEMPORARY TABLE tmp_current AS (
+  SELECT h.*, ROW_NUMBER() OVER (PARTITION BY h.section_id, h.content_hash ORDER BY h.id) AS ordinal
+  FROM (
     SELECT
-       allowed_units, sis_course_name, sis_course_title, sis_instruction_format, instructor_name, instructor_role_code,
-       instructor_uid, is_primary, meeting_days, meeting_end_date::TIMESTAMP, meeting_end_time, meeting_location,
-       meeting_start_date::TIMESTAMP, meeting_start_time, sis_section_id::INTEGER, sis_section_num, sis_term_id::INTEGER
-    FROM sis_data.sis_sections
-    WHERE sis_term_id='{term_id}'
-  $NESSIE$)
-  AS data_loch_sis_sections (
-    allowed_units DOUBLE PRECISION,
-    course_name VARCHAR(80),
-    course_title TEXT,
-    instruction_format VARCHAR(80),
-    instructor_name TEXT,
-    instructor_role_code VARCHAR(80),
-    instructor_uid VARCHAR(80),
-    is_primary BOOLEAN,
-    meeting_days VARCHAR(80),
-    meeting_end_date TIMESTAMP,
-    meeting_end_time VARCHAR(80),
-    meeting_location VARCHAR(80),
-    meeting_start_date TIMESTAMP,
-    meeting_start_time VARCHAR(80),
-    section_id INTEGER,
-    section_num VARCHAR(80),
-    term_id INTEGER
-  )
+      s.id,
+      s.section_id,
+      md5(ROW(
+        s.allowed_units::TEXT, s.course_name, s.course_title, s.instruction_format, s.instructor_name,
+        s.instructor_role_code, s.instructor_uid, s.is_primary, s.meeting_days, s.meeting_end_date, s.meeting_end_time,
+        s.meeting_location, s.meeting_start_date, s.meeting_start_time, s.section_num
+      )::TEXT) AS content_hash
+    FROM sis_sections s
+    WHERE s.term_id = {term_id} AND s.deleted_at IS NULL
+  ) h
+);
+
+-- Unmatched rows on either side. Within a section, the n-th added row replaces the n-th removed row.
+CREATE TEMPORARY TABLE tmp_added AS (
+  SELECT s.*, ROW_NUMBER() OVER (PARTITION BY s.section_id ORDER BY s.content_hash, s.ordinal) AS pair
+  FROM tmp_staged s
+  LEFT JOIN tmp_current c ON c.section_id = s.section_id AND c.content_hash = s.content_hash AND c.ordinal = s.ordinal
+  WHERE c.id IS NULL
+);
+
+CREATE TEMPORARY TABLE tmp_removed AS (
+  SELECT c.id, c.section_id, ROW_NUMBER() OVER (PARTITION BY c.section_id ORDER BY c.content_hash, c.ordinal) AS pair
+  FROM tmp_current c
+  LEFT JOIN tmp_staged s ON s.section_id = c.section_id AND s.content_hash = c.content_hash AND s.ordinal = c.ordinal
+  WHERE s.section_id IS NULL
 );
 
--- Our source data may use blank spaces for UIDs that should be null.
-UPDATE sis_sections SET instructor_uid = NULL WHERE instructor_uid = '';
+INSERT INTO sis_refresh_log (term_id, inserted_section_ids, updated_section_ids, deleted_section_ids, created_at)
+SELECT
+  {term_id},
+  ARRAY(SELECT DISTINCT section_id FROM tmp_added WHERE section_id NOT IN (SELECT section_id FROM tmp_current) ORDER BY section_id),
+  ARRAY(
+    SELECT section_id FROM tmp_added WHERE section_id IN (SELECT section_id FROM tmp_current)
+    UNION
+    SELECT section_id FROM tmp_removed WHERE section_id IN (SELECT section_id FROM tmp_staged)
+    ORDER BY section_id
+  ),
+  ARRAY(SELECT DISTINCT section_id FROM tmp_removed WHERE section_id NOT IN (SELECT section_id FROM tmp_staged) ORDER BY section_id),
+  now();
+
+-- Changed rows are updated in place.
+UPDATE sis_sections t SET
+  allowed_units = a.allowed_units,
+  course_name = a.course_name,
+  course_title = a.course_title,
+  instruction_format = a.instruction_format,
+  instructor_name = a.instructor_name,
+  instructor_role_code = a.instructor_role_code,
+  instructor_uid = a.instructor_uid,
+  is_primary = a.is_primary,
+  meeting_days = a.meeting_days,
+  meeting_end_date = a.meeting_end_date,
+  meeting_end_time = a.meeting_end_time,
+  meeting_location = a.meeting_location,
+  meeting_start_date = a.meeting_start_date,
+  meeting_start_time = a.meeting_start_time,
+  section_num = a.section_num
+FROM tmp_removed r
+JOIN tmp_added a ON a.section_id = r.section_id AND a.pair = r.pair
+WHERE t.id = r.id;
 
--- Restore deleted sections, with deleted_at set to now().
-INSERT INTO sis_sections (allowed_units, course_name, course_title, deleted_at, instruction_format, instructor_name,
+-- Surplus removed rows are soft-deleted if their section is gone from SIS, else deleted.
+UPDATE sis_sections t SET deleted_at = now()
+FROM tmp_removed r
+WHERE
+  t.id = r.id
+  AND r.section_id NOT IN (SELECT section_id FROM tmp_staged);
+
+DELETE FROM sis_sections t
+USING tmp_removed r
+WHERE
+  t.id = r.id
+  AND r.section_id IN (SELECT section_id FROM tmp_staged)
+  AND NOT EXISTS (SELECT 1 FROM tmp_added a WHERE a.section_id = r.section_id AND a.pair = r.pair);
+
+-- Rows of sections that were deleted and are back in SIS.
+DELETE FROM sis_sections
+WHERE
+  term_id = {term_id}
+  AND deleted_at IS NOT NULL
+  AND section_id IN (SELECT section_id FROM tmp_staged);
+
+-- Surplus added rows are inserted.
+INSERT INTO sis_sections (allowed_units, course_name, course_title, instruction_format, instructor_name,
                           instructor_role_code, instructor_uid, is_primary, meeting_days, meeting_end_date,
                           meeting_end_time, meeting_location, meeting_start_date, meeting_start_time, section_id,
                           section_num, term_id)
 (
   SELECT
-    t.allowed_units, t.course_name, t.course_title, now(), t.instruction_format, t.instructor_name,
-    t.instructor_role_code, t.instructor_uid, t.is_primary, t.meeting_days, t.meeting_end_date, t.meeting_end_time,
-    t.meeting_location, t.meeting_start_date, t.meeting_start_time, t.section_id, t.section_num, t.term_id
-  FROM tmp_sis_sections t
-  LEFT JOIN sis_sections s2 ON s2.section_id = t.section_id AND s2.term_id = t.term_id
-  WHERE t.term_id = {term_id} AND s2.section_id IS NULL AND s2.term_id IS NULL
+    a.allowed_units, a.course_name, a.course_title, a.instruction_format, a.instructor_name, a.instructor_role_code,
+    a.instructor_uid, a.is_primary, a.meeting_days, a.meeting_end_date, a.meeting_end_time, a.meeting_location,
+    a.meeting_start_date, a.meeting_start_time, a.section_id, a.section_num, a.term_id
+  FROM tmp_added a
+  WHERE NOT EXISTS (SELECT 1 FROM tmp_removed r WHERE r.section_id = a.section_id AND r.pair = a.pair)
 );
 
-DROP TABLE tmp_sis_sections;
+DROP TABLE tmp_added;
+DROP TABLE tmp_current;
+DROP TABLE tmp_removed;
+DROP TABLE tmp_staged;
+DELETE FROM sis_sections_staged WHERE term_id = {term_id};
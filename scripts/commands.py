@@ -81,3 +81,224 @@ def update_lti():
             for tool_name in errors:
                 print(f'  * {tool_name}')
             print('Check app logs for details.')
+
+
+@application.cli.command('benchmark_course_feeds')
+@click.argument('term_id', default=None, required=False)
+@click.option('--iterations', default=3, help='Number of timed runs per query path.')
+def benchmark_course_feeds(term_id, iterations):
+    """Compare per-row and SQL-aggregated construction of a full-term course feed."""
+    with application.app_context():
+        import json
+        from diablo.models.sis_section import SisSection
+
+        term_id = term_id or application.config['CURRENT_TERM_ID']
+        results = {}
+        for aggregate_in_sql in [False, True]:
+            durations = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                courses = SisSection.get_courses(term_id, aggregate_in_sql=aggregate_in_sql, include_ineligible=True)
+                durations.append(time.perf_counter() - start)
+            results[aggregate_in_sql] = courses
+            label = 'SQL aggregation' if aggregate_in_sql else 'Per-row'
+            print(f'{label}: {len(courses)} courses; best {min(durations):.3f}s, mean {sum(durations) / len(durations):.3f}s')
+        identical = json.dumps(results[False], sort_keys=True) == json.dumps(results[True], sort_keys=True)
+        print(f"Feeds are {'identical' if identical else 'NOT identical'}.")
+
+
+@application.cli.command('benchmark_queries')
+@click.option('--sections', default=6000, help='Number of sections to seed in the benchmark term.')
+@click.option('--term-id', default=9999, help='Term id of the seeded term. It must not exist in sis_sections.')
+@click.option('--output', default=None, help='Write timings and plans to this JSON file.')
+@click.option('--baseline', default=None, help='JSON file written by a previous run. Report queries that regressed.')
+@click.option('--tolerance', default=0.5, help='Allowed increase in execution time, relative to baseline.')
+def benchmark_queries(sections, term_id, output, baseline, tolerance):
+    """Seed a realistic term and record EXPLAIN ANALYZE timings of the hot course queries."""
+    with application.app_context():
+        import json
+        from diablo import db
+        from diablo.models.eligible_section import refresh_eligible_sections
+        from diablo.models.instructor_section import InstructorSection
+        from diablo.models.scheduled import Scheduled
+        from diablo.models.sis_section import AUTHORIZED_INSTRUCTOR_ROLE_CODES, SisSection
+        from sqlalchemy import event, text
+
+        if db.session.execute(text('SELECT 1 FROM sis_sections WHERE term_id = :term_id LIMIT 1'), {'term_id': term_id}).first():
+            raise click.UsageError(f'Term {term_id} has SIS data. Choose another --term-id.')
+        try:
+            instructor_uid, location = _seed_benchmark_term(db, section_count=sections, term_id=term_id)
+            refresh_eligible_sections(term_id=term_id)
+            InstructorSection.refresh(term_id=term_id, instructor_role_codes=AUTHORIZED_INSTRUCTOR_ROLE_CODES)
+            for table in ['eligible_sections', 'instructor_sections', 'opt_outs', 'scheduled', 'sis_sections']:
+                db.session.execute(text(f'ANALYZE {table}'))
+
+            queries = {
+                'get_courses': lambda: SisSection.get_courses(term_id),
+                'get_courses_opted_out': lambda: SisSection.get_courses_opted_out(term_id),
+                'get_courses_page': lambda: SisSection.get_courses_page(term_id, filter_='Eligible', limit=50),
+                'get_courses_per_instructor_uid': lambda: SisSection.get_courses_per_instructor_uid(term_id, instructor_uid),
+                'get_courses_per_location': lambda: SisSection.get_courses_per_location(term_id, location),
+                'get_courses_scheduled': lambda: SisSection.get_courses_scheduled(term_id),
+                'get_courses_without_instructors': lambda: SisSection.get_courses_without_instructors(term_id),
+                'get_scheduled_per_instructor_uid': lambda: Scheduled.get_scheduled_per_instructor_uid(instructor_uid, term_id),
+            }
+            results = {}
+            for name, query in queries.items():
+                # Capture the SQL that each code path sends to the database, then explain it.
+                statements = []
+
+                def _capture(conn, cursor, statement, parameters, context, executemany):
+                    if statement.lstrip().upper().startswith('SELECT'):
+                        statements.append((statement, parameters))
+                event.listen(db.engine, 'before_cursor_execute', _capture)
+                try:
+                    query()
+                finally:
+                    event.remove(db.engine, 'before_cursor_execute', _capture)
+                results[name] = _explain_analyze(db, statements)
+        finally:
+            db.session.rollback()
+
+        regressions = _report_query_plans(results, json.load(open(baseline)) if baseline else {}, tolerance)
+        if output:
+            with open(output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f'Results written to {output}')
+        if regressions:
+            sys.exit(f'{len(regressions)} query plan regression(s): {", ".join(regressions)}')
+
+
+def _report_query_plans(results, baseline_results, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline_results.get(name)
+        notes = []
+        if previous:
+            if result['milliseconds'] > previous['milliseconds'] * (1 + tolerance):
+                notes.append(f"slower than baseline ({previous['milliseconds']:.2f} ms)")
+            new_seq_scans = sorted(set(result['seqScans']) - set(previous['seqScans']))
+            if new_seq_scans:
+                notes.append(f"new sequential scan of {', '.join(new_seq_scans)}")
+        if notes:
+            regressions.append(name)
+        print(f"{name}: {result['milliseconds']:.2f} ms in {result['statementCount']} statement(s); "
+              f"indexes: {', '.join(result['indexes']) or 'none'}{''.join(f'; REGRESSION: {n}' for n in notes)}")
+    return regressions
+
+
+def _seed_benchmark_term(db, section_count, term_id):
+    # Sections rotate through existing rooms, meeting patterns and instructor roles. Every third section has a second
+    # instructor, one in twenty is a non-principal listing, one in fifty is deleted, one in five is scheduled and one in
+    # twenty-five instructors has opted out.
+    from sqlalchemy import text
+
+    instructor_count = max(section_count // 3, 1)
+    params = {'instructor_count': instructor_count, 'section_count': section_count, 'term_id': term_id}
+    db.session.execute(
+        text("""
+            INSERT INTO instructors (uid, first_name, last_name, email, created_at, updated_at)
+            SELECT 'bench' || n, 'Bench', 'Instructor ' || n, 'bench' || n || '@berkeley.edu', now(), now()
+            FROM generate_series(0, :instructor_count - 1) AS n
+            ON CONFLICT (uid) DO NOTHING
+        """),
+        params,
+    )
+    db.session.execute(
+        text("""
+            WITH locations AS (SELECT array_agg(location ORDER BY id) AS names, count(*) AS total FROM rooms)
+            INSERT INTO sis_sections (
+                course_name, course_title, deleted_at, instruction_format, instructor_name, instructor_role_code, instructor_uid,
+                is_primary, is_principal_listing, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+                meeting_start_date, meeting_start_time, section_id, section_num, term_id
+            )
+            SELECT
+                'BENCH ' || (n % 900),
+                'Benchmark course ' || n,
+                CASE WHEN n % 50 = 0 THEN now() END,
+                (ARRAY['LEC', 'DIS', 'LAB', 'SEM'])[1 + n % 4],
+                'Bench Instructor ' || ((n + i * 7) % :instructor_count),
+                (ARRAY['PI', 'PI', 'ICNT', 'TNIC', 'APRX'])[1 + (n + i) % 5],
+                'bench' || ((n + i * 7) % :instructor_count),
+                TRUE,
+                n % 20 <> 0,
+                (ARRAY['MOWEFR', 'TUTH', 'MO', 'WE'])[1 + n % 4],
+                now() + INTERVAL '90 days',
+                (ARRAY['09:59', '10:59', '13:59', '15:59'])[1 + n % 4],
+                l.names[1 + n % l.total],
+                now() - INTERVAL '30 days',
+                (ARRAY['09:00', '10:00', '13:00', '15:00'])[1 + n % 4],
+                1000000 + n,
+                lpad((1 + n % 10)::text, 3, '0'),
+                :term_id
+            FROM locations l, generate_series(1, :section_count) AS n, generate_series(0, CASE WHEN n % 3 = 0 THEN 1 ELSE 0 END) AS i
+        """),
+        params,
+    )
+    db.session.execute(
+        text("""
+            INSERT INTO scheduled (
+                term_id, section_id, kaltura_schedule_id, course_display_name, instructor_uids, room_id, meeting_days,
+                meeting_end_date, meeting_end_time, meeting_start_date, meeting_start_time, publish_type, recording_type, created_at
+            )
+            SELECT
+                s.term_id, s.section_id, s.section_id, MIN(s.course_name), array_agg(DISTINCT s.instructor_uid), MIN(r.id),
+                MIN(s.meeting_days), MIN(s.meeting_end_date), MIN(s.meeting_end_time), MIN(s.meeting_start_date),
+                MIN(s.meeting_start_time), 'kaltura_my_media', 'presenter_presentation_audio', now()
+            FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location
+            WHERE s.term_id = :term_id AND s.section_id % 5 = 0 AND s.is_principal_listing IS TRUE AND s.deleted_at IS NULL
+            GROUP BY s.term_id, s.section_id
+        """),
+        params,
+    )
+    db.session.execute(
+        text("""
+            INSERT INTO opt_outs (instructor_uid, term_id, section_id, created_at)
+            SELECT 'bench' || n, :term_id, NULL, now()
+            FROM generate_series(0, :instructor_count - 1, 25) AS n
+        """),
+        params,
+    )
+    row = db.session.execute(
+        text("""
+            SELECT s.instructor_uid, s.meeting_location
+            FROM sis_sections s
+            JOIN rooms r ON r.location = s.meeting_location AND r.capability IS NOT NULL
+            WHERE s.term_id = :term_id AND s.instructor_role_code = 'PI'
+            ORDER BY s.section_id
+            LIMIT 1
+        """),
+        params,
+    ).first()
+    if row:
+        return row['instructor_uid'], row['meeting_location']
+    return 'bench0', db.session.execute(text('SELECT MIN(location) FROM rooms')).scalar()
+
+
+def _explain_analyze(db, statements):
+    # Planning plus execution time, in milliseconds, summed over statements.
+    milliseconds = 0
+    indexes = set()
+    seq_scans = set()
+
+    def _walk(plan):
+        if plan.get('Index Name'):
+            indexes.add(plan['Index Name'])
+        if plan['Node Type'] == 'Seq Scan':
+            seq_scans.add(plan['Relation Name'])
+        for child in plan.get('Plans', []):
+            _walk(child)
+
+    connection = db.session.connection()
+    for statement, parameters in statements:
+        explained = connection.exec_driver_sql(f'EXPLAIN (ANALYZE, FORMAT JSON) {statement}', parameters).scalar()
+        explained = explained[0] if isinstance(explained, list) else explained
+        milliseconds += explained['Planning Time'] + explained['Execution Time']
+        _walk(explained['Plan'])
+    return {
+        'indexes': sorted(indexes),
+        'milliseconds': milliseconds,
+        'seqScans': sorted(seq_scans),
+        'statementCount': len(statements),
+    }
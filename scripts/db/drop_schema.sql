@@ -46,13 +46,17 @@ ALTER TABLE IF EXISTS ONLY public.approvals DROP CONSTRAINT IF EXISTS approvals_
 ALTER TABLE IF EXISTS ONLY public.blackouts DROP CONSTRAINT IF EXISTS blackouts_name_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.blackouts DROP CONSTRAINT IF EXISTS blackouts_pkey;
 ALTER TABLE IF EXISTS ONLY public.canvas_course_sites DROP CONSTRAINT IF EXISTS canvas_course_sites_pkey;
+ALTER TABLE IF EXISTS ONLY public.course_feeds DROP CONSTRAINT IF EXISTS course_feeds_pkey;
 ALTER TABLE IF EXISTS ONLY public.course_preferences DROP CONSTRAINT IF EXISTS course_preferences_pkey;
 ALTER TABLE IF EXISTS ONLY public.cross_listings DROP CONSTRAINT IF EXISTS cross_listings_pkey;
+ALTER TABLE IF EXISTS ONLY public.data_versions DROP CONSTRAINT IF EXISTS data_versions_pkey;
 ALTER TABLE IF EXISTS ONLY public.email_templates DROP CONSTRAINT IF EXISTS email_templates_name_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.email_templates DROP CONSTRAINT IF EXISTS email_templates_pkey;
+ALTER TABLE IF EXISTS ONLY public.instructor_sections DROP CONSTRAINT IF EXISTS instructor_sections_pkey;
 ALTER TABLE IF EXISTS ONLY public.instructors DROP CONSTRAINT IF EXISTS instructors_pkey;
 ALTER TABLE IF EXISTS ONLY public.jobs DROP CONSTRAINT IF EXISTS jobs_key_unique_constraint;
 ALTER TABLE IF EXISTS ONLY public.jobs DROP CONSTRAINT IF EXISTS jobs_pkey;
+ALTER TABLE IF EXISTS ONLY public.kaltura_events DROP CONSTRAINT IF EXISTS kaltura_events_pkey;
 ALTER TABLE IF EXISTS ONLY public.notes DROP CONSTRAINT IF EXISTS notes_pkey;
 ALTER TABLE IF EXISTS ONLY public.opt_outs DROP CONSTRAINT IF EXISTS opt_outs_pkey;
 ALTER TABLE IF EXISTS ONLY public.queued_emails DROP CONSTRAINT IF EXISTS queued_emails_pkey;
@@ -66,12 +70,23 @@ ALTER TABLE IF EXISTS ONLY public.sis_sections DROP CONSTRAINT IF EXISTS sis_sec
 
 --
 
+DROP INDEX IF EXISTS public.eligible_sections_term_id_section_id_idx;
+DROP INDEX IF EXISTS public.kaltura_events_parent_id_idx;
+DROP INDEX IF EXISTS public.kaltura_events_resource_id_start_date_idx;
+DROP INDEX IF EXISTS public.kaltura_events_start_date_idx;
 DROP INDEX IF EXISTS notes.term_id_section_id_idx;
 DROP INDEX IF EXISTS notes.uid_idx;
+DROP INDEX IF EXISTS public.opt_outs_instructor_uid_idx;
 DROP INDEX IF EXISTS public.rooms_location_idx;
+DROP INDEX IF EXISTS public.scheduled_instructor_uids_idx;
+DROP INDEX IF EXISTS public.scheduled_term_id_section_id_active_idx;
 DROP INDEX IF EXISTS public.sent_emails_section_id_idx;
+DROP INDEX IF EXISTS public.sis_refresh_log_term_id_idx;
 DROP INDEX IF EXISTS public.sis_sections_instructor_uid_idx;
 DROP INDEX IF EXISTS public.sis_sections_meeting_location_idx;
+DROP INDEX IF EXISTS public.sis_sections_principal_idx;
+DROP INDEX IF EXISTS public.sis_sections_term_id_instructor_uid_idx;
+DROP INDEX IF EXISTS public.sis_sections_term_id_meeting_location_idx;
 DROP INDEX IF EXISTS public.sis_sections_term_id_section_id_idx;
 
 --
@@ -82,16 +97,21 @@ DROP TABLE IF EXISTS public.approvals;
 DROP TABLE IF EXISTS public.blackouts;
 DROP SEQUENCE IF EXISTS public.blackouts_id_seq;
 DROP TABLE IF EXISTS public.canvas_course_sites;
+DROP TABLE IF EXISTS public.course_feeds;
 DROP TABLE IF EXISTS public.course_preferences;
 DROP TABLE IF EXISTS public.cross_listings;
+DROP TABLE IF EXISTS public.data_versions;
+DROP TABLE IF EXISTS public.eligible_sections;
 DROP TABLE IF EXISTS public.email_templates;
 DROP SEQUENCE IF EXISTS public.email_templates_id_seq;
+DROP TABLE IF EXISTS public.instructor_sections;
 DROP TABLE IF EXISTS public.instructors;
 DROP TABLE IF EXISTS public.job_history;
 DROP SEQUENCE IF EXISTS job_history_id_seq;
 DROP TABLE IF EXISTS public.jobs;
 DROP TABLE IF EXISTS public.job_runner;
 DROP SEQUENCE IF EXISTS jobs_id_seq;
+DROP TABLE IF EXISTS public.kaltura_events;
 DROP TABLE IF EXISTS public.notes;
 DROP SEQUENCE IF EXISTS public.notes_id_seq;
 DROP TABLE IF EXISTS public.opt_outs;
@@ -105,7 +125,9 @@ DROP SEQUENCE IF EXISTS public.schedule_updates_id_seq;
 DROP TABLE IF EXISTS public.scheduled;
 DROP TABLE IF EXISTS public.sent_emails;
 DROP SEQUENCE IF EXISTS public.sent_emails_id_seq;
+DROP TABLE IF EXISTS public.sis_refresh_log;
 DROP TABLE IF EXISTS public.sis_sections;
+DROP TABLE IF EXISTS public.sis_sections_staged;
 DROP SEQUENCE IF EXISTS public.sis_sections_id_seq;
 
 --
@@ -0,0 +1,113 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+ALTER TABLE cross_listings ADD COLUMN IF NOT EXISTS courses JSONB NOT NULL DEFAULT '[]';
+ALTER TABLE cross_listings ADD COLUMN IF NOT EXISTS instructors JSONB NOT NULL DEFAULT '[]';
+
+-- Same as CrossListing.refresh_metadata, for all terms.
+
+WITH sections AS (
+    SELECT
+        c.term_id,
+        c.section_id AS principal_section_id,
+        x.ordinal,
+        s.course_name,
+        s.course_title,
+        s.instruction_format,
+        s.instructor_role_code,
+        s.instructor_uid,
+        s.is_primary,
+        s.section_id,
+        s.section_num
+    FROM cross_listings c
+    CROSS JOIN unnest(c.cross_listed_section_ids) WITH ORDINALITY AS x(section_id, ordinal)
+    JOIN sis_sections s
+        ON s.term_id = c.term_id
+        AND s.section_id = x.section_id
+        AND s.instructor_role_code IN ('APRX', 'ICNT', 'PI', 'TNIC')
+        AND s.deleted_at IS NULL
+),
+courses AS (
+    SELECT
+        term_id,
+        principal_section_id,
+        jsonb_agg(jsonb_build_object(
+            'courseName', course_name,
+            'courseTitle', course_title,
+            'instructionFormat', instruction_format,
+            'isPrimary', is_primary,
+            'label', concat(course_name, ', ', instruction_format, ' ', section_num),
+            'sectionId', section_id,
+            'sectionNum', section_num,
+            'termId', term_id
+        ) ORDER BY ordinal) AS courses
+    FROM (
+        SELECT DISTINCT ON (term_id, principal_section_id, ordinal) *
+        FROM sections
+        ORDER BY term_id, principal_section_id, ordinal
+    ) s
+    GROUP BY term_id, principal_section_id
+),
+instructors AS (
+    SELECT
+        term_id,
+        principal_section_id,
+        jsonb_agg(jsonb_build_object(
+            'deptCode', dept_code,
+            'email', email,
+            'name', name,
+            'roleCode', instructor_role_code,
+            'uid', uid
+        ) ORDER BY ordinal, uid) AS instructors
+    FROM (
+        SELECT DISTINCT ON (s.term_id, s.principal_section_id, i.uid)
+            s.term_id,
+            s.principal_section_id,
+            s.ordinal,
+            s.instructor_role_code,
+            i.dept_code,
+            i.email,
+            i.first_name || ' ' || i.last_name AS name,
+            i.uid
+        FROM sections s
+        JOIN instructors i ON i.uid = s.instructor_uid
+        WHERE trim(i.uid) <> ''
+        ORDER BY
+            s.term_id,
+            s.principal_section_id,
+            i.uid,
+            s.ordinal,
+            array_position(ARRAY['APRX', 'ICNT', 'TNIC', 'PI'], s.instructor_role_code) DESC NULLS LAST
+    ) s
+    GROUP BY term_id, principal_section_id
+)
+UPDATE cross_listings c
+SET
+    courses = COALESCE((SELECT courses FROM courses WHERE term_id = c.term_id AND principal_section_id = c.section_id), '[]'),
+    instructors = COALESCE((SELECT instructors FROM instructors WHERE term_id = c.term_id AND principal_section_id = c.section_id), '[]');
+
+COMMIT;
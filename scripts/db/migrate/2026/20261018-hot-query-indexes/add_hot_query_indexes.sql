@@ -0,0 +1,46 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+-- Principal, non-deleted sections of a term: the base of nearly every course query.
+CREATE INDEX IF NOT EXISTS sis_sections_principal_idx ON sis_sections (term_id, section_id)
+    WHERE deleted_at IS NULL AND is_principal_listing IS TRUE;
+-- Course lists per instructor, filtered by role code.
+CREATE INDEX IF NOT EXISTS sis_sections_term_id_instructor_uid_idx ON sis_sections (term_id, instructor_uid, instructor_role_code)
+    WHERE deleted_at IS NULL;
+-- Course lists per room.
+CREATE INDEX IF NOT EXISTS sis_sections_term_id_meeting_location_idx ON sis_sections (term_id, meeting_location)
+    WHERE deleted_at IS NULL;
+
+-- Scheduled.get_scheduled_per_instructor_uid uses the array containment operator (@>).
+CREATE INDEX IF NOT EXISTS scheduled_instructor_uids_idx ON scheduled USING gin (instructor_uids);
+CREATE INDEX IF NOT EXISTS scheduled_term_id_section_id_active_idx ON scheduled (term_id, section_id)
+    WHERE deleted_at IS NULL;
+
+-- The opted-out courses query joins opt_outs on instructor_uid.
+CREATE INDEX IF NOT EXISTS opt_outs_instructor_uid_idx ON opt_outs (instructor_uid);
+
+COMMIT;
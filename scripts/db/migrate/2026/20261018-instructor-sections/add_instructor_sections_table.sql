@@ -0,0 +1,50 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS instructor_sections (
+    term_id INTEGER NOT NULL,
+    instructor_uid VARCHAR(80) NOT NULL,
+    section_id INTEGER NOT NULL
+);
+ALTER TABLE instructor_sections OWNER TO app_diablo;
+ALTER TABLE instructor_sections ADD CONSTRAINT instructor_sections_pkey PRIMARY KEY (term_id, instructor_uid, section_id);
+
+-- Same as InstructorSection.refresh, for all terms. Subsequent SIS data refreshes will rebuild per term.
+INSERT INTO instructor_sections (term_id, instructor_uid, section_id)
+SELECT DISTINCT s.term_id, s.instructor_uid, COALESCE(c.section_id, s.section_id)
+FROM sis_sections s
+JOIN instructors i ON i.uid = s.instructor_uid
+LEFT JOIN cross_listings c
+    ON s.is_principal_listing IS FALSE
+    AND c.term_id = s.term_id
+    AND s.section_id = ANY(c.cross_listed_section_ids)
+WHERE
+    s.instructor_role_code = ANY(ARRAY['ICNT', 'PI', 'TNIC'])
+    AND s.deleted_at IS NULL
+    AND (s.is_principal_listing IS NOT FALSE OR c.section_id IS NOT NULL);
+
+COMMIT;
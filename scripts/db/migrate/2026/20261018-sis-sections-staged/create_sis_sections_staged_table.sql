@@ -0,0 +1,53 @@
+/**
+ * Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+ *
+ * Permission to use, copy, modify, and distribute this software and its documentation
+ * for educational, research, and not-for-profit purposes, without fee and without a
+ * signed licensing agreement, is hereby granted, provided that the above copyright
+ * notice, this paragraph and the following two paragraphs appear in all copies,
+ * modifications, and distributions.
+ *
+ * Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+ * Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+ * http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+ *
+ * IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+ * INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+ * THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+ * OF THE POSSIBILITY OF SUCH DAMAGE.
+ *
+ * REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+ * IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+ * SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+ * "AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ * ENHANCEMENTS, OR MODIFICATIONS.
+ */
+
+BEGIN;
+
+-- SIS data refresh used to create this table on each run. Now terms are staged concurrently, each in its own rows.
+DROP TABLE IF EXISTS sis_sections_staged;
+
+CREATE UNLOGGED TABLE sis_sections_staged (
+    allowed_units VARCHAR(80),
+    course_name VARCHAR(80),
+    course_title TEXT,
+    instruction_format VARCHAR(80),
+    instructor_name TEXT,
+    instructor_role_code VARCHAR(80),
+    instructor_uid VARCHAR(80),
+    is_primary BOOLEAN,
+    meeting_days VARCHAR(80),
+    meeting_end_date TIMESTAMP,
+    meeting_end_time VARCHAR(80),
+    meeting_location VARCHAR(80),
+    meeting_start_date TIMESTAMP,
+    meeting_start_time VARCHAR(80),
+    section_id INTEGER,
+    section_num VARCHAR(80),
+    term_id INTEGER
+);
+ALTER TABLE sis_sections_staged OWNER TO app_diablo;
+CREATE INDEX sis_sections_staged_term_id_idx ON sis_sections_staged (term_id);
+
+COMMIT;
@@ -140,6 +140,21 @@ ALTER TABLE ONLY blackouts
 
 --
 
+CREATE TABLE course_feeds (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    include_deleted BOOLEAN NOT NULL,
+    config_key VARCHAR(255) NOT NULL,
+    version_key VARCHAR(255) NOT NULL,
+    feed JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE course_feeds OWNER TO diablo;
+ALTER TABLE course_feeds ADD CONSTRAINT course_feeds_pkey PRIMARY KEY (term_id, section_id, include_deleted);
+
+--
+
 CREATE TABLE course_preferences (
     term_id INTEGER NOT NULL,
     section_id INTEGER NOT NULL,
@@ -158,6 +173,8 @@ CREATE TABLE cross_listings (
     term_id INTEGER NOT NULL,
     section_id INTEGER NOT NULL,
     cross_listed_section_ids INTEGER[] NOT NULL,
+    courses JSONB NOT NULL DEFAULT '[]',
+    instructors JSONB NOT NULL DEFAULT '[]',
     created_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
 ALTER TABLE cross_listings OWNER TO diablo;
@@ -165,6 +182,26 @@ ALTER TABLE cross_listings ADD CONSTRAINT cross_listings_pkey PRIMARY KEY (secti
 
 --
 
+CREATE TABLE data_versions (
+    key VARCHAR(255) NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE data_versions OWNER TO diablo;
+ALTER TABLE data_versions ADD CONSTRAINT data_versions_pkey PRIMARY KEY (key);
+
+--
+
+CREATE TABLE eligible_sections (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    instructor_role_code VARCHAR(80)
+);
+ALTER TABLE eligible_sections OWNER TO diablo;
+CREATE INDEX eligible_sections_term_id_section_id_idx ON eligible_sections (term_id, section_id);
+
+--
+
 CREATE TABLE email_templates (
     id INTEGER NOT NULL,
     template_type email_template_types NOT NULL,
@@ -191,12 +228,23 @@ ALTER TABLE ONLY email_templates
 
 --
 
+CREATE TABLE instructor_sections (
+    term_id INTEGER NOT NULL,
+    instructor_uid VARCHAR(80) NOT NULL,
+    section_id INTEGER NOT NULL
+);
+ALTER TABLE instructor_sections OWNER TO diablo;
+ALTER TABLE instructor_sections ADD CONSTRAINT instructor_sections_pkey PRIMARY KEY (term_id, instructor_uid, section_id);
+
+--
+
 CREATE TABLE instructors (
     uid character varying(255) NOT NULL,
     dept_code VARCHAR(80),
     email VARCHAR(255),
     first_name VARCHAR(255),
     last_name VARCHAR(255),
+    verified_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
@@ -261,6 +309,26 @@ ALTER TABLE ONLY jobs
 
 --
 
+CREATE TABLE kaltura_events (
+    id INTEGER NOT NULL,
+    parent_id INTEGER,
+    resource_id INTEGER,
+    recurrence_type VARCHAR(80),
+    status VARCHAR(80),
+    start_date TIMESTAMP WITH TIME ZONE,
+    end_date TIMESTAMP WITH TIME ZONE,
+    api_json JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE kaltura_events OWNER TO diablo;
+ALTER TABLE kaltura_events ADD CONSTRAINT kaltura_events_pkey PRIMARY KEY (id);
+CREATE INDEX kaltura_events_parent_id_idx ON kaltura_events (parent_id);
+CREATE INDEX kaltura_events_resource_id_start_date_idx ON kaltura_events (resource_id, start_date);
+CREATE INDEX kaltura_events_start_date_idx ON kaltura_events (start_date);
+
+--
+
 CREATE TABLE notes (
     id INTEGER NOT NULL,
     term_id INTEGER,
@@ -306,6 +374,7 @@ ALTER SEQUENCE opt_outs_id_seq OWNED BY opt_outs.id;
 ALTER TABLE ONLY opt_outs ALTER COLUMN id SET DEFAULT nextval('opt_outs_id_seq'::regclass);
 ALTER TABLE ONLY opt_outs
     ADD CONSTRAINT opt_outs_pkey PRIMARY KEY (id);
+CREATE INDEX opt_outs_instructor_uid_idx ON opt_outs (instructor_uid);
 
 --
 
@@ -412,7 +481,9 @@ CREATE TABLE scheduled (
     deleted_at TIMESTAMP WITH TIME ZONE
 );
 ALTER TABLE scheduled OWNER TO diablo;
+CREATE INDEX scheduled_instructor_uids_idx ON scheduled USING gin (instructor_uids);
 CREATE INDEX scheduled_term_id_section_id_idx ON scheduled (term_id, section_id);
+CREATE INDEX scheduled_term_id_section_id_active_idx ON scheduled (term_id, section_id) WHERE deleted_at IS NULL;
 
 --
 
@@ -440,6 +511,19 @@ CREATE INDEX sent_emails_section_id_idx ON sent_emails USING btree (section_id);
 
 --
 
+CREATE TABLE sis_refresh_log (
+    id SERIAL PRIMARY KEY,
+    term_id INTEGER NOT NULL,
+    inserted_section_ids INTEGER[] NOT NULL,
+    updated_section_ids INTEGER[] NOT NULL,
+    deleted_section_ids INTEGER[] NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+ALTER TABLE sis_refresh_log OWNER TO diablo;
+CREATE INDEX sis_refresh_log_term_id_idx ON sis_refresh_log (term_id);
+
+--
+
 CREATE TABLE sis_sections (
     id INTEGER NOT NULL,
     allowed_units VARCHAR(80),
@@ -480,6 +564,36 @@ ALTER TABLE sis_sections ALTER COLUMN created_at SET DEFAULT now();
 CREATE INDEX sis_sections_instructor_uid_idx ON sis_sections USING btree (instructor_uid);
 CREATE INDEX sis_sections_meeting_location_idx ON sis_sections USING btree (meeting_location);
 CREATE INDEX sis_sections_term_id_section_id_idx ON sis_sections(term_id, section_id);
+CREATE INDEX sis_sections_principal_idx ON sis_sections (term_id, section_id)
+    WHERE deleted_at IS NULL AND is_principal_listing IS TRUE;
+CREATE INDEX sis_sections_term_id_instructor_uid_idx ON sis_sections (term_id, instructor_uid, instructor_role_code)
+    WHERE deleted_at IS NULL;
+CREATE INDEX sis_sections_term_id_meeting_location_idx ON sis_sections (term_id, meeting_location)
+    WHERE deleted_at IS NULL;
+
+--
+
+CREATE UNLOGGED TABLE sis_sections_staged (
+    allowed_units VARCHAR(80),
+    course_name VARCHAR(80),
+    course_title TEXT,
+    instruction_format VARCHAR(80),
+    instructor_name TEXT,
+    instructor_role_code VARCHAR(80),
+    instructor_uid VARCHAR(80),
+    is_primary BOOLEAN,
+    meeting_days VARCHAR(80),
+    meeting_end_date TIMESTAMP,
+    meeting_end_time VARCHAR(80),
+    meeting_location VARCHAR(80),
+    meeting_start_date TIMESTAMP,
+    meeting_start_time VARCHAR(80),
+    section_id INTEGER,
+    section_num VARCHAR(80),
+    term_id INTEGER
+);
+ALTER TABLE sis_sections_staged OWNER TO diablo;
+CREATE INDEX sis_sections_staged_term_id_idx ON sis_sections_staged (term_id);
 
 --
 
@@ -28,6 +28,7 @@ import json
 
 from diablo import std_commit
 from diablo.jobs.emails_job import EmailsJob
+from diablo.models.course_preference import CoursePreference
 from diablo.models.opt_out import OptOut
 from diablo.models.scheduled import Scheduled
 from diablo.models.sent_email import SentEmail
@@ -209,6 +210,40 @@ class TestGetCourse:
         )
         assert len(api_json['instructors']) == 0
 
+    def test_conditional_get(self, client, fake_auth):
+        """Course is not rebuilt when client has the current ETag."""
+        instructor_uids = get_instructor_uids(section_id=section_2_id, term_id=self.term_id)
+        fake_auth.login(instructor_uids[0])
+        response = client.get(f'/api/course/{self.term_id}/{section_2_id}')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+
+        response = client.get(f'/api/course/{self.term_id}/{section_2_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert not response.data
+
+        CoursePreference.update_publish_type(
+            term_id=self.term_id,
+            section_id=section_2_id,
+            publish_type='kaltura_my_media',
+            canvas_site_ids=None,
+        )
+        response = client.get(f'/api/course/{self.term_id}/{section_2_id}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert response.json['publishType'] == 'kaltura_my_media'
+
+    def test_conditional_get_unauthorized(self, client, fake_auth):
+        """Matching If-None-Match gets 404 or 403, rather than 304, if the course is missing or forbidden."""
+        instructor_uids = get_instructor_uids(section_id=section_2_id, term_id=self.term_id)
+        fake_auth.login(instructor_uids[0])
+        response = client.get(f'/api/course/{self.term_id}/99999', headers={'If-None-Match': '*'})
+        assert response.status_code == 404
+        uid = next(uid for uid in get_instructor_uids(section_id=section_1_id, term_id=self.term_id) if uid not in instructor_uids)
+        fake_auth.login(uid)
+        response = client.get(f'/api/course/{self.term_id}/{section_2_id}', headers={'If-None-Match': '*'})
+        assert response.status_code == 403
+
     def test_dual_mode_instruction(self, client, fake_auth):
         """Course is both online and in a physical location."""
         fake_auth.login(admin_uid)
@@ -421,6 +456,115 @@ class TestGetCourses:
             assert _find_course(api_json=api_json, section_id=section_in_ineligible_room, term_id=self.term_id)
 
 
+class TestGetCoursesPage:
+
+    @property
+    def term_id(self):
+        return app.config['CURRENT_TERM_ID']
+
+    @staticmethod
+    def _api_courses_page(client, term_id, expected_status_code=200, **kwargs):
+        response = client.post(
+            '/api/courses',
+            data=json.dumps({'termId': term_id, **kwargs}),
+            content_type='application/json',
+        )
+        assert response.status_code == expected_status_code
+        return response.json
+
+    def test_not_authenticated(self, client):
+        """Deny anonymous access."""
+        self._api_courses_page(client, term_id=self.term_id, filter='Eligible', limit=5, expected_status_code=401)
+
+    def test_invalid_limit(self, client, fake_auth):
+        """Limit must be a positive integer."""
+        fake_auth.login(admin_uid)
+        for limit in [0, -1, 'five', 100000, True, 4.0]:
+            self._api_courses_page(client, term_id=self.term_id, filter='Eligible', limit=limit, expected_status_code=400)
+
+    def test_invalid_sort_by(self, client, fake_auth):
+        """Only known sort keys are accepted."""
+        fake_auth.login(admin_uid)
+        for sort_by in ['1; DROP TABLE', ['sectionId'], {'courseName': 1}]:
+            self._api_courses_page(client, term_id=self.term_id, filter='Eligible', limit=5, sortBy=sort_by, expected_status_code=400)
+
+    def test_invalid_cursor(self, client, fake_auth):
+        """Malformed cursor is rejected."""
+        fake_auth.login(admin_uid)
+        for sort_by, after in [
+            ('courseName', {'sectionId': 'abc', 'sortKey': 'x'}),
+            ('courseName', {'sectionId': 50000, 'sortKey': ['x']}),
+            ('courseName', {'sectionId': 50000, 'sortKey': 1}),
+            ('courseName', {'sectionId': [50000], 'sortKey': 'x'}),
+            ('sectionId', {'sectionId': 50000, 'sortKey': 'x'}),
+            ('sectionId', {'sectionId': 50000, 'sortKey': {'x': 1}}),
+            ('sectionId', ['x']),
+        ]:
+            self._api_courses_page(
+                client,
+                term_id=self.term_id,
+                filter='Eligible',
+                limit=5,
+                after=after,
+                sortBy=sort_by,
+                expected_status_code=400,
+            )
+
+    def test_page_through_eligible(self, client, fake_auth):
+        """Paging through eligible courses yields the same courses as the unpaged feed."""
+        fake_auth.login(admin_uid)
+        all_eligible = SisSection.get_courses(self.term_id, include_full_schedules=False)
+        section_ids = []
+        after = None
+        while True:
+            api_json = self._api_courses_page(client, term_id=self.term_id, filter='Eligible', limit=5, after=after)
+            assert api_json['totalCount'] == 11
+            assert len(api_json['courses']) <= 5
+            section_ids += [c['sectionId'] for c in api_json['courses']]
+            after = api_json['nextCursor']
+            if not after:
+                break
+        assert len(section_ids) == 11
+        assert sorted(section_ids) == sorted(c['sectionId'] for c in all_eligible)
+
+    def test_sort_by_section_id_desc(self, client, fake_auth):
+        """Pages are sorted per request."""
+        fake_auth.login(admin_uid)
+        api_json = self._api_courses_page(client, term_id=self.term_id, filter='All', limit=4, sortBy='sectionId', sortDesc=True)
+        section_ids = [c['sectionId'] for c in api_json['courses']]
+        assert api_json['totalCount'] == 15
+        assert len(section_ids) == 4
+        assert section_ids == sorted(section_ids, reverse=True)
+        api_json = self._api_courses_page(
+            client,
+            term_id=self.term_id,
+            filter='All',
+            limit=4,
+            sortBy='sectionId',
+            sortDesc=True,
+            after=api_json['nextCursor'],
+        )
+        assert api_json['courses'][0]['sectionId'] < section_ids[-1]
+
+    def test_search_text(self, client, fake_auth):
+        """Search narrows both the page and the total count."""
+        fake_auth.login(admin_uid)
+        api_json = self._api_courses_page(client, term_id=self.term_id, filter='All', limit=10, searchText=str(section_1_id))
+        assert api_json['totalCount'] == 1
+        assert api_json['courses'][0]['sectionId'] == section_1_id
+        assert api_json['nextCursor'] is None
+
+    def test_scheduled_page(self, client, fake_auth):
+        """Scheduled filter is paged, too."""
+        fake_auth.login(admin_uid)
+        with test_scheduling_workflow(app):
+            mock_scheduled(section_id=section_1_id, term_id=self.term_id)
+            std_commit(allow_test_environment=True)
+            api_json = self._api_courses_page(client, term_id=self.term_id, filter='Scheduled', limit=10)
+            assert api_json['totalCount'] == 1
+            assert [c['sectionId'] for c in api_json['courses']] == [section_1_id]
+
+
 class TestDownloadCoursesCsv:
 
     @staticmethod
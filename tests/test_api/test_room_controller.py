@@ -63,6 +63,19 @@ class TestGetAllRooms:
         for key in ['id', 'capability', 'isAuditorium', 'kalturaResourceId', 'location']:
             assert key in rooms[0]
 
+    def test_conditional_get(self, client, admin_session):
+        """The ETag changes when a room changes."""
+        etag = client.get('/api/rooms/all').headers['ETag']
+        response = client.get('/api/rooms/all', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        room = Room.find_room('Barker 101')
+        Room.update_capability(room.id, None)
+        response = client.get('/api/rooms/all', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert next(r for r in response.json if r['id'] == room.id)['capability'] is None
+
 
 class TestGetAuditoriums:
     """Only authorized users can get list of auditoriums."""
@@ -0,0 +1,84 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from threading import Lock
+
+from diablo.externals import calnet
+from flask import current_app as app
+import ldap3
+
+
+class MockClient(calnet.Client):
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.connect_count = 0
+        self._lock = Lock()
+        self.mock_server = ldap3.Server('mock_ldap')
+        conn = self._mock_connection()
+        for uid in range(100, 130):
+            conn.strategy.add_entry(f'uid={uid},ou=people,dc=berkeley,dc=edu', {
+                'givenName': f'First{uid}',
+                'objectClass': 'person',
+                'ou': 'people',
+                'sn': f'Last{uid}',
+                'uid': str(uid),
+            })
+
+    def connect(self):
+        with self._lock:
+            self.connect_count += 1
+        return self._mock_connection()
+
+    def _mock_connection(self):
+        conn = ldap3.Connection(self.mock_server, client_strategy=ldap3.MOCK_SYNC)
+        conn.bind()
+        return conn
+
+
+class TestCalnetClient:
+
+    def test_search_uids_in_concurrent_batches(self, monkeypatch):
+        """Batches are searched concurrently, on pooled connections."""
+        monkeypatch.setattr(calnet, 'BATCH_QUERY_MAXIMUM', 4)
+        client = MockClient(app)
+        uids = [str(uid) for uid in range(95, 135)]
+        results = client.search_uids(uids)
+        assert sorted(r['uid'] for r in results) == [str(uid) for uid in range(100, 130)]
+        result = next(r for r in results if r['uid'] == '100')
+        assert result['first_name'] == 'First100'
+        assert result['expired'] is False
+        assert 1 <= client.connect_count <= app.config['LDAP_SEARCH_MAX_WORKERS']
+
+        client.search_uids(uids)
+        assert client.connect_count <= app.config['LDAP_SEARCH_MAX_WORKERS']
+        client.close()
+
+    def test_reuse_connection(self):
+        """A single batch is searched on the connection of the previous search."""
+        client = MockClient(app)
+        assert client.search_uids(['100'])[0]['last_name'] == 'Last100'
+        assert client.search_uids(['101'])[0]['last_name'] == 'Last101'
+        assert client.connect_count == 1
+        client.close()
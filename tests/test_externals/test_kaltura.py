@@ -0,0 +1,350 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from threading import Event, Lock
+from types import SimpleNamespace
+
+from diablo.externals import kaltura
+from diablo.lib.util import epoch_time_to_isoformat
+from diablo.models.kaltura_event import KalturaEvent
+from flask import current_app as app
+from KalturaClient import KalturaClient, KalturaConfiguration
+from KalturaClient.exceptions import KalturaException
+from KalturaClient.Plugins.Core import KalturaBaseEntry, KalturaCategoryEntry
+from KalturaClient.Plugins.Schedule import KalturaRecordScheduleEventFilter
+import pytest
+from tests.util import override_config
+
+
+class TestAdminSessions:
+
+    @staticmethod
+    def _mock_sessions(monkeypatch):
+        started = []
+
+        def _start_admin_session(disable_entitlements):
+            started.append(disable_entitlements)
+            return f'ks-{len(started)}'
+        monkeypatch.setattr(kaltura, '_admin_sessions', {})
+        monkeypatch.setattr(kaltura, '_start_admin_session', _start_admin_session)
+        return started
+
+    def test_session_per_privilege_set(self, monkeypatch):
+        """One admin session is started per privilege set, then reused."""
+        started = self._mock_sessions(monkeypatch)
+        assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-1'
+        assert kaltura._get_admin_ks(disable_entitlements=True) == 'ks-2'
+        assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-1'
+        assert kaltura._get_admin_ks(disable_entitlements=True) == 'ks-2'
+        assert started == [False, True]
+
+    def test_session_refreshed_before_expiry(self, monkeypatch):
+        """A session is replaced once it is within the refresh margin of expiry."""
+        started = self._mock_sessions(monkeypatch)
+        with override_config(app, 'KALTURA_EXPIRY', 60):
+            with override_config(app, 'KALTURA_SESSION_REFRESH_MARGIN', 60):
+                assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-1'
+                assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-2'
+            with override_config(app, 'KALTURA_SESSION_REFRESH_MARGIN', 0):
+                assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-3'
+                assert kaltura._get_admin_ks(disable_entitlements=False) == 'ks-3'
+        assert started == [False, False, False]
+
+
+class TestEventsToApiJson:
+
+    def test_recurrences_under_series(self):
+        """Recurrences are filed under their series, whether they arrive before or after it."""
+        events = [
+            {'id': 3, 'parentId': 1, 'recurrenceType': 'Recurrence'},
+            {'id': 1, 'parentId': None, 'recurrenceType': 'Recurring'},
+            {'id': 4, 'parentId': None, 'recurrenceType': 'None'},
+            {'id': 5, 'parentId': 2, 'recurrenceType': 'Recurrence'},
+            {'id': 6, 'parentId': 1, 'recurrenceType': 'Recurrence'},
+        ]
+        api_json = kaltura._events_to_api_json(iter(events))
+        assert [e['id'] for e in api_json] == [1, 4, 5]
+        assert [e['id'] for e in api_json[0]['recurrences']] == [3, 6]
+
+    def test_keep(self):
+        """Events not kept are dropped, along with recurrences of dropped series."""
+        events = [
+            {'id': 1, 'parentId': None, 'recurrenceType': 'Recurring', 'tags': 'other'},
+            {'id': 3, 'parentId': 1, 'recurrenceType': 'Recurrence', 'tags': 'diablo'},
+            {'id': 2, 'parentId': None, 'recurrenceType': 'Recurring', 'tags': 'diablo'},
+            {'id': 4, 'parentId': 2, 'recurrenceType': 'Recurrence', 'tags': 'other'},
+            {'id': 5, 'parentId': None, 'recurrenceType': 'None', 'tags': 'other'},
+            {'id': 6, 'parentId': 9, 'recurrenceType': 'Recurrence', 'tags': 'diablo'},
+        ]
+        api_json = kaltura._events_to_api_json(iter(events), keep=lambda e: e['tags'] == 'diablo')
+        assert [e['id'] for e in api_json] == [2, 6]
+        assert [e['id'] for e in api_json[0]['recurrences']] == [4]
+
+
+class TestPagination:
+
+    def test_pages_in_order(self):
+        """Later pages are fetched concurrently, with clients of their own, and objects are yielded in page order."""
+        kaltura_api = kaltura.Kaltura()
+        kaltura_api.client = KalturaClient(KalturaConfiguration())
+        kaltura_api.client.setKs('ks')
+        page_size = kaltura.DEFAULT_KALTURA_PAGE_SIZE
+        fetched = []
+        completed = []
+        lock = Lock()
+        # Of pages 2 to 4, fetched at once, each waits for the next to come back. Pages come back in reverse order.
+        is_done = {page_index: Event() for page_index in range(2, 5)}
+
+        def _fetch(client, page_index):
+            with lock:
+                fetched.append((page_index, client is kaltura_api.client))
+            if page_index in is_done and page_index + 1 in is_done:
+                assert is_done[page_index + 1].wait(timeout=10)
+            objects = list(range((page_index - 1) * page_size, min(page_index * page_size, 1234)))
+            with lock:
+                completed.append(page_index)
+            if page_index in is_done:
+                is_done[page_index].set()
+            return SimpleNamespace(objects=objects, totalCount=1234)
+
+        with override_config(app, 'KALTURA_PAGE_FETCH_MAX_WORKERS', 3):
+            objects = kaltura_api._iter_kaltura_objects(_fetch)
+            assert next(objects) == 0
+            assert fetched == [(1, True)]
+            assert [0] + list(objects) == list(range(1234))
+        assert completed[:4] == [1, 4, 3, 2]
+        assert sorted(fetched) == [(1, True)] + [(page_index, False) for page_index in range(2, 8)]
+
+    def test_max_pages(self):
+        """No page beyond 'max_pages' is fetched."""
+        kaltura_api = kaltura.Kaltura()
+        kaltura_api.client = KalturaClient(KalturaConfiguration())
+        kaltura_api.client.setKs('ks')
+        fetched = []
+
+        def _fetch(client, page_index):
+            fetched.append(page_index)
+            return SimpleNamespace(objects=[page_index], totalCount=1234)
+        assert list(kaltura_api._iter_kaltura_objects(_fetch, max_pages=3)) == [1, 2, 3]
+        assert sorted(fetched) == [1, 2, 3]
+
+
+class TestEventsByCreatedAt:
+
+    @staticmethod
+    def _mock_kaltura(monkeypatch, created_at_per_event):
+        windows = []
+
+        def _iter_events(kaltura_event_filter, max_pages=None):
+            created_since = kaltura_event_filter.createdAtGreaterThanOrEqual
+            windows.append(created_since)
+            events = [
+                {'createdAt': epoch_time_to_isoformat(created_at), 'id': event_id}
+                for event_id, created_at in enumerate(created_at_per_event)
+                if created_since is None or created_at >= created_since
+            ]
+            return iter(events[:max_pages * kaltura.DEFAULT_KALTURA_PAGE_SIZE])
+        kaltura_api = kaltura.Kaltura()
+        monkeypatch.setattr(kaltura_api, '_iter_events', _iter_events)
+        monkeypatch.setattr(kaltura, 'KALTURA_MAX_LIST_RESULTS', 2 * kaltura.DEFAULT_KALTURA_PAGE_SIZE)
+        return kaltura_api, windows
+
+    @staticmethod
+    def _event_filter(created_since):
+        return KalturaRecordScheduleEventFilter(createdAtGreaterThanOrEqual=created_since)
+
+    def test_windows(self, monkeypatch):
+        """Events past the Kaltura list limit are read in later windows, starting at the creation time of the last event read."""
+        created_at_per_event = [1700000000 + (index // 3) for index in range(1000)]
+        kaltura_api, windows = self._mock_kaltura(monkeypatch, created_at_per_event)
+        event_ids = [event['id'] for event in kaltura_api._iter_events_by_created_at(self._event_filter)]
+        assert set(event_ids) == set(range(1000))
+        assert len(event_ids) < 1100
+        assert windows[0] is None
+        assert windows[1:] == sorted(set(windows[1:]))
+        assert len(windows) == 3
+
+    def test_too_many_events_created_at_once(self, monkeypatch):
+        """A window that cannot move forward is an error, rather than an incomplete read."""
+        kaltura_api, _ = self._mock_kaltura(monkeypatch, [1700000000] * 1000)
+        with pytest.raises(ValueError):
+            list(kaltura_api._iter_events_by_created_at(self._event_filter))
+
+
+class TestRequestRateLimit:
+
+    @staticmethod
+    def _bucket(is_sleep_timed=True):
+        # The clock moves only when told to, so the test does not depend on how fast it runs. If sleep is not timed then
+        # callers are as if in threads of their own, all asking at the same instant.
+        clock = SimpleNamespace(now=0.0, sleeps=[])
+
+        def _sleep(seconds):
+            clock.sleeps.append(seconds)
+            if is_sleep_timed:
+                clock.now += seconds
+        return kaltura._TokenBucket(clock=lambda: clock.now, sleep_=_sleep), clock
+
+    def test_token_bucket(self):
+        """A burst of up to 'rate' requests goes out at once; later requests wait for tokens to refill."""
+        bucket, clock = self._bucket()
+        for _ in range(20):
+            bucket.acquire(rate=20)
+        assert clock.sleeps == []
+        for _ in range(4):
+            bucket.acquire(rate=20)
+        assert clock.sleeps == pytest.approx([0.05] * 4)
+        assert clock.now == pytest.approx(0.2)
+
+    def test_concurrent_callers(self):
+        """Callers that find the bucket empty at the same instant wait in line, each for a token of its own."""
+        bucket, clock = self._bucket(is_sleep_timed=False)
+        for _ in range(24):
+            bucket.acquire(rate=20)
+        assert clock.sleeps == pytest.approx([0.05, 0.1, 0.15, 0.2])
+
+    def test_refill(self):
+        """Tokens refill with time, up to 'rate'."""
+        bucket, clock = self._bucket()
+        for _ in range(20):
+            bucket.acquire(rate=20)
+        clock.now += 10
+        for _ in range(20):
+            bucket.acquire(rate=20)
+        assert clock.sleeps == []
+        bucket.acquire(rate=20)
+        assert clock.sleeps == pytest.approx([0.05])
+
+    def test_no_limit(self):
+        """A rate of zero means no limit."""
+        bucket, clock = self._bucket()
+        for _ in range(1000):
+            bucket.acquire(rate=0)
+        assert clock.sleeps == []
+
+
+class TestMirrorRefresh:
+
+    @staticmethod
+    def _mock_kaltura(monkeypatch, events):
+        def _iter_events(kaltura_event_filter, max_pages=None):
+            if isinstance(kaltura_event_filter.idIn, str):
+                ids = kaltura_event_filter.idIn.split(',')
+                return iter([e for e in events if str(e['id']) in ids])
+            parent_ids = kaltura_event_filter.parentIdIn.split(',')
+            return iter([e for e in events if str(e['parentId']) in parent_ids])
+        kaltura_api = kaltura.Kaltura()
+        monkeypatch.setattr(kaltura_api, '_iter_events', _iter_events)
+        monkeypatch.setattr(kaltura_api, 'get_resource_ids_per_event', lambda event_ids: {event_id: 7001 for event_id in event_ids})
+        return kaltura_api
+
+    @staticmethod
+    def _event(event_id, recurrence_type, parent_id=None, status='Active'):
+        return {
+            'endDate': '2026-08-24T10:00:00-07:00',
+            'id': event_id,
+            'parentId': parent_id,
+            'recurrenceType': recurrence_type,
+            'startDate': '2026-08-24T09:00:00-07:00',
+            'status': status,
+        }
+
+    def test_refresh(self, monkeypatch):
+        """A series and its recurrences, as Kaltura has them now, replace what the mirror had."""
+        series = self._event(900001, 'Recurring')
+        recurrences = [self._event(900002, 'Recurrence', parent_id=900001), self._event(900003, 'Recurrence', parent_id=900001)]
+        KalturaEvent.upsert([series, recurrences[0], self._event(900004, 'Recurrence', parent_id=900001)])
+        kaltura_api = self._mock_kaltura(monkeypatch, [series, recurrences[0], {**recurrences[1], 'status': 'Cancelled'}])
+        kaltura_api._refresh_mirrored_events(event_ids=[900001])
+        assert [e['id'] for e in KalturaEvent.get_events_by_resource(7001)] == [900001, 900002, 900003]
+        assert KalturaEvent.get_events(event_ids=[900003])[0]['status'] == 'Cancelled'
+
+    def test_event_gone_from_kaltura(self, monkeypatch):
+        """Events that Kaltura no longer lists are dropped from the mirror."""
+        KalturaEvent.upsert([self._event(900001, 'Recurring'), self._event(900002, 'Recurrence', parent_id=900001)])
+        self._mock_kaltura(monkeypatch, [])._refresh_mirrored_events(event_ids=[900001])
+        assert KalturaEvent.get_events(event_ids=[900001, 900002]) == []
+
+    def test_failed_refresh(self, monkeypatch):
+        """If Kaltura cannot be read then the events are dropped from the mirror, and reads fall back to Kaltura."""
+        KalturaEvent.upsert([self._event(900001, 'Recurring'), self._event(900002, 'Recurrence', parent_id=900001)])
+        kaltura_api = self._mock_kaltura(monkeypatch, [])
+
+        def _iter_events(kaltura_event_filter, max_pages=None):
+            raise KalturaException('Service unavailable', 'SERVICE_UNAVAILABLE')
+        monkeypatch.setattr(kaltura_api, '_iter_events', _iter_events)
+        kaltura_api._refresh_mirrored_events(event_ids=[900001])
+        assert KalturaEvent.get_events(event_ids=[900001, 900002]) == []
+
+
+class TestMultirequest:
+
+    @staticmethod
+    def _mock_kaltura(monkeypatch, results):
+        requests = []
+
+        def _do_multi_request():
+            _, params, _ = kaltura_api.client.getRequestParams()
+            requests.append(params.get())
+            kaltura_api.client.callsQueue = []
+            kaltura_api.client.multiRequestReturnType = None
+            return results
+        kaltura_api = kaltura.Kaltura()
+        kaltura_api.client = KalturaClient(KalturaConfiguration())
+        monkeypatch.setattr(kaltura_api.client, 'doMultiRequest', _do_multi_request)
+        return kaltura_api, requests
+
+    def test_dependent_calls_in_one_request(self, monkeypatch):
+        """Calls are sent in a single request, and later calls can refer to results of earlier calls."""
+        kaltura_api, requests = self._mock_kaltura(monkeypatch, results=['entry', 'category_entry'])
+        with kaltura_api._multirequest() as results:
+            entry = kaltura_api.client.baseEntry.add(KalturaBaseEntry(name='Series'))
+            kaltura_api.client.categoryEntry.add(KalturaCategoryEntry(categoryId=1, entryId=entry.id))
+            assert results == []
+        assert results == ['entry', 'category_entry']
+        assert len(requests) == 1
+        assert requests[0][0]['service'] == 'baseentry'
+        assert requests[0][1]['categoryEntry']['entryId'] == '{1:result:id}'
+        assert not kaltura_api.client.isMultiRequest()
+
+    def test_error_in_results(self, monkeypatch):
+        """The first error reported by Kaltura is raised."""
+        error = KalturaException('Entry not found', 'ENTRY_ID_NOT_FOUND')
+        kaltura_api, _ = self._mock_kaltura(monkeypatch, results=[error, KalturaException('Invalid entry', 'INVALID_ENTRY_ID')])
+        with pytest.raises(KalturaException) as exception_info:
+            with kaltura_api._multirequest():
+                entry = kaltura_api.client.baseEntry.add(KalturaBaseEntry(name='Series'))
+                kaltura_api.client.categoryEntry.add(KalturaCategoryEntry(categoryId=1, entryId=entry.id))
+        assert exception_info.value is error
+
+    def test_error_within_block(self, monkeypatch):
+        """Queued calls are discarded, unsent, if the block raises."""
+        kaltura_api, requests = self._mock_kaltura(monkeypatch, results=[])
+        with pytest.raises(ValueError):
+            with kaltura_api._multirequest():
+                kaltura_api.client.baseEntry.add(KalturaBaseEntry(name='Series'))
+                raise ValueError()
+        assert requests == []
+        assert not kaltura_api.client.isMultiRequest()
+        assert kaltura_api.client.callsQueue == []
@@ -24,7 +24,20 @@ ENHANCEMENTS, OR MODIFICATIONS.
 """
 import csv
 
-from diablo.jobs.util import register_cross_listings
+from diablo import db, std_commit
+from diablo.externals.kaltura import Kaltura
+from diablo.jobs.util import get_eligible_unscheduled_courses, refresh_cross_listings, refresh_instructors, register_cross_listings, \
+    schedule_recordings, schedule_recordings_concurrently, sync_kaltura_events
+from diablo.models.course_preference import CoursePreference
+from diablo.models.cross_listing import CrossListing
+from diablo.models.instructor import Instructor
+from diablo.models.kaltura_event import KalturaEvent
+from diablo.models.opt_out import OptOut
+from diablo.models.scheduled import Scheduled
+from diablo.models.sis_section import SisSection
+from flask import current_app as app
+from sqlalchemy import text
+from tests.util import override_config, test_scheduling_workflow
 
 
 class TestIdentifyCrossListings:
@@ -43,3 +56,127 @@ class TestIdentifyCrossListings:
             assert cross_listings[32712] == [32713, 32943, 32945]
             for non_cross_listed in [28135, 31049]:
                 assert non_cross_listed not in cross_listings
+
+    def test_copy_settings_to_new_cross_listings(self, app):
+        """Course preferences and opt-outs of one cross-listing are copied to the others."""
+        term_id = 9998
+        db.session.add(CoursePreference(term_id=term_id, section_id=32943, publish_type='kaltura_media_gallery'))
+        db.session.add(OptOut(instructor_uid='10001', term_id=term_id, section_id=32713))
+        std_commit()
+
+        section_ids = [32712, 32713, 32943, 32945]
+        schedule = 'MO2023-01-13 00:00:0016:00Barker 1012023-01-13 00:00:0009:00'
+        cross_listings = register_cross_listings([{'section_id': s, 'schedule': schedule} for s in section_ids], term_id)
+        assert cross_listings == {32712: [32713, 32943, 32945]}
+        preferences = CoursePreference.get_course_preferences_for_section_ids(section_ids, term_id)
+        assert sorted(p.section_id for p in preferences) == section_ids
+        assert {p.publish_type for p in preferences} == {'kaltura_media_gallery'}
+        opt_outs = OptOut.get_opt_outs_for_section_ids(section_ids, term_id)
+        assert sorted((o.section_id, o.instructor_uid) for o in opt_outs) == [(s, '10001') for s in section_ids]
+
+    def test_cross_listing_metadata(self, app):
+        """Course and instructor metadata of cross-listed sections is stored with the principal section."""
+        term_id = app.config['CURRENT_TERM_ID']
+        refresh_cross_listings(term_id)
+        cross_listing = CrossListing.query.filter_by(section_id=50007, term_id=term_id).first()
+        assert cross_listing.cross_listed_section_ids == [50008, 50009]
+        assert [c['sectionId'] for c in cross_listing.courses] == [50008, 50009]
+        assert cross_listing.courses[0]['label'] == 'IND ENG 195, COL 001'
+        assert cross_listing.instructors == [
+            {
+                'deptCode': 'EGCEE',
+                'email': '____________berkeley.edu',
+                'name': 'William Kinderman',
+                'roleCode': 'PI',
+                'uid': '10008',
+            },
+        ]
+
+
+class TestRefreshInstructors:
+
+    def test_only_new_and_stale(self):
+        """Only new instructors and, up to a limit, the least recently verified are looked up in CalNet."""
+        instructor_uids, _ = refresh_instructors()
+        assert instructor_uids == []
+
+        db.session.execute(text("UPDATE sis_sections SET instructor_uid = '99999999' WHERE section_id = 50000"))
+        stale_uids = sorted(uid for uid in SisSection.get_distinct_instructor_uids() if uid != '99999999')[:3]
+        for days, uid in enumerate(stale_uids):
+            sql = f"UPDATE instructors SET verified_at = now() - INTERVAL '{30 + days} days' WHERE uid = :uid"
+            db.session.execute(text(sql), {'uid': uid})
+
+        with override_config(app, 'INSTRUCTOR_VERIFICATION_MAX_STALE', 2):
+            instructor_uids, _ = refresh_instructors()
+            assert instructor_uids == ['99999999', stale_uids[2], stale_uids[1]]
+            assert Instructor.query.filter_by(uid='99999999').first().verified_at
+            instructor_uids, _ = refresh_instructors()
+            assert instructor_uids == [stale_uids[0]]
+
+
+class TestScheduleRecordingsConcurrently:
+
+    def test_same_as_serial(self):
+        """Concurrent scheduling leaves the same records, in the same order, as scheduling one course at a time."""
+        def _snapshot():
+            scheduled = [
+                (s.section_id, s.room_id, s.meeting_days, s.meeting_start_time, s.instructor_uids, s.collaborator_uids, s.publish_type)
+                for s in Scheduled.query.filter_by(term_id=term_id).order_by(Scheduled.id).all()
+            ]
+            preferences = sorted((p.section_id, p.collaborator_uids) for p in CoursePreference.query.filter_by(term_id=term_id).all())
+            return scheduled, preferences
+
+        term_id = app.config['CURRENT_TERM_ID']
+        with test_scheduling_workflow(app):
+            courses = get_eligible_unscheduled_courses(term_id)
+            serial_results = [schedule_recordings(course) for course in courses]
+            std_commit()
+            serial_snapshot = _snapshot()
+            assert len(serial_snapshot[0]) > 10
+
+            db.session.execute(text('DELETE FROM scheduled; DELETE FROM course_preferences'))
+            with override_config(app, 'KALTURA_SCHEDULING_MAX_WORKERS', 4):
+                concurrent_results = schedule_recordings_concurrently(courses)
+            std_commit()
+            assert _snapshot() == serial_snapshot
+            for serial, concurrent in zip(serial_results, concurrent_results):
+                assert [s.section_id for s in serial or []] == [s.section_id for s in concurrent or []]
+
+
+class TestSyncKalturaEvents:
+
+    @staticmethod
+    def _mock_kaltura(monkeypatch, events):
+        updated_since_per_call = []
+
+        def _iter_events_updated_since(self, updated_since=None):
+            updated_since_per_call.append(updated_since)
+            return iter(events)
+        monkeypatch.setattr(Kaltura, 'iter_events_updated_since', _iter_events_updated_since)
+        monkeypatch.setattr(Kaltura, 'get_resource_ids_per_event', lambda self, event_ids: {event_id: 7001 for event_id in event_ids})
+        return updated_since_per_call
+
+    def test_sync(self, monkeypatch):
+        """Events are copied into the mirror, which is then fresh."""
+        series = {
+            'endDate': '2026-08-24T10:00:00-07:00',
+            'id': 900001,
+            'parentId': None,
+            'recurrenceType': 'Recurring',
+            'startDate': '2026-08-24T09:00:00-07:00',
+            'status': 'Active',
+        }
+        updated_since_per_call = self._mock_kaltura(monkeypatch, [series])
+        sync_kaltura_events()
+        assert len(updated_since_per_call) == 1
+        assert KalturaEvent.is_fresh()
+        assert KalturaEvent.get_events_by_resource(7001) == [series]
+
+    def test_disabled(self, monkeypatch):
+        """No sync when the mirror is disabled."""
+        updated_since_per_call = self._mock_kaltura(monkeypatch, [])
+        synced_at = KalturaEvent.get_synced_at()
+        with override_config(app, 'KALTURA_EVENTS_MAX_STALENESS', 0):
+            sync_kaltura_events()
+        assert updated_since_per_call == []
+        assert KalturaEvent.get_synced_at() == synced_at
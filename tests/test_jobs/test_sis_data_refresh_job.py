@@ -0,0 +1,236 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+
+from diablo import db
+from diablo.externals.kaltura import Kaltura
+from diablo.jobs.errors import BackgroundJobError
+from diablo.jobs.schedule_updates_job import _get_section_ids_to_check, _queue_schedule_updates
+from diablo.jobs.sis_data_refresh_job import _for_each_term, _validate_staged_sis_sections, get_sis_refresh_term_ids, SisDataRefreshJob
+from diablo.lib.db import resolve_sql_template
+from diablo.models.course_feed import CourseFeed
+from diablo.models.course_preference import CoursePreference
+from diablo.models.data_version import DataVersion, ROOMS_VERSION_KEY
+from diablo.models.room import Room
+from diablo.models.sis_refresh_log import SisRefreshLog
+from diablo.models.sis_section import SisSection
+from flask import current_app as app
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from tests.util import override_config
+
+
+class TestDifferentialRefresh:
+
+    @staticmethod
+    def _stage_current_rows(term_id):
+        # Stand-in for stage_rds_sis_sections.template.sql: Nessie returns what we already have.
+        sql = """
+            INSERT INTO sis_sections_staged
+            SELECT
+                allowed_units, course_name, course_title, instruction_format, instructor_name, instructor_role_code,
+                instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+                meeting_start_date, meeting_start_time, section_id, section_num, term_id
+            FROM sis_sections
+            WHERE term_id = :term_id AND deleted_at IS NULL
+        """
+        db.session.execute(text(sql), {'term_id': term_id})
+
+    @staticmethod
+    def _refresh():
+        db.session.execute(text(resolve_sql_template('update_rds_sis_sections.template.sql')))
+
+    @staticmethod
+    def _rows_per_section_id(term_id):
+        rows = {}
+        sql = 'SELECT id, section_id, meeting_location, deleted_at FROM sis_sections WHERE term_id = :term_id ORDER BY id'
+        for row in db.session.execute(text(sql), {'term_id': term_id}):
+            rows.setdefault(row['section_id'], []).append(dict(row))
+        return rows
+
+    def test_no_changes(self):
+        """Nothing is rewritten when SIS data is unchanged."""
+        term_id = app.config['CURRENT_TERM_ID']
+        rows_before = self._rows_per_section_id(term_id)
+        self._stage_current_rows(term_id)
+        self._refresh()
+        log = SisRefreshLog.get_latest(term_id)
+        assert log.changed_section_ids == []
+        assert self._rows_per_section_id(term_id) == rows_before
+
+    def test_changes(self):
+        """Only changed sections are inserted, updated or soft-deleted, and the changes are logged."""
+        term_id = app.config['CURRENT_TERM_ID']
+        rows_before = self._rows_per_section_id(term_id)
+        updated_section_id, deleted_section_id, unchanged_section_id = 50000, 50001, 50002
+        inserted_section_id = 59999
+        self._stage_current_rows(term_id)
+        params = {'term_id': term_id}
+        for sql in [
+            f"UPDATE sis_sections_staged SET meeting_location = 'Barker 101' WHERE section_id = {updated_section_id}",
+            f'DELETE FROM sis_sections_staged WHERE section_id = {deleted_section_id}',
+            f"""INSERT INTO sis_sections_staged
+                SELECT allowed_units, course_name, 'New course', instruction_format, instructor_name, instructor_role_code,
+                    instructor_uid, is_primary, meeting_days, meeting_end_date, meeting_end_time, meeting_location,
+                    meeting_start_date, meeting_start_time, {inserted_section_id}, section_num, term_id
+                FROM sis_sections_staged WHERE section_id = {unchanged_section_id}""",
+        ]:
+            db.session.execute(text(sql), params)
+        self._refresh()
+
+        log = SisRefreshLog.get_latest(term_id)
+        assert log.inserted_section_ids == [inserted_section_id]
+        assert log.updated_section_ids == [updated_section_id]
+        assert log.deleted_section_ids == [deleted_section_id]
+
+        rows_after = self._rows_per_section_id(term_id)
+        # Updated in place
+        assert [r['id'] for r in rows_after[updated_section_id]] == [r['id'] for r in rows_before[updated_section_id]]
+        assert {r['meeting_location'] for r in rows_after[updated_section_id]} == {'Barker 101'}
+        # Soft-deleted
+        assert all(r['deleted_at'] for r in rows_after[deleted_section_id])
+        assert len(rows_after[inserted_section_id]) == len(rows_before[unchanged_section_id])
+        for section_id in set(rows_before) - {updated_section_id, deleted_section_id}:
+            assert rows_after[section_id] == rows_before[section_id]
+
+    def test_validate_staged_rows(self):
+        """Refresh is refused if Nessie returns far fewer rows than we have."""
+        term_id = app.config['CURRENT_TERM_ID']
+        self._stage_current_rows(term_id)
+        _validate_staged_sis_sections(term_id)
+        db.session.execute(text('DELETE FROM sis_sections_staged WHERE section_id % 3 <> 0'))
+        with pytest.raises(BackgroundJobError):
+            _validate_staged_sis_sections(term_id)
+        with override_config(app, 'SIS_REFRESH_MIN_STAGED_ROW_RATIO', 0.1):
+            _validate_staged_sis_sections(term_id)
+        db.session.execute(text('DELETE FROM sis_sections_staged'))
+        with override_config(app, 'SIS_REFRESH_MIN_STAGED_ROW_RATIO', 0):
+            with pytest.raises(BackgroundJobError):
+                _validate_staged_sis_sections(term_id)
+
+    def test_validate_staged_rows_of_new_term(self):
+        """A term with no rows, staged or current, is not refused."""
+        _validate_staged_sis_sections(2222)
+
+
+class TestMultiTermRefresh:
+
+    def test_sql_template_per_term(self):
+        """SQL templates resolve to the given term, else the current term."""
+        assert 'WHERE s.term_id = 2222 ' in resolve_sql_template('update_rds_sis_sections.template.sql', term_id=2222)
+        assert f"WHERE s.term_id = {app.config['CURRENT_TERM_ID']} " in resolve_sql_template('update_rds_sis_sections.template.sql')
+
+    def test_for_each_term(self):
+        """Terms are processed concurrently, each in its own app context."""
+        results = _for_each_term([2218, 2222, 2225], lambda term_id: (term_id, app.config['CURRENT_TERM_ID']))
+        assert results == {term_id: (term_id, 2218) for term_id in [2218, 2222, 2225]}
+
+    def test_term_ids(self):
+        """Configured terms are refreshed, else the current term."""
+        assert get_sis_refresh_term_ids() == [app.config['CURRENT_TERM_ID']]
+        with override_config(app, 'SIS_REFRESH_TERM_IDS', [2218, 2222]):
+            assert get_sis_refresh_term_ids() == [2218, 2222]
+
+
+class TestChangedSectionsOnly:
+
+    def test_full_sweep(self):
+        """All scheduled courses are checked when no changes are given, when rooms change and when a sweep is due."""
+        term_id = app.config['CURRENT_TERM_ID']
+        assert _get_section_ids_to_check(term_id=term_id, changed_section_ids=None)[0] is None
+        _queue_schedule_updates(term_id)
+        assert _get_section_ids_to_check(term_id=term_id, changed_section_ids=[50000])[0] is not None
+
+        room = Room.find_room('Barker 101')
+        Room.update_capability(room.id, room.capability)
+        assert _get_section_ids_to_check(term_id=term_id, changed_section_ids=[50000])[0] is None
+
+        with override_config(app, 'SCHEDULE_UPDATES_FULL_SWEEP_HOURS', -1):
+            assert _get_section_ids_to_check(term_id=term_id, changed_section_ids=[50000])[0] is None
+
+    def test_changed_sections(self):
+        """Changed sections, their principal listings and courses changed in Diablo are checked."""
+        term_id = app.config['CURRENT_TERM_ID']
+        _queue_schedule_updates(term_id)
+        CoursePreference.update_publish_type(
+            term_id=term_id,
+            section_id=50002,
+            publish_type='kaltura_my_media',
+            canvas_site_ids=None,
+        )
+        section_ids, _ = _get_section_ids_to_check(term_id=term_id, changed_section_ids=[50000, 50008])
+        assert {50000, 50002, 50007, 50008} <= set(section_ids)
+        assert 50001 not in section_ids
+
+    def test_failed_run_not_recorded(self, monkeypatch):
+        """A run that fails before all courses are checked is not recorded as a run, nor as a sweep."""
+        term_id = app.config['CURRENT_TERM_ID']
+        keys = [f'schedule_updates:{term_id}', f'schedule_updates_sweep:{term_id}']
+        versions = DataVersion.get_versions(keys)
+
+        def _fail(*args, **kwargs):
+            raise RuntimeError('Database went away')
+        monkeypatch.setattr(SisSection, 'get_courses_scheduled', _fail)
+        with pytest.raises(RuntimeError):
+            _queue_schedule_updates(term_id)
+        assert DataVersion.get_versions(keys) == versions
+        monkeypatch.undo()
+        _queue_schedule_updates(term_id)
+        assert [v for v, _ in DataVersion.get_versions(keys).values()] == [v + 1 for v, _ in versions.values()]
+
+    def test_unchanged_room_mappings(self):
+        """Refresh of unchanged Kaltura resource mappings leaves rooms version and course feeds alone."""
+        term_id = app.config['CURRENT_TERM_ID']
+        SisSection.refresh_course_feeds(term_id=term_id)
+        rooms_version = DataVersion.get_versions([ROOMS_VERSION_KEY])[ROOMS_VERSION_KEY][0]
+        room = Room.find_room('Barker 101')
+        mappings = {r.id: r.kaltura_resource_id for r in Room.all_rooms() if r.kaltura_resource_id}
+        Room.update_kaltura_resource_mappings(mappings)
+        assert DataVersion.get_versions([ROOMS_VERSION_KEY])[ROOMS_VERSION_KEY][0] == rooms_version
+        assert CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+
+        Room.update_kaltura_resource_mappings({**mappings, room.id: 123456})
+        assert DataVersion.get_versions([ROOMS_VERSION_KEY])[ROOMS_VERSION_KEY][0] == rooms_version + 1
+        assert Room.find_room('Barker 101').kaltura_resource_id == 123456
+        assert not CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+
+    def test_after_refresh_of_many_terms(self, monkeypatch):
+        """Per-term writes, made in worker threads and app contexts of their own, persist."""
+        # Workers get database connections of their own, rather than the test's, so only what they commit shows up below.
+        term_id = app.config['CURRENT_TERM_ID']
+        session = scoped_session(sessionmaker(bind=db.engine))
+        monkeypatch.setattr(db, 'session', session)
+        monkeypatch.setattr(Kaltura, 'get_schedule_resources', lambda self: [])
+        try:
+            started_at = session.execute(text('SELECT clock_timestamp()')).scalar()
+            versions = DataVersion.get_versions([f'term:{term_id}', 'term:2222'])
+            SisDataRefreshJob.after_sis_data_refresh(term_ids=[term_id, 2222])
+            session.remove()
+            sql = 'SELECT COUNT(*) FROM course_feeds WHERE term_id = :term_id AND updated_at >= :started_at'
+            assert session.execute(text(sql), {'started_at': started_at, 'term_id': term_id}).scalar() > 0
+            for key, (version, _) in DataVersion.get_versions([f'term:{term_id}', 'term:2222']).items():
+                assert version == versions[key][0] + 1
+        finally:
+            session.remove()
@@ -25,8 +25,8 @@ ENHANCEMENTS, OR MODIFICATIONS.
 from datetime import datetime, timedelta
 
 from diablo.lib.berkeley import are_scheduled_dates_obsolete, are_scheduled_times_obsolete, DAYS, \
-    get_canvas_sis_term_id, get_first_matching_datetime_of_term, get_recording_end_date, get_recording_start_date, \
-    term_name_for_sis_id
+    get_canvas_sis_term_id, get_first_matching_datetime_of_term, get_meeting_pattern, get_recording_end_date, \
+    get_recording_start_date, term_name_for_sis_id
 from diablo.lib.util import format_days
 from diablo.models.sis_section import SisSection
 from flask import current_app as app
@@ -108,6 +108,39 @@ class TestRecordingDates:
             assert datetime.strftime(start_date, df) == datetime.strftime(today, df)
 
 
+class TestMeetingPatterns:
+
+    def test_interned(self):
+        """Meetings with the same days, times and dates share one pattern."""
+        pattern = get_meeting_pattern('MOWE', '2525-12-11', '10:59', '2525-08-25', '10:00')
+        assert get_meeting_pattern('MOWE', '2525-12-11', '10:59', '2525-08-25', '10:00') is pattern
+        assert get_meeting_pattern('MOWE', '2525-12-11', '11:59', '2525-08-25', '11:00') is not pattern
+        assert pattern.days_formatted == ('MO', 'WE')
+        assert pattern.days_names == ('Monday', 'Wednesday')
+        assert pattern.start_time_formatted == '10:00 am'
+        assert pattern.end_time_formatted == '10:59 am'
+
+    def test_recording_dates(self):
+        """Pattern recording dates match those computed per meeting."""
+        meeting = {'days': 'TUTH', 'endDate': '2525-12-11', 'startDate': '2525-08-26'}
+        with override_config(app, 'CURRENT_TERM_RECORDINGS_BEGIN', '2525-09-07'):
+            with override_config(app, 'CURRENT_TERM_RECORDINGS_END', '2525-11-23'):
+                pattern = get_meeting_pattern(meeting['days'], meeting['endDate'], '10:59', meeting['startDate'], '10:00')
+                assert pattern.get_recording_start_date() == get_recording_start_date(meeting) == _to_datetime('2525-09-11')
+                assert pattern.recording_end_date == get_recording_end_date(meeting) == _to_datetime('2525-11-22')
+                first_occurrence = pattern.get_first_occurrence(time_hours=10, time_minutes=0)
+                assert first_occurrence.strftime('%Y-%m-%d %H:%M') == '2525-09-11 10:00'
+
+    def test_invalidated_on_config_change(self):
+        """Patterns are interned per term configuration."""
+        pattern = get_meeting_pattern('FR', '2525-12-11', '10:59', '2525-08-25', '10:00')
+        assert pattern.get_recording_start_date() == get_recording_start_date({'days': 'FR', 'startDate': '2525-08-25'})
+        with override_config(app, 'CURRENT_TERM_RECORDINGS_BEGIN', '2525-09-07'):
+            reconfigured = get_meeting_pattern('FR', '2525-12-11', '10:59', '2525-08-25', '10:00')
+            assert reconfigured is not pattern
+            assert reconfigured.get_recording_start_date() == _to_datetime('2525-09-07')
+
+
 class TestObsoleteScheduledDates:
 
     @property
@@ -0,0 +1,105 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+from datetime import datetime, timedelta
+
+from diablo.lib.util import utc_now
+from diablo.models.kaltura_event import KalturaEvent
+from flask import current_app as app
+from tests.util import override_config
+
+
+def _event(event_id, recurrence_type, start_date, parent_id=None, status='Active'):
+    return {
+        'endDate': (start_date + timedelta(hours=1)).isoformat(),
+        'id': event_id,
+        'parentId': parent_id,
+        'recurrenceType': recurrence_type,
+        'startDate': start_date.isoformat(),
+        'status': status,
+        'tags': 'rtl_course_capture',
+    }
+
+
+def _mirror_events():
+    monday = datetime(2026, 8, 24, 9, tzinfo=utc_now().tzinfo)
+    series = _event(900001, 'Recurring', monday)
+    recurrences = [_event(900001 + day, 'Recurrence', monday + timedelta(days=day), parent_id=900001) for day in range(1, 4)]
+    one_off = _event(900010, 'None', monday + timedelta(days=2))
+    KalturaEvent.upsert([recurrences[0], series] + recurrences[1:] + [one_off])
+    KalturaEvent.update_resource_ids({900001: 7001, 900010: 7002})
+    return monday, series, recurrences, one_off
+
+
+class TestKalturaEventQueries:
+
+    def test_events_by_resource(self):
+        """Recurrences are in the room of their series, listed by start date, latest first."""
+        _, series, recurrences, one_off = _mirror_events()
+        events = KalturaEvent.get_events_by_resource(7001)
+        assert [e['id'] for e in events] == [r['id'] for r in reversed(recurrences)] + [series['id']]
+        assert events[-1] == series
+        assert [e['id'] for e in KalturaEvent.get_events_by_resource(7002)] == [one_off['id']]
+
+    def test_events_in_date_range(self):
+        """Events within the date range, optionally of one recurrence type."""
+        monday, _, recurrences, one_off = _mirror_events()
+        kwargs = {'end_date': monday + timedelta(days=2, hours=1), 'start_date': monday + timedelta(days=1)}
+        assert [e['id'] for e in KalturaEvent.get_events_in_date_range(**kwargs)] == [recurrences[0]['id'], recurrences[1]['id'], one_off['id']]
+        events = KalturaEvent.get_events_in_date_range(recurrence_type='Recurrence', **kwargs)
+        assert [e['id'] for e in events] == [recurrences[0]['id'], recurrences[1]['id']]
+
+    def test_deleted_events_are_skipped(self):
+        """Upsert replaces the mirrored event, and events deleted in Kaltura are not read."""
+        _, series, recurrences, _ = _mirror_events()
+        KalturaEvent.upsert([{**recurrences[0], 'status': 'Cancelled'}, {**recurrences[1], 'status': 'Deleted'}])
+        events = KalturaEvent.get_events(event_ids=[r['id'] for r in recurrences])
+        assert [e['id'] for e in events] == [recurrences[0]['id'], recurrences[2]['id']]
+        assert events[0]['status'] == 'Cancelled'
+
+    def test_delete_events(self):
+        """Recurrences are deleted with their series."""
+        _, series, recurrences, one_off = _mirror_events()
+        KalturaEvent.delete_events([series['id']])
+        assert KalturaEvent.get_events(event_ids=[series['id']] + [r['id'] for r in recurrences]) == []
+        assert KalturaEvent.get_events(event_ids=[one_off['id']]) == [one_off]
+
+
+class TestKalturaEventFreshness:
+
+    def test_fresh_after_sync(self):
+        """The mirror is fresh if synced within KALTURA_EVENTS_MAX_STALENESS."""
+        KalturaEvent.mark_synced(synced_at=utc_now())
+        assert KalturaEvent.is_fresh()
+        assert KalturaEvent.is_enabled()
+        with override_config(app, 'KALTURA_EVENTS_MAX_STALENESS', 0):
+            assert not KalturaEvent.is_enabled()
+            assert not KalturaEvent.is_fresh()
+
+    def test_stale(self):
+        """The mirror is stale if the last sync is too old."""
+        synced_at = utc_now() - timedelta(seconds=app.config['KALTURA_EVENTS_MAX_STALENESS'] + 60)
+        KalturaEvent.mark_synced(synced_at=synced_at)
+        assert KalturaEvent.get_synced_at() == synced_at
+        assert not KalturaEvent.is_fresh()
@@ -0,0 +1,238 @@
+"""
+Copyright ©2024. The Regents of the University of California (Regents). All Rights Reserved.
+
+Permission to use, copy, modify, and distribute this software and its documentation
+for educational, research, and not-for-profit purposes, without fee and without a
+signed licensing agreement, is hereby granted, provided that the above copyright
+notice, this paragraph and the following two paragraphs appear in all copies,
+modifications, and distributions.
+
+Contact The Office of Technology Licensing, UC Berkeley, 2150 Shattuck Avenue,
+Suite 510, Berkeley, CA 94720-1620, (510) 643-7201, otl@berkeley.edu,
+http://ipira.berkeley.edu/industry-info for commercial licensing opportunities.
+
+IN NO EVENT SHALL REGENTS BE LIABLE TO ANY PARTY FOR DIRECT, INDIRECT, SPECIAL,
+INCIDENTAL, OR CONSEQUENTIAL DAMAGES, INCLUDING LOST PROFITS, ARISING OUT OF
+THE USE OF THIS SOFTWARE AND ITS DOCUMENTATION, EVEN IF REGENTS HAS BEEN ADVISED
+OF THE POSSIBILITY OF SUCH DAMAGE.
+
+REGENTS SPECIFICALLY DISCLAIMS ANY WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE. THE
+SOFTWARE AND ACCOMPANYING DOCUMENTATION, IF ANY, PROVIDED HEREUNDER IS PROVIDED
+"AS IS". REGENTS HAS NO OBLIGATION TO PROVIDE MAINTENANCE, SUPPORT, UPDATES,
+ENHANCEMENTS, OR MODIFICATIONS.
+"""
+import json
+
+from diablo.jobs.util import refresh_cross_listings
+from diablo.models.course_feed import CourseFeed
+from diablo.models.course_preference import CoursePreference
+from diablo.models.data_version import DataVersion
+from diablo.models.opt_out import OptOut
+from diablo.models.room import Room
+from diablo.models.schedule_update import ScheduleUpdate
+from diablo.models.sis_section import SisSection
+from flask import current_app as app
+from tests.util import override_config
+
+
+class TestAggregatedCourses:
+
+    def test_aggregated_courses_match(self):
+        """Courses aggregated in SQL are identical to courses aggregated per row."""
+        term_id = app.config['CURRENT_TERM_ID']
+        for kwargs in [{}, {'include_ineligible': True}, {'include_deleted': True, 'include_administrative_proxies': True}]:
+            courses = SisSection.get_courses(term_id, **kwargs)
+            aggregated_courses = SisSection.get_courses(term_id, aggregate_in_sql=True, **kwargs)
+            assert len(courses) > 0
+            assert json.dumps(aggregated_courses, sort_keys=True) == json.dumps(courses, sort_keys=True)
+
+
+class TestCourseRecords:
+
+    def test_records_render_as_feed(self):
+        """Course records render, key for key and in order, as the course feed."""
+        term_id = app.config['CURRENT_TERM_ID']
+        for kwargs in [{'include_administrative_proxies': True}, {'include_full_schedules': False}, {'aggregate_in_sql': True}]:
+            courses = SisSection.get_courses(term_id, **kwargs)
+            records = SisSection.get_courses(term_id, as_records=True, **kwargs)
+            assert len(records) > 0
+            assert json.dumps([r.to_api_json() for r in records]) == json.dumps(courses)
+
+    def test_item_access(self):
+        """Course records support the dict access of the course feed, derived fields included."""
+        term_id = app.config['CURRENT_TERM_ID']
+        course = SisSection.get_courses(term_id, as_records=True, section_ids=[50007])[0]
+        assert course['label'] == 'IND ENG 95, COL 001 | IND ENG 195, COL 001'
+        assert course['meetingType'] in ['A', 'B', 'C', 'D']
+        assert 'note' not in course
+        assert course.get('note') is None
+        meeting = course['meetings']['eligible'][0]
+        assert len(meeting['daysNames']) == len(meeting['daysFormatted']) > 0
+        assert meeting.get('recordingStartDate')
+        course['publishType'] = 'kaltura_media_gallery'
+        assert course.publish_type == 'kaltura_media_gallery'
+
+
+class TestStreamCourses:
+
+    def test_streamed_courses_match(self):
+        """Courses streamed in chunks are the courses of the filter, in the same order."""
+        term_id = app.config['CURRENT_TERM_ID']
+        for filter_, courses in [
+            ('All', SisSection.get_courses(term_id, include_full_schedules=False, include_ineligible=True)),
+            ('Eligible', SisSection.get_courses(term_id, include_full_schedules=False)),
+            ('Opted Out', SisSection.get_courses_opted_out(term_id, include_full_schedules=False)),
+            ('No Instructors', SisSection.get_courses_without_instructors(term_id, include_full_schedules=False)),
+        ]:
+            streamed_courses = list(SisSection.stream_courses(term_id=term_id, filter_=filter_, chunk_size=3))
+            assert [c['sectionId'] for c in streamed_courses] == [c['sectionId'] for c in courses]
+            assert json.dumps(streamed_courses) == json.dumps(courses)
+
+
+class TestCoursesPerInstructor:
+
+    def test_cross_listed_courses(self):
+        """Instructor of a non-principal listing gets the principal listing, after each refresh of cross-listings."""
+        term_id = app.config['CURRENT_TERM_ID']
+        for _ in range(2):
+            courses = SisSection.get_courses_per_instructor_uid(term_id=term_id, instructor_uid='10010')
+            assert 50012 in [c['sectionId'] for c in courses]
+            assert 50013 not in [c['sectionId'] for c in courses]
+            refresh_cross_listings(term_id=term_id)
+
+    def test_unknown_instructor(self):
+        """No courses for an instructor with no sections."""
+        term_id = app.config['CURRENT_TERM_ID']
+        assert SisSection.get_courses_per_instructor_uid(term_id=term_id, instructor_uid='999999999') == []
+
+
+class TestEligibleSections:
+
+    def test_refreshed_on_room_capability_change(self):
+        """Courses in a room are no longer eligible once the room loses recording capability."""
+        term_id = app.config['CURRENT_TERM_ID']
+        room = Room.find_room('Barker 101')
+        section_ids = [c['sectionId'] for c in SisSection.get_courses_per_location(term_id, room.location)]
+        assert section_ids
+        eligible_section_ids = [c['sectionId'] for c in SisSection.get_courses(term_id)]
+        assert set(section_ids) & set(eligible_section_ids)
+
+        Room.update_capability(room.id, None)
+        assert not set(section_ids) & set(c['sectionId'] for c in SisSection.get_courses(term_id))
+
+        Room.update_capability(room.id, 'screencast_and_video')
+        assert [c['sectionId'] for c in SisSection.get_courses(term_id)] == eligible_section_ids
+
+
+class TestUpdateHistory:
+
+    def test_update_history_of_cross_listings(self):
+        """Update history of a course includes updates of its cross-listings, but no others."""
+        term_id = app.config['CURRENT_TERM_ID']
+        for section_id, field_value_new in [(50007, 'audio'), (50008, 'presenter_audio'), (50000, 'presenter_presentation_audio')]:
+            ScheduleUpdate.queue(
+                term_id=term_id,
+                section_id=section_id,
+                field_name='recording_type',
+                field_value_old=None,
+                field_value_new=field_value_new,
+            )
+        course = SisSection.get_course(term_id=term_id, section_id=50007, include_update_history=True)
+        assert sorted(u['fieldValueNew'] for u in course['updateHistory']) == ['audio', 'presenter_audio']
+        assert [u['requestedAt'] for u in course['updateHistory']] == sorted([u['requestedAt'] for u in course['updateHistory']], reverse=True)
+
+
+class TestCourseFeeds:
+
+    def test_stored_feed_matches_live_feed(self):
+        """Course feed read from course_feeds equals the feed built from SIS data."""
+        term_id = app.config['CURRENT_TERM_ID']
+        CourseFeed.delete_all(term_id=term_id)
+        live_feeds = {}
+        for section_id in [50000, 50007, 50017, 50018]:
+            for include_deleted in [False, True]:
+                live_feeds[(section_id, include_deleted)] = SisSection.get_course(
+                    term_id=term_id,
+                    section_id=section_id,
+                    include_deleted=include_deleted,
+                )
+        SisSection.refresh_course_feeds(term_id=term_id)
+        for (section_id, include_deleted), live_feed in live_feeds.items():
+            assert CourseFeed.get(term_id=term_id, section_id=section_id, include_deleted=include_deleted) or not live_feed
+            stored_feed = SisSection.get_course(term_id=term_id, section_id=section_id, include_deleted=include_deleted)
+            assert json.dumps(stored_feed, sort_keys=True) == json.dumps(live_feed, sort_keys=True)
+
+    def test_read_does_not_store_feed(self):
+        """A feed built on read is not stored."""
+        term_id = app.config['CURRENT_TERM_ID']
+        CourseFeed.delete_all(term_id=term_id)
+        assert SisSection.get_course(term_id=term_id, section_id=50000)
+        assert not CourseFeed.query.filter_by(term_id=term_id, section_id=50000).first()
+
+    def test_stored_feed_not_mutated(self):
+        """Options of one read of a stored feed do not carry over to the next read in the session."""
+        term_id = app.config['CURRENT_TERM_ID']
+        SisSection.refresh_course_feeds(term_id=term_id)
+        # While the row is referenced, the session's identity map hands the same instance to every read.
+        course_feed = CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+        stored_feed = json.dumps(course_feed.feed, sort_keys=True)
+        course = SisSection.get_course(term_id=term_id, section_id=50000, include_update_history=False)
+        assert 'updateHistory' not in course
+        course = SisSection.get_course(term_id=term_id, section_id=50000)
+        assert 'updateHistory' in course
+        assert json.dumps(course_feed.feed, sort_keys=True) == stored_feed
+
+    def test_feed_refreshed_on_preference_change(self):
+        """A change in course preferences replaces the stored feed."""
+        term_id = app.config['CURRENT_TERM_ID']
+        section_id = 50007
+        SisSection.refresh_course_feeds(term_id=term_id)
+        assert SisSection.get_course(term_id=term_id, section_id=section_id)['recordingType'] != 'presenter_presentation_audio_with_operator'
+        CoursePreference.update_recording_type(term_id=term_id, section_id=section_id, recording_type='presenter_presentation_audio_with_operator')
+        assert not CourseFeed.get(term_id=term_id, section_id=section_id, include_deleted=False)
+        assert SisSection.get_course(term_id=term_id, section_id=section_id)['recordingType'] == 'presenter_presentation_audio_with_operator'
+
+    def test_feed_built_before_change(self):
+        """A feed stored after a change to its course, but built before it, is stale."""
+        term_id = app.config['CURRENT_TERM_ID']
+        SisSection.refresh_course_feeds(term_id=term_id)
+        course_feed = CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+        versions = DataVersion.get_course_versions(term_id=term_id)
+        DataVersion.bump_courses(term_id=term_id, section_ids=[50000])
+        CourseFeed.upsert(term_id=term_id, feeds_per_section_id={50000: course_feed.feed}, include_deleted=False, versions=versions)
+        assert not CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+
+    def test_stale_config(self):
+        """Stored feeds are ignored when term config changes."""
+        term_id = app.config['CURRENT_TERM_ID']
+        SisSection.refresh_course_feeds(term_id=term_id)
+        assert CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+        with override_config(app, 'CURRENT_TERM_RECORDINGS_END', '2021-12-01'):
+            assert not CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+
+
+class TestOptOuts:
+
+    def test_blanket_opt_out(self):
+        """Blanket opt-out of an instructor appears in the feed of the instructor's course only."""
+        term_id = app.config['CURRENT_TERM_ID']
+        course = SisSection.get_course(term_id=term_id, section_id=50000)
+        instructor_uid = course['instructors'][0]['uid']
+        OptOut.update_opt_out(instructor_uid=instructor_uid, term_id=term_id, section_id=None, opt_out=True)
+        course = SisSection.get_course(term_id=term_id, section_id=50000)
+        assert course['hasBlanketOptedOut'] is True
+        assert set(o['instructorUid'] for o in course['optOuts']) == {instructor_uid}
+        other_courses = [c for c in SisSection.get_courses(term_id) if instructor_uid not in [i['uid'] for i in c['instructors']]]
+        assert other_courses
+        assert not next((c for c in other_courses if c['hasBlanketOptedOut']), None)
+
+    def test_blanket_opt_out_of_administrative_proxy(self):
+        """Blanket opt-out of an instructor whom the feed does not list (i.e., APRX) invalidates the stored feed."""
+        term_id = app.config['CURRENT_TERM_ID']
+        SisSection.refresh_course_feeds(term_id=term_id)
+        assert '10003' not in [i['uid'] for i in SisSection.get_course(term_id=term_id, section_id=50000)['instructors']]
+        assert CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+        OptOut.update_opt_out(instructor_uid='10003', term_id=term_id, section_id=None, opt_out=True)
+        assert not CourseFeed.get(term_id=term_id, section_id=50000, include_deleted=False)
+        assert not CourseFeed.query.filter_by(term_id=term_id, section_id=50000).first()